@@ -0,0 +1,117 @@
+# scripts/bench_miners.py
+"""
+Micro-benchmark των termset miners (utilities/miners.py) ανά μήκος query και ελάχιστη συχνότητα:
+μέσος χρόνος mining ανά query, πλήθος termsets και queries που κόπηκαν από το time budget.
+Στο τέλος τυπώνεται ο γρηγορότερος από τους ισοδύναμους miners (EXACT_MINERS) ανά συλλογή,
+ενώ οι υπόλοιποι (closed) τυπώνονται χωριστά.
+
+Χρήση:
+    python scripts/bench_miners.py                                   # CF, apriori/eclat/closed
+    python scripts/bench_miners.py --collections CF CRAN NPL --min_freqs 1 3
+    python scripts/bench_miners.py --miners apriori eclat --time_budget 30
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from time import time
+from pandas import DataFrame, cut
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_PROJECT_ROOT / "src" / "irlib"))
+
+from utilities.apriori import AprioriLimits
+from utilities.miners import EXACT_MINERS, MINERS, get_miner
+from utilities.Result_handling import write
+from irlib.collection_builder import build_collection_from_mongo
+
+# όρια των κατηγοριών μήκους query (πλήθος όρων)
+LENGTH_BINS = [0, 5, 10, 20, 40, 1000]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Termset miners micro-benchmark via MongoDB")
+    parser.add_argument("--collections", nargs="+", default=["CF"],
+                        help="Συλλογές στη MongoDB (default: CF)")
+    parser.add_argument("--miners",     nargs="+", default=list(MINERS), choices=list(MINERS),
+                        help=f"Miners (default: {' '.join(MINERS)})")
+    parser.add_argument("--min_freqs",  nargs="+", type=int, default=[1, 2, 5],
+                        help="Ελάχιστες συχνότητες termset (default: 1 2 5)")
+    parser.add_argument("--time_budget", type=float, default=60,
+                        help="Όριο δευτερολέπτων ανά query και miner (default: 60)")
+    parser.add_argument("--stopwords",  action="store_true", default=True,
+                        help="Αφαίρεση stopwords από τα queries (default: True)")
+    parser.add_argument("--dest",       type=str, default="results",
+                        help="Φάκελος για αποθήκευση αποτελεσμάτων (default: results/)")
+    return parser.parse_args()
+
+
+def bench_collection(name, col, args):
+    queries = col.queries
+    if args.stopwords:
+        queries = [[word for word in query if word not in col.stopwords] for query in queries]
+    limits = AprioriLimits(time_budget=args.time_budget)
+    records = []
+    for min_freq in args.min_freqs:
+        for miner_name in args.miners:
+            miner = get_miner(miner_name)
+            for query in queries:
+                start = time()
+                termsets = miner(query, col.inverted_index, min_freq, limits=limits)
+                records.append({
+                    "collection": name,
+                    "min_freq": min_freq,
+                    "miner": miner_name,
+                    "query_len": len(query),
+                    "secs": time() - start,
+                    "termsets": len(termsets),
+                    "truncated": bool(termsets.truncated),
+                })
+            print(f"{name} min_freq={min_freq} {miner_name}: "
+                  f"{sum(r['secs'] for r in records[-len(queries):]):.2f} secs")
+    return records
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.dest, exist_ok=True)
+    results_file = "MinerBenchmark.xlsx"
+
+    records = []
+    for name in args.collections:
+        col = build_collection_from_mongo(name)
+        print(f"\nCollection {name}: {len(col.queries)} queries, {len(col.inverted_index)} vocab terms")
+        records += bench_collection(name, col, args)
+
+    df = DataFrame(records)
+    df["length"] = cut(df["query_len"], LENGTH_BINS).astype(str)
+    table = (df.groupby(["collection", "min_freq", "length", "miner"])
+               .agg(queries=("secs", "size"), mean_secs=("secs", "mean"), max_secs=("secs", "max"),
+                    mean_termsets=("termsets", "mean"), truncated=("truncated", "sum"))
+               .reset_index())
+    print(f"\n{'=' * 60}")
+    print(table.to_string(index=False))
+
+    # γρηγορότερος miner ανά συλλογή (συνολικός χρόνος όλων των queries και min_freq), μόνο ανάμεσα
+    # στους ισοδύναμους: το closed δίνει μόνο τα closed termsets, άρα τυπώνεται χωριστά
+    totals = df.groupby(["collection", "miner"])["secs"].sum().reset_index()
+    print(f"\n{'=' * 60}")
+    for name, group in totals.groupby("collection"):
+        exact = group[group["miner"].isin(EXACT_MINERS)]
+        other = group[~group["miner"].isin(EXACT_MINERS)]
+        parts = []
+        if len(exact):
+            fastest = exact.loc[exact["secs"].idxmin()]
+            parts.append(f"fastest = {fastest['miner']} ({fastest['secs']:.2f} secs)")
+            parts.append(", ".join(f"{row.miner} {row.secs:.2f}" for row in exact.itertuples()))
+        if len(other):
+            parts.append("not equivalent: " + ", ".join(f"{row.miner} {row.secs:.2f}" for row in other.itertuples()))
+        print(f"  {name}: " + " | ".join(parts))
+
+    write(xl_namefile=results_file, dest_path=args.dest, sheetname="by_length", data=table)
+    print(f"\n  Αποτελέσματα αποθηκεύτηκαν → {args.dest}/{results_file}")
+
+
+if __name__ == "__main__":
+    main()
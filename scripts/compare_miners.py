@@ -0,0 +1,108 @@
+# scripts/compare_miners.py
+"""
+Σύγκριση των termset miners (utilities/miners.py) στο GSB, με βάση τον πρώτο (default: όλα τα
+frequent termsets του apriori ως προς τα closed termsets): MAP, πλήθος γραμμών (termsets) των
+πινάκων, χρόνος και επικάλυψη των top-k rankings με αυτά του πρώτου miner.
+
+Χρήση:
+    python scripts/compare_miners.py                          # CF, CRAN, NPL
+    python scripts/compare_miners.py --collections CF --k 20  # μόνο CF, cutoff 20
+    python scripts/compare_miners.py --max_size 4             # όριο μεγέθους termset
+    python scripts/compare_miners.py --miners apriori eclat   # ίδια termsets, άλλος αλγόριθμος
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from time import time
+from numpy import mean
+from pandas import DataFrame
+
+_PROJECT_ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(_PROJECT_ROOT / "src" / "irlib"))
+
+from models.GSB import GSBModel
+from utilities.apriori import AprioriLimits
+from utilities.miners import MINERS, get_miner
+from utilities.Result_handling import write
+from irlib.collection_builder import build_collection_from_mongo
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Apriori vs closed termsets via MongoDB")
+    parser.add_argument("--collections", nargs="+", default=["CF", "CRAN", "NPL"],
+                        help="Συλλογές στη MongoDB (default: CF CRAN NPL)")
+    parser.add_argument("--miners",     nargs="+", default=["apriori", "closed"], choices=list(MINERS),
+                        help="Miners προς σύγκριση, ο πρώτος είναι η βάση (default: apriori closed)")
+    parser.add_argument("--k",          type=int, default=10,
+                        help="Cutoff k για precision/recall και επικάλυψη rankings (default: 10)")
+    parser.add_argument("--min_freq",   type=int, default=1,
+                        help="Ελάχιστη συχνότητα termset (default: 1)")
+    parser.add_argument("--max_size",   type=int, default=None,
+                        help="Μέγιστο μέγεθος termset και για τους δύο miners (default: χωρίς όριο)")
+    parser.add_argument("--time_budget", type=float, default=None,
+                        help="Όριο δευτερολέπτων ανά query (default: χωρίς όριο)")
+    parser.add_argument("--stopwords",  action="store_true", default=True,
+                        help="Εφαρμογή stopwords στα queries (default: True)")
+    parser.add_argument("--dest",       type=str, default="results",
+                        help="Φάκελος για αποθήκευση αποτελεσμάτων (default: results/)")
+    return parser.parse_args()
+
+
+def counting(miner, rows):
+    # ο miner καταγράφει και το πλήθος των termsets (γραμμές του tsf πίνακα) κάθε query
+    def mine(*args, **kwargs):
+        termsets = miner(*args, **kwargs)
+        rows.append(len(termsets))
+        return termsets
+    return mine
+
+
+def run(col, miner, args):
+    rows = []
+    model = GSBModel(col)
+    start = time()
+    model.stream(min_freq=args.min_freq, stopwords=args.stopwords, k=args.k, trace_memory=False,
+                 limits=AprioriLimits(max_size=args.max_size, time_budget=args.time_budget),
+                 miner=counting(miner, rows))
+    return model, rows, time() - start
+
+
+def main():
+    args = parse_args()
+    os.makedirs(args.dest, exist_ok=True)
+    results_file = "MinerComparison.xlsx"
+
+    records = []
+    for name in args.collections:
+        col = build_collection_from_mongo(name)
+        print(f"\nCollection {name}: {len(col.queries)} queries, {len(col.inverted_index)} vocab terms")
+        runs = {miner_name: run(col, get_miner(miner_name), args) for miner_name in args.miners}
+        base, base_rows = runs[args.miners[0]][:2]
+
+        for miner_name, (model, rows, secs) in runs.items():
+            # επικάλυψη των top-k εγγράφων ανά query ως προς τον πρώτο miner
+            overlap = mean([len(set(a[:args.k]) & set(b[:args.k])) / args.k
+                            for a, b in zip(base.ranking, model.ranking)])
+            records.append({
+                "collection": name,
+                "miner": miner_name,
+                "MAP": mean(model.precision),
+                "recall": mean(model.recall),
+                "rows": sum(rows),
+                "rows_ratio": sum(rows) / max(1, sum(base_rows)),
+                "truncated": sum(map(bool, model.truncated)),
+                "secs": round(secs, 2),
+                f"top{args.k}_overlap": overlap,
+            })
+
+    df = DataFrame(records)
+    print(f"\n{'=' * 60}")
+    print(df.to_string(index=False))
+    write(xl_namefile=results_file, dest_path=args.dest, sheetname="GSB", data=df)
+    print(f"\n  Αποτελέσματα αποθηκεύτηκαν → {args.dest}/{results_file}")
+
+
+if __name__ == "__main__":
+    main()
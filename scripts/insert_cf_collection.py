@@ -1,13 +1,13 @@
 # scripts/insert_cf_collection.py
 import sys
 from pathlib import Path
-import os
-from typing import List, Dict
+from typing import Dict, Iterator, List, Tuple
 
 # Ρίζα του project, π.χ. .../ir-model-comparison
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(PROJECT_ROOT / "src"))
-from irlib.datasets_insert.mongo_ingest import ingest_collection
+from irlib.datasets_insert.storage import get_storage
+from irlib.datasets_insert.streaming import ingest_stream, iter_directory_documents
 
 # Απόλυτο path στα CF docs
 CF_DOCS_DIR = PROJECT_ROOT / "collections" / "CF" / "docs"
@@ -16,35 +16,11 @@ CF_DOCS_DIR = PROJECT_ROOT / "collections" / "CF" / "docs"
 CF_QUERY_FILE = PROJECT_ROOT / "datasets" / "CF_RAW" / "cfquery"
 
 # ---------------------------------------------
-# 1. Φόρτωμα CF documents από τα αρχεία 00001, 00002, ...
+# 1. CF documents από τα αρχεία 00001, 00002, ... (generator, παράλληλο διάβασμα)
+#    id = όνομα αρχείου χωρίς επέκταση, π.χ. "00001"
 # ---------------------------------------------
-def load_cf_documents() -> List[Dict]:
-    documents: List[Dict] = []
-
-    # Ένα loop ΜΟΝΟ πάνω στα αρχεία του φακέλου
-    for doc_path in sorted(CF_DOCS_DIR.iterdir()):
-        if not doc_path.is_file():
-            continue
-        if doc_path.name.startswith("."):
-            # αγνόησε κρυφά / περίεργα αρχεία
-            continue
-
-        # id = όνομα αρχείου χωρίς επέκταση
-        doc_id = doc_path.name  # π.χ. "00001"
-
-        #ΕΔΩ κάνουμε το "ένα token ανά γραμμή" -> "μεγάλο string"
-        with open(doc_path, "r", encoding="utf-8", errors="ignore") as f:
-            tokens = f.read().split()
-            text = " ".join(tokens)
-
-        documents.append(
-            {
-                "id": doc_id,
-                "text": text,
-            }
-        )
-
-    return documents
+def load_cf_documents() -> Iterator[Dict]:
+    return iter_directory_documents(CF_DOCS_DIR)
 
 
 # ---------------------------------------------
@@ -55,10 +31,8 @@ def load_cf_documents() -> List[Dict]:
 #    NR 00034
 #    RD  139 1222  151 2211 ...
 # ---------------------------------------------
-def load_cf_queries_and_qrels() -> tuple[List[Dict], List[Dict]]:
-    queries: List[Dict] = []
-    qrels: List[Dict] = []
-
+def iter_cf_records() -> Iterator[Tuple[str, Dict]]:
+    """Διαβάζει το cfquery γραμμή-γραμμή και κάνει yield ("query", {...}) και ("qrel", {...})."""
     current_qid: str | None = None
     current_qtext_lines: List[str] = []
     mode: str | None = None  # "QU" ή "RD" για να ξέρουμε τι συνεχίζουμε
@@ -101,7 +75,7 @@ def load_cf_queries_and_qrels() -> tuple[List[Dict], List[Dict]]:
             elif prefix == "NR":
                 if current_qid is not None:
                     text = " ".join(current_qtext_lines).strip()
-                    queries.append({"id": current_qid, "text": text})
+                    yield "query", {"id": current_qid, "text": text}
                 mode = "NR"
 
             # RD = αρχή γραμμών με (doc_id, relevance_code)
@@ -113,14 +87,12 @@ def load_cf_queries_and_qrels() -> tuple[List[Dict], List[Dict]]:
                 for doc_id_str, rel_str in zip(it, it):
                     # CF docs είναι σε μορφή 00001, 00002, ...
                     doc_id = f"{int(doc_id_str):05d}"
-                    qrels.append(
-                        {
-                            "query_id": current_qid,
-                            "doc_id": doc_id,
-                            # προς το παρόν κρατάμε τον κωδικό ως int
-                            "relevance": int(rel_str),
-                        }
-                    )
+                    yield "qrel", {
+                        "query_id": current_qid,
+                        "doc_id": doc_id,
+                        # προς το παρόν κρατάμε τον κωδικό ως int
+                        "relevance": int(rel_str),
+                    }
 
             else:
                 # Εδώ έχουμε:
@@ -134,34 +106,34 @@ def load_cf_queries_and_qrels() -> tuple[List[Dict], List[Dict]]:
                     it = iter(tokens)
                     for doc_id_str, rel_str in zip(it, it):
                         doc_id = f"{int(doc_id_str):05d}"
-                        qrels.append(
-                            {
-                                "query_id": current_qid,
-                                "doc_id": doc_id,
-                                "relevance": int(rel_str),
-                            }
-                        )
+                        yield "qrel", {
+                            "query_id": current_qid,
+                            "doc_id": doc_id,
+                            "relevance": int(rel_str),
+                        }
                 # αλλιώς αγνοούμε τη γραμμή
 
-    return queries, qrels
 
+def load_cf_queries() -> Iterator[Dict]:
+    return (record for kind, record in iter_cf_records() if kind == "query")
 
-if __name__ == "__main__":
-    docs = load_cf_documents()
-    print(f"Loaded {len(docs)} CF documents from {CF_DOCS_DIR}")
 
-    # DEBUG: έλεγξε ότι όλα τα ids είναι μοναδικά
-    ids = [d["id"] for d in docs]
-    print(f"Unique ids: {len(set(ids))}")
+def load_cf_qrels() -> Iterator[Dict]:
+    return (record for kind, record in iter_cf_records() if kind == "qrel")
+
 
-    queries, qrels = load_cf_queries_and_qrels()
-    print(f"Loaded {len(queries)} CF queries and {len(qrels)} qrels from {CF_QUERY_FILE}")
+def load_cf_queries_and_qrels() -> Tuple[List[Dict], List[Dict]]:
+    """Queries και qrels ως λίστες (για όποιον τα θέλει όλα στη μνήμη)."""
+    return list(load_cf_queries()), list(load_cf_qrels())
 
-    result = ingest_collection(
+
+if __name__ == "__main__":
+    print(f"Εισαγωγή της συλλογής CF στο storage backend '{get_storage().name}' (streaming)...")
+    result = ingest_stream(
         collection_name="CF",
-        documents=docs,
-        queries=queries,   # προς το παρόν δεν βάζουμε queries
-        qrels=qrels,     # ούτε qrels
+        documents=load_cf_documents(),
+        queries=load_cf_queries(),
+        qrels=load_cf_qrels(),
         drop_existing=True,  # σβήνει ό,τι CF υπήρχε παλιότερα
     )
 
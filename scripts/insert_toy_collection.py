@@ -1,5 +1,4 @@
-from irlib.datasets_insert.mongo_ingest import ingest_collection
-from irlib.utils.mongo import get_db
+from irlib.datasets_insert.storage import get_storage
 
 
 def build_toy_data():
@@ -31,7 +30,9 @@ if __name__ == "__main__":
 
     docs, qs, qrels = build_toy_data()
 
-    stats = ingest_collection(
+    storage = get_storage()
+    print(f"Εισαγωγή της συλλογής {collection_name} στο storage backend '{storage.name}'...")
+    stats = storage.ingest_collection(
         collection_name=collection_name,
         documents=docs,
         queries=qs,
@@ -41,15 +42,9 @@ if __name__ == "__main__":
 
     print("Inserted:", stats)
 
-    # Διαβάζουμε πίσω από τη Mongo για test
-    db = get_db()
-    docs_col = db["Documents"]
-    queries_col = db["Queries"]
-    qrels_col = db["Qrels"]
-
-    print("Docs in Mongo for toy_demo:",
-          docs_col.count_documents({"collection": collection_name}))
-    print("Queries in Mongo for toy_demo:",
-          queries_col.count_documents({"collection": collection_name}))
-    print("Qrels in Mongo for toy_demo:",
-          qrels_col.count_documents({"collection": collection_name}))
+    # Διαβάζουμε πίσω από το backend για test
+    docs_back, queries_back, qrels_back = storage.load_collection(collection_name)
+
+    print(f"Docs in {storage.name} for {collection_name}:", len(docs_back))
+    print(f"Queries in {storage.name} for {collection_name}:", len(queries_back))
+    print(f"Qrels in {storage.name} for {collection_name}:", len(qrels_back))
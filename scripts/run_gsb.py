@@ -7,6 +7,7 @@
     python scripts/run_gsb.py                        # τρέχει CF με defaults
     python scripts/run_gsb.py --collection NPL       # άλλη συλλογή
     python scripts/run_gsb.py --runs 3 --k 20        # custom παράμετροι
+    python scripts/run_gsb.py --workers 4            # όλα τα queries μαζί (fit_batch) σε 4 processes
 """
 
 import sys
@@ -42,6 +43,9 @@ def parse_args():
                         help="Φάκελος για αποθήκευση αποτελεσμάτων (default: results/)")
     parser.add_argument("--k_core",     action="store_true", default=False,
                         help="Ενεργοποίηση k-core pruning στο GSBModel (default: False)")
+    parser.add_argument("--workers",    type=int,   default=None,
+                        help="Processes για το apriori όλων των queries μαζί με fit_batch "
+                             "(default: fit ανά query)")
     return parser.parse_args()
 
 
@@ -75,7 +79,10 @@ def main():
         print(f"{'─'*40}")
 
         model = GSBModel(col, k_core_bool=args.k_core)
-        model.fit(min_freq=args.min_freq, stopwords=args.stopwords)
+        if args.workers:
+            model.fit_batch(min_freq=args.min_freq, stopwords=args.stopwords, workers=args.workers)
+        else:
+            model.fit(min_freq=args.min_freq, stopwords=args.stopwords)
         model.evaluate(k=args.k)
 
         map_score = mean(model.precision)
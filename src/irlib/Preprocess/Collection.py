@@ -1,6 +1,7 @@
 import json
 import random
 from _csv import writer
+from functools import partial
 from json import dumps
 from os.path import join, exists
 from os import listdir, getcwd, path
@@ -9,21 +10,25 @@ from typing import Dict, Tuple, Set,List
 import nltk
 
 from Preprocess.Document import Document
+from Preprocess.Index_Builder import build_documents, doc_id_key
+from Preprocess.Vocabulary import Vocabulary
+from utilities.postings import BLOCK_SIZE, compress_index, save_index
 from utilities.document_utls import create_dir, remove_punctuation, write_to_tsv
 from pandas import DataFrame
 
 
 def update_index(document, inv_index):
-    id = len(inv_index)
-    for term, tf in document.tf.items():
+    # the 'id' of a term is its id in the document's vocabulary (the collection vocabulary)
+    vocabulary = document.vocabulary
+    for term_id, tf in document.id_tf.items():
+        term = vocabulary.term(term_id)
         if term not in inv_index:
             inv_index[term] = {
-                "id": id,
+                "id": term_id,
                 "total_tf": tf,
                 "posting_list": [[document.doc_id, tf]],
                 "term": term
             }
-            id += 1
         elif term in inv_index:
             inv_index[term]['total_tf'] += tf
             inv_index[term]['posting_list'] += [[document.doc_id, tf]]
@@ -74,6 +79,54 @@ class Collection:
         # inverted index
         self.inverted_index = {}
 
+        # sparse document-term matrix, built on demand by utilities.term_matrix.get_term_matrix
+        self.term_matrix = None
+
+        # collection-side vectors of the models (fitted vectorizer + document matrix), keyed by model parameters
+        self.doc_vectors = {}
+
+        # term <-> integer id: the documents are encoded against it and it assigns the 'id' of
+        # every term of the inverted index, so there is a single id space per collection
+        self.vocabulary = Vocabulary()
+
+        # inverted index entries by term id (and the index they were taken from), built on demand by index_entries
+        self._index_entries = []
+        self._entries_of = None
+
+    def get_vocabulary(self):
+        """
+        Vocabulary of the collection: maps every term to its 'id' in the inverted index and back,
+        and the documents store their terms as these ids (Document.term_ids). The graph based
+        models work on these dense integer ids (graph nodes, termsets, node weight arrays,
+        postings via index_entries) and use the term strings only for the query input.
+        """
+        if len(self.vocabulary) < len(self.inverted_index):
+            # an index built or loaded without the vocabulary (ids in insertion order): adopt its ids
+            self.vocabulary = Vocabulary(sorted(self.inverted_index, key=lambda term: self.inverted_index[term]['id']))
+            self.bind_docs()
+        return self.vocabulary
+
+    def bind_docs(self, docs=None):
+        """Encodes the documents (default: all of them) against the collection vocabulary."""
+        for doc in self.docs if docs is None else docs:
+            doc.bind(self.vocabulary)
+
+    def index_entries(self):
+        """
+        Entries of the inverted index by term id (the same dicts, not copies): the posting lists
+        of a term id are index_entries()[term_id]['posting_list'], without a string lookup.
+        """
+        if self._entries_of is not self.inverted_index or len(self._index_entries) != len(self.inverted_index):
+            entries = [None] * len(self.get_vocabulary())
+            for entry in self.inverted_index.values():
+                entries[entry['id']] = entry
+            self._index_entries, self._entries_of = entries, self.inverted_index
+        return self._index_entries
+
+    def raw_texts(self):
+        """Original texts of the documents, aligned with self.docs (no database access)."""
+        return [doc.raw_text for doc in self.docs]
+
     def create_col_from_list(self, dict_of_docs, preproccess=False, list_of_q=None, list_of_rel=None, coll_path=None):
         for doc in dict_of_docs:
             # print(doc['doc_id'])
@@ -101,29 +154,36 @@ class Collection:
                 fd.write("\n".join(list_of_q))
         return 0
 
-    def create_collection(self):
+    def create_collection(self, workers=None):
+        """
+        Reads the documents of self.path and builds the inverted index in one pass, in parallel
+        (see Preprocess.Index_Builder.build_documents). workers=1 parses in a single process.
+        """
         self.num_docs = 0
+        self.term_matrix = None
+        self.doc_vectors = {}
+        self.vocabulary = Vocabulary()
+        self._index_entries, self._entries_of = [], None
         if not self.docs:
-            # generate file names
-            # print(listdir(self.path))
-            filenames = [join(self.path, id) for id in listdir(self.path)]
-            #print(filenames)
-            max_id = max([int(id) for id in listdir(self.path)])
+            # generate file names sorted by doc id (the number Document parses), so the documents
+            # and the chunks of the parallel index build come in doc id order
+            names = sorted(listdir(self.path), key=doc_id_key)
+            filenames = [join(self.path, id) for id in names]
+            max_id = max([int(id) for id in names])
             self.num_docs = int(max_id)
             print(self.num_docs)
-            # print(filenames)
-            self.add_batch_docs(filenames)
+            # documents + inverted index in the same pass (the index is not rebuilt afterwards)
+            self.inverted_index = {}
+            self.add_batch_docs(filenames, workers=workers)
 
-            # Create inverted index
-            # --->Debug
-            # for doc in self.docs:
-            #    print(doc.tf)
-            self.inverted_index = self.create_inverted_index()
-
-    def add_batch_docs(self, filenames):
-        for fn in filenames:
-            update_index(Document(fn),self.inverted_index)
-            self.docs.append(Document(fn))
+    def add_batch_docs(self, filenames, workers=None):
+        # documents and index share the collection vocabulary: documents parsed in-process are encoded
+        # against it directly, the ones of the worker processes are re-encoded when bound
+        docs, self.inverted_index = build_documents(filenames, partial(Document, vocabulary=self.vocabulary),
+                                                    inv_index=self.inverted_index, workers=workers,
+                                                    vocabulary=self.vocabulary)
+        self.bind_docs(docs)
+        self.docs.extend(docs)
 
     def create_inverted_index(self):
         inv_index = {}
@@ -136,14 +196,27 @@ class Collection:
             print(f"Keys not found {error_counter}")
         return inv_index
 
-    def save_inverted_index(self, path=''):
+    def compress_index(self, block_size=BLOCK_SIZE):
+        """
+        Stores the posting lists of the inverted index compressed (utilities.postings.CompressedPostings:
+        delta gaps + variable-byte blocks with skip pointers). The models read them as before.
+        """
+        compress_index(self.inverted_index, block_size)
+        return self.inverted_index
+
+    def save_inverted_index(self, path='', compressed=False):
         if not path:
             path = self.path
         print(path)
         create_dir(path)
+        if compressed:
+            # binary file with the compressed posting lists, read back with utilities.postings.load_index
+            save_index(self.inverted_index, join(path, f'inverted_index_{self.name}.npz'))
+            return
         with open("".join([path, f'\inverted_index_{self.name}.json']), 'w', encoding='UTF-8') as inv_ind:
             if self.inverted_index:
-                inv_ind.write(dumps(self.inverted_index))
+                inv_ind.write(dumps(self.inverted_index,
+                                    default=lambda postings: postings.to_list()))
             else:
                 raise ("Inverted Index Empty.")
 
@@ -1,11 +1,20 @@
 from re import findall
 from os import getcwd
 from os.path import exists
-from utilities.document_utls import calculate_tf
+from Preprocess.Vocabulary import VOCABULARY, Vocabulary
 
 
 class Document:
-    def __init__(self, path=''):
+    """
+    A document of a collection. The terms are stored once, as an array('I') of ids against a
+    Vocabulary: the one of its collection (the ids of the inverted index, see Collection.bind_docs)
+    or, outside a collection, the process-wide VOCABULARY. terms, docs_text and tf are derived
+    from the ids on access (hold on to the result when it is used repeatedly).
+    """
+    __slots__ = ('path', 'doc_id', '_ids', '_raw_text', '_vocabulary')
+
+    def __init__(self, path='', vocabulary=None):
+        self._vocabulary = vocabulary
         try:
             self.path = path
         except FileNotFoundError:
@@ -16,8 +25,82 @@ class Document:
             self.doc_id = 696969
             # print(self.doc_id)
         self.terms = self.read_document()
-        self.docs_text = " ".join(self.terms)
-        self.tf = calculate_tf(self.terms)
+        self._raw_text = None
+
+    @property
+    def vocabulary(self):
+        # (subclasses that skip Document.__init__, e.g. TokDocument, use the process vocabulary)
+        vocabulary = getattr(self, '_vocabulary', None)
+        return VOCABULARY if vocabulary is None else vocabulary
+
+    def bind(self, vocabulary):
+        """Re-encodes the terms against `vocabulary` (e.g. the vocabulary of the collection)."""
+        if vocabulary is not self.vocabulary:
+            terms = self.terms
+            self._vocabulary = vocabulary
+            self.terms = terms
+        return self
+
+    @property
+    def terms(self):
+        return self.vocabulary.decode(self._ids)
+
+    @terms.setter
+    def terms(self, terms):
+        self._ids = self.vocabulary.encode(terms)
+
+    @property
+    def term_ids(self):
+        """Ids of the terms in the document's vocabulary (array('I'), in document order)."""
+        return self._ids
+
+    @property
+    def id_tf(self):
+        """{term id: frequency}, in order of first appearance (tf without the term strings)."""
+        counts = {}
+        for term_id in self._ids:
+            counts[term_id] = counts.get(term_id, 0) + 1
+        return counts
+
+    @property
+    def docs_text(self):
+        return " ".join(self.terms)
+
+    @property
+    def tf(self):
+        # same result (and order of first appearance) as calculate_tf(self.terms), counted on the ids
+        term = self.vocabulary.term
+        return {term(term_id): count for term_id, count in self.id_tf.items()}
+
+    @property
+    def raw_text(self):
+        """
+        Original text of the document (terms as written in the file, before upper-casing), read
+        lazily on first access and kept afterwards. Used by the models that encode raw text (LSI, SBERT).
+        """
+        # (subclasses that skip Document.__init__, e.g. TokDocument, have no _raw_text yet)
+        if getattr(self, '_raw_text', None) is None:
+            try:
+                with open(self.path, 'r', encoding='UTF-8') as d:
+                    self._raw_text = " ".join(r.strip() for r in d.readlines() if r.strip())
+            except FileNotFoundError:
+                self._raw_text = " ".join(self.terms)
+        return self._raw_text
+
+    def __getstate__(self):
+        # term ids are only meaningful in their vocabulary, so documents travel as terms (e.g. back
+        # from the Index_Builder workers) and are re-encoded on unpickling
+        state = dict(getattr(self, '__dict__', {}))
+        state.update(path=self.path, doc_id=self.doc_id, _raw_text=getattr(self, '_raw_text', None),
+                     terms=self.terms)
+        return state
+
+    def __setstate__(self, state):
+        # a vocabulary of its own until the collection binds it to its vocabulary, so the terms of
+        # unpickled documents are not added to the process-wide one
+        self._vocabulary = Vocabulary()
+        for name, value in state.items():
+            setattr(self, name, value)
 
     def __str__(self):
         return "doc ID: " + str(self.doc_id)
@@ -36,8 +119,9 @@ class Document:
     # the window by taking into account the total length of the
     # file. (minimum window = 8)
     def split_document(self, window, window_cut_off=True):
-
-        num_of_words = len(self.terms)
+        # terms are decoded from the ids on every access, so decode them once
+        terms = self.terms
+        num_of_words = len(terms)
         # If window is equal to zero get window according to length
         # or if percentage window flag is true
         windowed_doc = []
@@ -46,6 +130,6 @@ class Document:
             window = 7
         # join words into a window sized text
         for i in range(0, num_of_words, window):
-            windowed_doc.append(self.terms[i:i + window])
+            windowed_doc.append(terms[i:i + window])
 
         return windowed_doc
@@ -0,0 +1,114 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from heapq import merge
+from os import cpu_count
+from re import findall
+
+from Preprocess.Document import Document
+
+
+def doc_id_key(name):
+    """Sort key of a document file name: its doc id, the first number in it (as Document parses it)."""
+    return int(findall(r'\d+', name)[0])
+
+
+def _parse_chunk(doc_factory, filenames, freq_attr):
+    """
+    Worker: builds the documents of a chunk of files and their partial inverted index
+    {term: [[doc_id, tf], ...]} (terms in order of first appearance, postings sorted by doc id).
+    """
+    docs = [doc_factory(fn) for fn in filenames]
+    partial = {}
+    for doc in docs:
+        for term, tf in getattr(doc, freq_attr).items():
+            partial.setdefault(term, []).append([doc.doc_id, tf])
+    for postings in partial.values():
+        postings.sort(key=lambda posting: posting[0])
+    return docs, partial
+
+
+def _merge_postings(lists):
+    # chunks of files in doc id order (Collection.create_collection) hold disjoint, increasing doc id
+    # ranges: plain concatenation; the k-way merge is kept for batches given in any other order
+    if all(a[-1][0] <= b[0][0] for a, b in zip(lists, lists[1:])):
+        return [posting for postings in lists for posting in postings]
+    return list(merge(*lists, key=lambda posting: posting[0]))
+
+
+def merge_partial_indexes(partials, inv_index=None, total_key='total_tf', name_key='term', vocabulary=None):
+    """
+    Merges partial inverted indexes (given in document order) into `inv_index`.
+
+    The 'id' of a new term is its id in `vocabulary` (the collection vocabulary the documents are
+    encoded against), or without one the next free id; either way ids follow the first appearance
+    of each term in document order, as with Collection.update_index. The posting lists of a term
+    are combined with a k-way merge of the partial (sorted) lists (a plain concatenation when
+    their doc id ranges do not overlap), so every new posting list is sorted by doc id.
+    """
+    inv_index = {} if inv_index is None else inv_index
+    new_terms = {}  # term -> partial lists, in order of first appearance
+    for partial in partials:
+        for term, postings in partial.items():
+            new_terms.setdefault(term, []).append(postings)
+
+    for term, lists in new_terms.items():
+        postings = _merge_postings(lists) if len(lists) > 1 else lists[0]
+        total = sum(tf for _, tf in postings)
+        if term not in inv_index:
+            inv_index[term] = {
+                "id": len(inv_index) if vocabulary is None else vocabulary.add(term),
+                total_key: total,
+                "posting_list": postings,
+                name_key: term
+            }
+        else:
+            inv_index[term][total_key] += total
+            inv_index[term]['posting_list'] += postings
+    return inv_index
+
+
+def build_documents(filenames, doc_factory=Document, freq_attr='tf', inv_index=None, total_key='total_tf',
+                    name_key='term', workers=None, chunk_size=None, vocabulary=None):
+    """
+    Reads and tokenizes the documents of a collection in a process pool and builds the inverted
+    index in the same pass: every worker parses a contiguous chunk of files and returns its
+    documents with a partial index, and the partial indexes are merged in chunk order.
+
+    Args:
+        filenames (`list`): Document files, in collection order.
+        doc_factory (`callable`, defaults to `Document`): filename -> document object. Must be
+            picklable (a class or a functools.partial of one).
+        freq_attr (`str`, defaults to `'tf'`): Document attribute with the {term: frequency} dict.
+        inv_index (`dict`, defaults to `None`): Existing index to extend.
+        total_key (`str`), name_key (`str`): Field names of the index entries
+            ('total_tf' / 'term' for Collection, 'total_occurances' / 'token' for TokCollection).
+        workers (`int`, defaults to the number of CPUs): Worker processes, 1 parses in-process.
+        chunk_size (`int`, defaults to an even split in 4 chunks per worker, or a single chunk
+            with 1 worker): Files per task.
+        vocabulary (`Vocabulary`, defaults to `None`): Vocabulary that assigns the index ids.
+
+    Returns:
+        (list of documents in the order of `filenames`, inverted index)
+    """
+    workers = workers or cpu_count() or 1
+    if not chunk_size:
+        # in-process parsing gains nothing from splitting, so a single chunk skips the merge
+        chunk_size = max(1, -(-len(filenames) // (workers * 4)) if workers > 1 else len(filenames))
+    chunks = [filenames[i:i + chunk_size] for i in range(0, len(filenames), chunk_size)]
+
+    results = None
+    if workers > 1 and len(chunks) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_parse_chunk, [doc_factory] * len(chunks), chunks,
+                                        [freq_attr] * len(chunks)))
+        except BrokenProcessPool:
+            # e.g. spawn-based platforms when the calling script has no `if __name__ == "__main__":` guard
+            print("Process pool unavailable, parsing the documents in a single process.")
+    if results is None:
+        results = [_parse_chunk(doc_factory, chunk, freq_attr) for chunk in chunks]
+
+    docs = [doc for chunk_docs, _ in results for doc in chunk_docs]
+    inv_index = merge_partial_indexes((partial for _, partial in results), inv_index, total_key, name_key,
+                                      vocabulary)
+    return docs, inv_index
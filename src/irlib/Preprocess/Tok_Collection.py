@@ -1,10 +1,11 @@
+from functools import partial
 from os.path import join, isdir
 from os import listdir
 
-from tqdm import tqdm
-
 from Preprocess.Tok_Document import TokDocument
 from Preprocess.Collection import Collection
+from Preprocess.Index_Builder import build_documents, doc_id_key
+from Preprocess.Vocabulary import Vocabulary
 
 class TokCollection(Collection):
     r"""
@@ -34,23 +35,40 @@ class TokCollection(Collection):
             print('Warning! BERT type not defined as "base" or "large", defaulting to "base".')
         self._stopwords = stopwords
 
-    def create_collection(self):
-        # Create TokDocument objects from path and load them into collection
+    def create_collection(self, workers=None):
+        # Create TokDocument objects from path and load them into collection, with the same
+        # parallel pipeline as Collection: documents and token index are built in one pass
         print(f'Creating token-based collection. BERT={self._bert} Stopwords={self._stopwords}')
         self.num_docs = 0
+        # the vocabulary of a token collection holds the tokens: it assigns the ids of the token index
+        self.vocabulary = Vocabulary()
+        self._index_entries, self._entries_of = [], None
         if not self.docs:
-            filenames = [join(self.path, id) for id in listdir(self.path)]
-            max_id = max([int(id) for id in listdir(self.path)])
+            # same doc id order as Collection.create_collection
+            names = sorted(listdir(self.path), key=doc_id_key)
+            filenames = [join(self.path, id) for id in names if not isdir(join(self.path, id))]
+            max_id = max([int(id) for id in names])
             self.num_docs = int(max_id)
-            for fn in tqdm(filenames):
-                if not isdir(fn):
-                    self.docs.append(TokDocument(fn, self._bert, self._stopwords))
-            self.inverted_index = self.create_inverted_index()
-    
+            self.docs, self.inverted_index = build_documents(
+                filenames,
+                partial(TokDocument, bert=self._bert, stopwords=self._stopwords),
+                freq_attr='token_frequency',
+                total_key='total_occurances',
+                name_key='token',
+                workers=workers,
+                vocabulary=self.vocabulary
+            )
+            self.bind_docs()
+
+    def bind_docs(self, docs=None):
+        # token documents are indexed by their tokens: token_ids are the index ids of the tokens,
+        # aligned with token_frequency (the terms keep their own vocabulary)
+        for doc in self.docs if docs is None else docs:
+            doc.token_ids = self.vocabulary.encode(doc.token_frequency)
+
     def create_inverted_index(self):
         # Create inverted index for collection, using tokens instead of terms
         inv_index = {}
-        token_id = 0
         error_counter = 0
         try:
             for doc in self.docs:
@@ -58,12 +76,11 @@ class TokCollection(Collection):
                 for token, occurances in doc.token_frequency.items():
                     if token not in inv_index:
                         inv_index[token] = {
-                            'id': token_id,
+                            'id': self.vocabulary.add(token),
                             'total_occurances': occurances,
                             'posting_list': [[doc.doc_id, occurances]],
                             'token': token
                         }
-                        token_id += 1
                     elif token in inv_index:
                         inv_index[token]['total_occurances'] += occurances
                         inv_index[token]['posting_list'] += [[doc.doc_id, occurances]]
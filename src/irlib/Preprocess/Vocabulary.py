@@ -0,0 +1,55 @@
+from array import array
+
+
+class Vocabulary:
+    """
+    Interns terms into consecutive integer ids (in order of first appearance).
+
+    Documents keep their tokens as an array('I') of ids against a shared vocabulary, so each
+    distinct term string is held once per process instead of once per occurrence.
+    """
+    __slots__ = ('_ids', '_terms')
+
+    def __init__(self, terms=()):
+        self._ids = {}
+        self._terms = []
+        for term in terms:
+            self.add(term)
+
+    def __len__(self):
+        return len(self._terms)
+
+    def __contains__(self, term):
+        return term in self._ids
+
+    def __iter__(self):
+        # terms in id order
+        return iter(self._terms)
+
+    def add(self, term):
+        # id of the term, assigning the next free id to unseen terms
+        term_id = self._ids.get(term)
+        if term_id is None:
+            term_id = self._ids[term] = len(self._terms)
+            self._terms.append(term)
+        return term_id
+
+    def term(self, term_id):
+        return self._terms[term_id]
+
+    def get(self, term, default=None):
+        """Id of the term without adding it."""
+        return self._ids.get(term, default)
+
+    def encode(self, terms):
+        """list of terms -> array('I') of ids (unseen terms are added)."""
+        return array('I', [self.add(term) for term in terms])
+
+    def decode(self, ids):
+        """ids -> list of terms (the interned strings, not copies)."""
+        terms = self._terms
+        return [terms[term_id] for term_id in ids]
+
+
+# default vocabulary of the documents built outside a collection (a Collection has its own)
+VOCABULARY = Vocabulary()
@@ -8,14 +8,15 @@ Flask API για το IR Benchmarking framework.
     powershell command example: Invoke-WebRequest -Uri "http://127.0.0.1:5000/run" -Method POST -ContentType "application/json" -Body '{"model": "BM25", "collection": "CF", "runs": 1}'
 
 Endpoints:
-    GET  /collections       → διαθέσιμες συλλογές στη MongoDB
+    GET  /collections       → διαθέσιμες συλλογές στο storage (MongoDB ή SQLite)
     GET  /models            → διαθέσιμα μοντέλα
     GET  /model_params      → παράμετροι ανά μοντέλο
     POST /run               → τρέχει ένα μοντέλο
     POST /compare           → τρέχει πολλά μοντέλα και συγκρίνει
-    GET  /results           → αποθηκευμένα αποτελέσματα από τη MongoDB
+    GET  /results           → αποθηκευμένα αποτελέσματα από το storage
 """
 
+import json
 import sys
 import time
 import traceback
@@ -30,7 +31,7 @@ from flask import Flask, request, jsonify
 from numpy import mean, std
 
 from irlib.collection_builder import build_collection_from_mongo
-from irlib.utilities.mongo import get_db
+from irlib.datasets_insert.storage import get_storage
 from irlib.api.registry import get_model_class, list_models
 
 app = Flask(__name__)
@@ -68,7 +69,17 @@ def _build_model(model_name: str, col, extra_params: dict):
     except Exception:
         condition_dict = {}
 
-    # 4. Route to the correct constructor based on what the model requires
+    # 4. Vector index για τα dense μοντέλα (SBERT, LSI, ConGSB expansion)
+    index = str(extra_params.get("index", "exact"))
+    index_params = extra_params.get("index_params", {})
+    if isinstance(index_params, str):
+        try:
+            index_params = json.loads(index_params.replace("'", '"'))
+        except Exception:
+            index_params = {}
+    measure_recall = bool(int(extra_params.get("measure_recall", 0)))
+
+    # 5. Route to the correct constructor based on what the model requires
     if model_name in ["WINDOWEDGSB", "GSBWINDOW"]:
         return ModelClass(col, window=window)
 
@@ -80,7 +91,7 @@ def _build_model(model_name: str, col, extra_params: dict):
 
     elif model_name == "CONGSB":
         # ConGSB also accepts **kwargs for cluster_optimization
-        return ModelClass(col, clusters=clusters, cond=condition_dict)
+        return ModelClass(col, clusters=clusters, cond=condition_dict, index=index, index_params=index_params)
 
     elif model_name == "CONGSBW":
         # ConGSBWindow uses 'cond' instead of 'condition' in its __init__
@@ -106,6 +117,32 @@ def _build_model(model_name: str, col, extra_params: dict):
         pretrained_model = str(extra_params.get("pretrained_model", "lightonai/colbertv2.0"))
         return ModelClass(col, pretrained_model=pretrained_model)
 
+    elif model_name == "BM25":
+        k1 = float(extra_params.get("k1", 1.5))
+        b = float(extra_params.get("b", 0.75))
+        variant = str(extra_params.get("variant", "okapi")).lower()
+        retrieval = str(extra_params.get("retrieval", "exhaustive")).lower()
+        return ModelClass(col, k1=k1, b=b, variant=variant, retrieval=retrieval)
+
+    elif model_name == "TFIDF":
+        retrieval = str(extra_params.get("retrieval", "exhaustive")).lower()
+        return ModelClass(col, retrieval=retrieval)
+
+    elif model_name == "SBERT":
+        return ModelClass(col, index=index, index_params=index_params, measure_recall=measure_recall)
+
+    elif model_name == "LSI":
+        n_components = int(extra_params.get("n_components", 100))
+        svd = str(extra_params.get("svd", "truncated")).lower()
+        svd_params = extra_params.get("svd_params", {})
+        if isinstance(svd_params, str):
+            try:
+                svd_params = json.loads(svd_params.replace("'", '"'))
+            except Exception:
+                svd_params = {}
+        return ModelClass(col, index=index, index_params=index_params, measure_recall=measure_recall,
+                          n_components=n_components, svd=svd, svd_params=svd_params)
+
     # Default for base models like BM25, GSB
     return ModelClass(col)
 
@@ -119,6 +156,8 @@ def _run_single(model_name: str, collection_name: str,
     map_scores = []
     all_precision = []
     all_recall = []
+    index_stats = []
+    pruning_stats = []
     total_start = time.time()
 
     for i in range(runs):
@@ -128,6 +167,12 @@ def _run_single(model_name: str, collection_name: str,
         map_scores.append(float(mean(model.precision)))
         all_precision.append([round(float(p), 6) for p in model.precision])
         all_recall.append([round(float(r), 6) for r in model.recall])
+        # recall-vs-latency του vector index (μόνο για μοντέλα που τον χρησιμοποιούν)
+        if getattr(model, "index_stats", None):
+            index_stats.append(model.index_stats)
+        # postings που βαθμολογήθηκαν με MaxScore (retrieval="maxscore")
+        if getattr(model, "impact_index", None):
+            pruning_stats.append(model.pruning_stats)
 
     elapsed = round(time.time() - total_start, 2)
 
@@ -142,13 +187,14 @@ def _run_single(model_name: str, collection_name: str,
         "recall":      all_recall,
         "elapsed_sec": elapsed,
         "params":      extra_params,
+        "index_stats": index_stats or None,
+        "pruning_stats": pruning_stats or None,
     }
 
 
 def _save_result(result: dict):
-    """Αποθηκεύει αποτέλεσμα στη MongoDB."""
-    db = get_db()
-    db["Results"].insert_one({**result, "timestamp": time.time()})
+    """Αποθηκεύει αποτέλεσμα στο storage backend (MongoDB ή SQLite)."""
+    get_storage().save_result({**result, "timestamp": time.time()})
 
 
 # ---------------------------------------------------------------------------
@@ -157,9 +203,8 @@ def _save_result(result: dict):
 
 @app.route("/collections", methods=["GET"])
 def get_collections():
-    """Επιστρέφει τις συλλογές που υπάρχουν στη MongoDB."""
-    db = get_db()
-    collections = db["Documents"].distinct("collection")
+    """Επιστρέφει τις συλλογές που υπάρχουν στο storage backend."""
+    collections = get_storage().list_collections()
     return jsonify({"collections": collections})
 
 
@@ -187,21 +232,40 @@ def get_model_params():
     theta_param = {"name": "theta_val", "type": "number", "default": 0.0,"help": "Cosine similarity threshold (e.g., 0.5)"}
     kcore_param = {"name": "k_core_bool", "type": "number", "default": 0, "help": "1 for True, 0 for False"}
     hval_param = {"name": "h_val", "type": "number", "default": 1.0, "help": "h value modifier"}
+    index_param = {"name": "index", "type": "string", "default": "exact", "help": "'exact', 'ivf' or 'hnsw'"}
+    index_params_param = {"name": "index_params", "type": "string", "default": "{}",
+                          "help": "JSON string eg: {'n_probe': 8}"}
+    recall_param = {"name": "measure_recall", "type": "number", "default": 0,
+                    "help": "1: recall@k of the index against an exact search"}
+    k1_param = {"name": "k1", "type": "number", "default": 1.5, "help": "BM25 term frequency saturation"}
+    b_param = {"name": "b", "type": "number", "default": 0.75, "help": "BM25 length normalization"}
+    variant_param = {"name": "variant", "type": "string", "default": "okapi", "help": "'okapi', 'bm25l' or 'bm25+'"}
+    retrieval_param = {"name": "retrieval", "type": "string", "default": "exhaustive",
+                       "help": "'exhaustive' or 'maxscore' (top-k with dynamic pruning, "
+                               "k defaults to 1000)"}
+    components_param = {"name": "n_components", "type": "number", "default": 100, "help": "LSI latent dimensions"}
+    svd_param = {"name": "svd", "type": "string", "default": "truncated", "help": "'truncated' or 'randomized'"}
+    svd_params_param = {"name": "svd_params", "type": "string", "default": "{}",
+                        "help": "JSON string eg: {'n_iter': 5}, or with svd='randomized': "
+                                "{'block_size': 4096, 'n_iter': 4}"}
     pylate_param = {"name": "pretrained_model", "type": "string", "default": "lightonai/colbertv2.0",
                     "help": "HuggingFace model ID (e.g., lightonai/colbertv2.0)"}
 
     params = {
         "GSB":         [],
-        "BM25":        [],
+        "BM25":        [k1_param, b_param, variant_param, retrieval_param],
+        "TFIDF":       [retrieval_param],
         "GOW":         [],
         "WINDOWEDGSB": [window_param],
         "GSBWINDOW": [window_param],
         "PGSB": [clusters_param, cond_param],
         "PGSBW": [window_param, clusters_param, cond_param],
-        "CONGSB": [clusters_param, cond_param],
+        "CONGSB": [clusters_param, cond_param, index_param, index_params_param],
         "CONGSBW": [window_param, clusters_param, cond_param],
         "GIRTE": [tensors_param, bert_param, theta_param, kcore_param, hval_param],
-        "PYLATE": [pylate_param]
+        "PYLATE": [pylate_param],
+        "SBERT": [index_param, index_params_param, recall_param],
+        "LSI": [index_param, index_params_param, recall_param, components_param, svd_param, svd_params_param],
 
     }
     return jsonify(params)
@@ -223,7 +287,7 @@ def run_model():
         k          (int)  : cutoff (default: null = όλα τα docs)
         stopwords  (bool) : (default: true)
         min_freq   (int)  : για apriori (default: 1)
-        save       (bool) : αποθήκευση στη MongoDB (default: false)
+        save       (bool) : αποθήκευση στο storage (default: false)
     """
     data = request.get_json()
 
@@ -314,23 +378,18 @@ def compare_models():
 @app.route("/results", methods=["GET"])
 def get_results():
     """
-    Επιστρέφει αποθηκευμένα αποτελέσματα από τη MongoDB.
+    Επιστρέφει αποθηκευμένα αποτελέσματα από το storage backend.
 
     Query params:
         model      : φιλτράρισμα ανά μοντέλο
         collection : φιλτράρισμα ανά συλλογή
         limit      : max αποτελέσματα (default: 20)
     """
-    db = get_db()
-    query = {}
-    if request.args.get("model"):
-        query["model"] = request.args["model"].upper()
-    if request.args.get("collection"):
-        query["collection"] = request.args["collection"].upper()
+    model = request.args["model"].upper() if request.args.get("model") else None
+    collection = request.args["collection"].upper() if request.args.get("collection") else None
 
     limit = int(request.args.get("limit", 20))
-    cursor = db["Results"].find(query, {"_id": 0}).sort("timestamp", -1).limit(limit)
-    results = list(cursor)
+    results = get_storage().find_results(model=model, collection=collection, limit=limit)
     return jsonify({"results": results, "count": len(results)})
 
 
@@ -341,4 +400,9 @@ def get_results():
 if __name__ == "__main__":
     print("Starting IR Benchmarking API...")
     print(f"Models available: {list_models()}")
+    # indexes για τα find ανά συλλογή και το GET /results (filter + sort by timestamp)
+    try:
+        get_storage().ensure_indexes()
+    except Exception as e:
+        print(f"[WARN] Αποτυχία δημιουργίας indexes: {e}")
     app.run(debug=True, host="0.0.0.0", port=5000)
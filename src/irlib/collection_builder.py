@@ -13,14 +13,15 @@ from collections import defaultdict
 from typing import List, Dict, Optional
 
 from Preprocess.Collection import Collection, update_index
-from utilities.document_utls import calculate_tf, remove_punctuation
+from Preprocess.Document import Document
+from utilities.document_utls import remove_punctuation
 
 
 # ---------------------------------------------------------------------------
 # IRDocument — ίδιο interface με Document, χωρίς file I/O
 # ---------------------------------------------------------------------------
 
-class IRDocument:
+class IRDocument(Document):
     """
     Μιμείται το Document του kalogeropo χωρίς να διαβάζει αρχείο.
     Έχει τα ίδια ακριβώς attributes:
@@ -28,9 +29,15 @@ class IRDocument:
         .terms     (List[str])  — uppercase tokens
         .docs_text (str)
         .tf        (Dict[str, int])
+        .raw_text  (str)        — το αυθεντικό κείμενο της Mongo (για LSI / SBERT)
+    Όπως στο Document, αποθηκεύονται μόνο τα ids των tokens (array στο Vocabulary της συλλογής,
+    δηλαδή τα 'id' του inverted index)· τα terms / docs_text / tf παράγονται από αυτά όταν ζητηθούν.
     """
+    __slots__ = ()
 
-    def __init__(self, doc_id_str: str, text: str) -> None:
+    def __init__(self, doc_id_str: str, text: str, vocabulary=None) -> None:
+        self._vocabulary = vocabulary
+        self.path = ''  # δεν υπάρχει αρχείο
         # Εξαγωγή αριθμητικού id — ίδια λογική με Document:
         # int(findall(r'\d+', self.path)[0])
         digits = re.findall(r'\d+', doc_id_str)
@@ -40,12 +47,11 @@ class IRDocument:
 
         # Tokenization — ίδια λογική με Document.read_document():
         # κείμενο stored ως ένα string στη Mongo → split + uppercase
-        tokens = [t.strip().upper()
-                  for t in remove_punctuation(text).split()
-                  if t.strip()]
-        self.terms: List[str] = tokens
-        self.docs_text: str = " ".join(tokens)
-        self.tf: Dict[str, int] = calculate_tf(tokens)
+        self.terms = [t.strip().upper()
+                      for t in remove_punctuation(text).split()
+                      if t.strip()]
+        # κρατάμε το αυθεντικό κείμενο, ώστε τα μοντέλα να μην ξαναδιαβάζουν τη βάση
+        self._raw_text = text
 
     def __str__(self) -> str:
         return f"doc ID: {self.doc_id}"
@@ -61,13 +67,14 @@ def build_collection_from_mongo(
     db_name: Optional[str] = None,
 ) -> Collection:
     """
-    Φορτώνει μια IR συλλογή από τη MongoDB και επιστρέφει ένα Collection.
+    Φορτώνει μια IR συλλογή από το storage backend (MongoDB ή SQLite, βλ. datasets_insert.storage)
+    και επιστρέφει ένα Collection.
 
     Args:
         collection_name: Το όνομα της συλλογής (π.χ. "CF", "NPL", "CRAN")
         stopwords:       Προαιρετική custom λίστα stopwords.
                          Αν None, χρησιμοποιείται η default του Collection.
-        db_name:         Προαιρετικό override για το όνομα της MongoDB βάσης.
+        db_name:         Προαιρετικό override για το όνομα της MongoDB βάσης (ή το αρχείο της SQLite).
 
     Returns:
         Collection με συμπληρωμένα:
@@ -79,10 +86,11 @@ def build_collection_from_mongo(
         model.fit(min_freq=1, stopwords=True)
         precision, recall = model.evaluate(k=10)
     """
-    from irlib.datasets_insert.mongo_loader import load_collection
+    from irlib.datasets_insert.storage import get_storage
 
-    print(f"[collection_builder] Φόρτωση '{collection_name}' από MongoDB...")
-    documents, queries, qrels = load_collection(collection_name, db_name)
+    storage = get_storage(db_name=db_name)
+    print(f"[collection_builder] Φόρτωση '{collection_name}' από {storage.name}...")
+    documents, queries, qrels = storage.load_collection(collection_name)
     print(f"[collection_builder] {len(documents)} docs, {len(queries)} queries, {len(qrels)} qrels")
 
     # --- Δημιουργία Collection με fake path ώστε να μην τρέξει file I/O ---
@@ -96,7 +104,8 @@ def build_collection_from_mongo(
 
     # --- 1. Docs + Inverted Index ---
     for d in documents:
-        doc = IRDocument(d["id"], d["text"])
+        # τα έγγραφα κωδικοποιούνται στο vocabulary της συλλογής, που δίνει και τα ids του index
+        doc = IRDocument(d["id"], d["text"], col.vocabulary)
         col.docs.append(doc)
         update_index(doc, col.inverted_index)
 
@@ -1,72 +1,101 @@
-from typing import List, Dict, Optional
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
 
-from irlib.utilities.mongo import get_db
+from pymongo import ReplaceOne
+from pymongo.errors import DuplicateKeyError
+
+from irlib.datasets_insert.storage import CHUNK_SIZE
+from irlib.utilities.mongo import get_db, ensure_indexes
 
 
 def _normalize_documents(
-    documents: List[Dict], collection_name: str
-) -> List[Dict]:
-    """Μετατρέπει μια λίστα από dicts σε έτοιμα Mongo docs."""
-    normalized = []
+    documents: Iterable[Dict], collection_name: str
+) -> Iterator[Dict]:
+    """Μετατρέπει τα dicts (λίστα ή generator) σε έτοιμα Mongo docs, ένα-ένα."""
     for doc in documents:
         # περιμένουμε τουλάχιστον id, text
         doc_id = doc["id"]
         text = doc["text"]
 
-        normalized.append(
-            {
-                # Αφαιρέθηκε το "_id" για να μην υπάρχει duplicate key error
-                "id": str(doc_id),
-                "collection": collection_name,
-                "text": text,
-                # εδώ αργότερα μπορείς να βάλεις extra metadata
-            }
-        )
-    return normalized
+        yield {
+            # Αφαιρέθηκε το "_id" για να μην υπάρχει duplicate key error
+            "id": str(doc_id),
+            "collection": collection_name,
+            "text": text,
+            # εδώ αργότερα μπορείς να βάλεις extra metadata
+        }
 
 
 def _normalize_queries(
-    queries: List[Dict], collection_name: str
-) -> List[Dict]:
-    normalized = []
+    queries: Iterable[Dict], collection_name: str
+) -> Iterator[Dict]:
     for q in queries:
         q_id = q["id"]
         text = q["text"]
 
-        normalized.append(
-            {
-                # Αφαιρέθηκε το "_id"
-                "id": str(q_id),
-                "collection": collection_name,
-                "text": text,
-            }
-        )
-    return normalized
+        yield {
+            # Αφαιρέθηκε το "_id"
+            "id": str(q_id),
+            "collection": collection_name,
+            "text": text,
+        }
 
 
 def _normalize_qrels(
-    qrels: List[Dict], collection_name: str
-) -> List[Dict]:
-    normalized = []
+    qrels: Iterable[Dict], collection_name: str
+) -> Iterator[Dict]:
     for qr in qrels:
-        normalized.append(
-            {
-                "collection": collection_name,
-                "query_id": str(qr["query_id"]),
-                "doc_id": str(qr["doc_id"]),
-                "relevance": int(qr.get("relevance", 1)),
-            }
-        )
-    return normalized
+        yield {
+            "collection": collection_name,
+            "query_id": str(qr["query_id"]),
+            "doc_id": str(qr["doc_id"]),
+            "relevance": int(qr.get("relevance", 1)),
+        }
+
+
+def _chunks(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _write(col, items: Iterable[Dict], key_fields: tuple, upsert: bool, chunk_size: int) -> int:
+    """
+    Γράφει τα items σε chunks των chunk_size, με τον κανόνα της SQLiteBackend:
+    upsert=False: insert_many, αφού ελεγχθεί ότι κανένα κλειδί (key_fields) του chunk δεν υπάρχει
+                  ήδη ούτε επαναλαμβάνεται — αλλιώς DuplicateKeyError (τα chunks που γράφτηκαν
+                  πριν μένουν, χρησιμοποιήστε drop_existing ή upsert για επανεισαγωγή).
+    upsert=True : unordered bulk_write από ReplaceOne(upsert=True) με κλειδί τα key_fields,
+                  ώστε η επανεισαγωγή να ενημερώνει/προσθέτει χωρίς διπλότυπα.
+    Επιστρέφει το πλήθος των εγγραφών που γράφτηκαν πράγματι.
+    """
+    written = 0
+    for chunk in _chunks(items, chunk_size):
+        keys = [{field: item[field] for field in key_fields} for item in chunk]
+        if upsert:
+            result = col.bulk_write([ReplaceOne(key, item, upsert=True) for key, item in zip(keys, chunk)],
+                                    ordered=False)
+            written += result.matched_count + result.upserted_count
+        else:
+            # τα indexes του ensure_indexes δεν είναι unique: ο έλεγχος γίνεται εδώ (ένα find ανά chunk)
+            if len({tuple(key.values()) for key in keys}) < len(keys):
+                raise DuplicateKeyError(f"{col.name}: duplicate {key_fields} keys in the input")
+            existing = col.find_one({"$or": keys}, {"_id": 0, **{field: 1 for field in key_fields}})
+            if existing is not None:
+                raise DuplicateKeyError(f"{col.name}: {existing} already exists (use upsert or drop_existing)")
+            written += len(col.insert_many(chunk, ordered=False).inserted_ids)
+    return written
 
 
 def ingest_collection(
     collection_name: str,
-    documents: List[Dict],
-    queries: List[Dict],
-    qrels: List[Dict],
+    documents: Iterable[Dict],
+    queries: Iterable[Dict],
+    qrels: Iterable[Dict],
     db_name: Optional[str] = None,
     drop_existing: bool = False,
+    upsert: bool = False,
+    chunk_size: int = CHUNK_SIZE,
 ):
     """
     Εισάγει μια συλλογή IR στη Mongo:
@@ -76,11 +105,18 @@ def ingest_collection(
     - Qrels     -> IR_Lib.Qrels
 
     collection_name: λογικό όνομα (π.χ. "CF", "NPL", "toy_cf")
-    documents: [{ "id": ..., "text": ... }, ...]
+    documents: [{ "id": ..., "text": ... }, ...]   (λίστα ή generator)
     queries:   [{ "id": ..., "text": ... }, ...]
     qrels:     [{ "query_id": ..., "doc_id": ..., "relevance": ... }, ...]
+    drop_existing: σβήνει πρώτα ό,τι υπάρχει για τη συλλογή
+    upsert: incremental ingest — τα docs/queries ταυτοποιούνται με (collection, id) και τα qrels με
+            (collection, query_id, doc_id), οπότε η επανεισαγωγή δεν χρειάζεται drop_existing.
+            Χωρίς upsert ένα κλειδί που υπάρχει ήδη σηκώνει DuplicateKeyError.
+    chunk_size: έγγραφα ανά round trip
     """
     db = get_db(db_name) if db_name else get_db()
+    # indexes πριν την εισαγωγή: τα upserts και όλα τα μετέπειτα find ανά συλλογή τα χρησιμοποιούν
+    ensure_indexes(db)
 
     docs_col = db["Documents"]
     queries_col = db["Queries"]
@@ -92,19 +128,15 @@ def ingest_collection(
         queries_col.delete_many({"collection": collection_name})
         qrels_col.delete_many({"collection": collection_name})
 
-    docs_to_insert = _normalize_documents(documents, collection_name)
-    queries_to_insert = _normalize_queries(queries, collection_name)
-    qrels_to_insert = _normalize_qrels(qrels, collection_name)
-
-    if docs_to_insert:
-        docs_col.insert_many(docs_to_insert)
-    if queries_to_insert:
-        queries_col.insert_many(queries_to_insert)
-    if qrels_to_insert:
-        qrels_col.insert_many(qrels_to_insert)
+    n_docs = _write(docs_col, _normalize_documents(documents, collection_name),
+                    ("collection", "id"), upsert, chunk_size)
+    n_queries = _write(queries_col, _normalize_queries(queries, collection_name),
+                       ("collection", "id"), upsert, chunk_size)
+    n_qrels = _write(qrels_col, _normalize_qrels(qrels, collection_name),
+                     ("collection", "query_id", "doc_id"), upsert, chunk_size)
 
     return {
-        "n_docs": len(docs_to_insert),
-        "n_queries": len(queries_to_insert),
-        "n_qrels": len(qrels_to_insert),
-    }
\ No newline at end of file
+        "n_docs": n_docs,
+        "n_queries": n_queries,
+        "n_qrels": n_qrels,
+    }
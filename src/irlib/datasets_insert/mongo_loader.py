@@ -1,7 +1,33 @@
 # src/irlib/datasets_insert/mongo_loader.py
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Tuple, Optional
 
-from irlib.utilities.mongo import get_db
+from irlib.utilities.mongo import get_db, BATCH_SIZE
+
+
+def _load_documents(col, collection_name: str) -> List[Dict]:
+    # μόνο τα πεδία που χρειαζόμαστε ('_id' έρχεται πάντα, για τα παλιά δεδομένα)
+    cursor = col.find({"collection": collection_name}, projection={"id": 1, "text": 1}, batch_size=BATCH_SIZE)
+    return [
+        # Χρησιμοποιούμε την .get() για να μη σκάει αν λείπει το κλειδί.
+        # Αν δεν βρει 'id', παίρνει το '_id' (για τα παλιά δεδομένα).
+        {"id": str(doc.get("id", doc.get("_id"))), "text": doc["text"]}
+        for doc in cursor
+    ]
+
+
+def _load_qrels(col, collection_name: str) -> List[Dict]:
+    cursor = col.find({"collection": collection_name},
+                      projection={"_id": 0, "query_id": 1, "doc_id": 1, "relevance": 1},
+                      batch_size=BATCH_SIZE)
+    return [
+        {
+            "query_id": str(qr["query_id"]),
+            "doc_id": str(qr["doc_id"]),
+            "relevance": int(qr.get("relevance", 1)),
+        }
+        for qr in cursor
+    ]
 
 
 def load_collection(
@@ -18,37 +44,20 @@ def load_collection(
 
     Η ingest_collection() που φτιάξαμε πριν πρέπει να έχει
     δημιουργήσει τα docs/queries/qrels με αυτό το schema.
+
+    Τα τρία μέρη διαβάζονται παράλληλα (ο κοινός client είναι thread-safe), με projection
+    και μεγάλο batch_size ώστε να γίνονται λίγα round trips.
     """
     db = get_db(db_name) if db_name else get_db()
 
-    docs_col = db["Documents"]
-    queries_col = db["Queries"]
-    qrels_col = db["Qrels"]
-
     # Φέρνουμε μόνο τα στοιχεία αυτής της συλλογής
-    docs_cursor = docs_col.find({"collection": collection_name})
-    queries_cursor = queries_col.find({"collection": collection_name})
-    qrels_cursor = qrels_col.find({"collection": collection_name})
-
-    documents: List[Dict] = [
-        # Χρησιμοποιούμε την .get() για να μη σκάει αν λείπει το κλειδί.
-        # Αν δεν βρει 'id', παίρνει το '_id' (για τα παλιά δεδομένα).
-        {"id": str(doc.get("id", doc.get("_id"))), "text": doc["text"]}
-        for doc in docs_cursor
-    ]
-
-    queries: List[Dict] = [
-        {"id": str(q.get("id", q.get("_id"))), "text": q["text"]}
-        for q in queries_cursor
-    ]
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        docs_future = pool.submit(_load_documents, db["Documents"], collection_name)
+        queries_future = pool.submit(_load_documents, db["Queries"], collection_name)
+        qrels_future = pool.submit(_load_qrels, db["Qrels"], collection_name)
 
-    qrels: List[Dict] = [
-        {
-            "query_id": str(qr["query_id"]),
-            "doc_id": str(qr["doc_id"]),
-            "relevance": int(qr.get("relevance", 1)),
-        }
-        for qr in qrels_cursor
-    ]
+        documents: List[Dict] = docs_future.result()
+        queries: List[Dict] = queries_future.result()
+        qrels: List[Dict] = qrels_future.result()
 
-    return documents, queries, qrels
\ No newline at end of file
+    return documents, queries, qrels
@@ -0,0 +1,253 @@
+# src/irlib/datasets_insert/storage.py
+"""
+Storage backends της βιβλιοθήκης: όλο το pipeline (collection_builder, streaming ingest, API results)
+μιλάει με ένα StorageBackend αντί απευθείας με τη MongoDB.
+
+    - MongoBackend  : η υπάρχουσα υλοποίηση (IR_Lib.Documents / Queries / Qrels / Results)
+    - SQLiteBackend : ένα τοπικό αρχείο SQLite, χωρίς κανένα service — για μηχανήματα χωρίς MongoDB
+                      και για γρήγορα cold loads
+
+Η επιλογή γίνεται με environment variables:
+    IRLIB_STORAGE      = "mongo" (default) | "sqlite"
+    IRLIB_SQLITE_PATH  = αρχείο της SQLite (default: ~/.irlib_data/irlib.sqlite)
+"""
+
+import json
+import os
+import sqlite3
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import islice
+from os.path import dirname, expanduser, join
+from typing import Dict, Iterable, List, Optional, Tuple
+
+STORAGE_BACKEND = os.environ.get("IRLIB_STORAGE", "mongo").lower()
+SQLITE_PATH = os.environ.get("IRLIB_SQLITE_PATH", join(expanduser("~"), ".irlib_data", "irlib.sqlite"))
+
+# Έγγραφα ανά εγγραφή (insert_many / executemany): η μνήμη μένει φραγμένη όσο μεγάλη κι αν είναι η πηγή
+CHUNK_SIZE = 1000
+
+
+class StorageBackend(ABC):
+    """
+    Κοινό API των backends. Τα schemas είναι αυτά της mongo_loader / mongo_ingest:
+        documents / queries: { "id": str, "text": str }
+        qrels:               { "query_id": str, "doc_id": str, "relevance": int }
+        results:             τα dicts του _run_single (+ "timestamp")
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def load_collection(self, collection_name: str) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+        """Επιστρέφει (documents, queries, qrels) μιας συλλογής, με τη σειρά εισαγωγής."""
+
+    @abstractmethod
+    def ingest_collection(self, collection_name: str, documents: Iterable[Dict], queries: Iterable[Dict],
+                          qrels: Iterable[Dict], drop_existing: bool = False, upsert: bool = False,
+                          chunk_size: int = CHUNK_SIZE) -> Dict:
+        """
+        Γράφει μια συλλογή (λίστες ή generators) σε chunks, επιστρέφει τα πλήθη των εγγραφών που
+        γράφτηκαν. Ίδιος κανόνας σε όλα τα backends: χωρίς upsert ένα κλειδί που υπάρχει ήδη
+        σηκώνει σφάλμα, με upsert=True η εγγραφή αντικαθίσταται.
+        """
+
+    @abstractmethod
+    def list_collections(self) -> List[str]:
+        pass
+
+    @abstractmethod
+    def save_result(self, result: Dict) -> None:
+        pass
+
+    @abstractmethod
+    def find_results(self, model: Optional[str] = None, collection: Optional[str] = None,
+                     limit: int = 20) -> List[Dict]:
+        """Τα πιο πρόσφατα αποτελέσματα (φθίνον timestamp), προαιρετικά ανά μοντέλο / συλλογή."""
+
+    def ensure_indexes(self) -> None:
+        pass
+
+
+class MongoBackend(StorageBackend):
+    """Η MongoDB υλοποίηση (κοινός pooled client της utilities.mongo)."""
+
+    name = "mongo"
+
+    def __init__(self, db_name: Optional[str] = None):
+        self.db_name = db_name
+
+    def _db(self):
+        from irlib.utilities.mongo import get_db
+        return get_db(self.db_name) if self.db_name else get_db()
+
+    def load_collection(self, collection_name):
+        from irlib.datasets_insert.mongo_loader import load_collection
+        return load_collection(collection_name, self.db_name)
+
+    def ingest_collection(self, collection_name, documents, queries, qrels, drop_existing=False, upsert=False,
+                          chunk_size=CHUNK_SIZE):
+        from irlib.datasets_insert.mongo_ingest import ingest_collection
+        return ingest_collection(collection_name, documents, queries, qrels, db_name=self.db_name,
+                                 drop_existing=drop_existing, upsert=upsert, chunk_size=chunk_size)
+
+    def list_collections(self):
+        return self._db()["Documents"].distinct("collection")
+
+    def save_result(self, result):
+        self._db()["Results"].insert_one(dict(result))
+
+    def find_results(self, model=None, collection=None, limit=20):
+        query = {}
+        if model:
+            query["model"] = model
+        if collection:
+            query["collection"] = collection
+        return list(self._db()["Results"].find(query, {"_id": 0}).sort("timestamp", -1).limit(limit))
+
+    def ensure_indexes(self):
+        from irlib.utilities.mongo import ensure_indexes
+        ensure_indexes(self._db())
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Τοπικό backend σε ένα αρχείο SQLite. Documents/Queries έχουν κλειδί (collection, id) και τα
+    Qrels (collection, query_id, doc_id). Ο κανόνας είναι ο ίδιος με τη MongoBackend: στο απλό
+    insert μια εγγραφή με κλειδί που υπάρχει ήδη σηκώνει σφάλμα (sqlite3.IntegrityError, και όλη
+    η εισαγωγή γίνεται rollback), με upsert=True αντικαθίσταται. Τα results αποθηκεύονται ως JSON.
+    Κάθε κλήση ανοίγει δική της σύνδεση, οπότε το backend μπορεί να χρησιμοποιηθεί από threads.
+    """
+
+    name = "sqlite"
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS documents (
+            collection TEXT NOT NULL, id TEXT NOT NULL, text TEXT NOT NULL,
+            PRIMARY KEY (collection, id));
+        CREATE TABLE IF NOT EXISTS queries (
+            collection TEXT NOT NULL, id TEXT NOT NULL, text TEXT NOT NULL,
+            PRIMARY KEY (collection, id));
+        CREATE TABLE IF NOT EXISTS qrels (
+            collection TEXT NOT NULL, query_id TEXT NOT NULL, doc_id TEXT NOT NULL, relevance INTEGER NOT NULL,
+            PRIMARY KEY (collection, query_id, doc_id));
+        CREATE TABLE IF NOT EXISTS results (
+            model TEXT, collection TEXT, timestamp REAL, payload TEXT NOT NULL);
+        CREATE INDEX IF NOT EXISTS results_model_collection_ts ON results (model, collection, timestamp DESC);
+        CREATE INDEX IF NOT EXISTS results_collection_ts ON results (collection, timestamp DESC);
+        CREATE INDEX IF NOT EXISTS results_ts ON results (timestamp DESC);
+    """
+
+    def __init__(self, path: str = SQLITE_PATH):
+        self.path = path
+        if dirname(path):
+            os.makedirs(dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self._SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # μία transaction ανά κλήση (commit στο τέλος, rollback σε σφάλμα), η σύνδεση κλείνει πάντα
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def load_collection(self, collection_name):
+        with self._connect() as conn:
+            documents = [{"id": i, "text": t} for i, t in conn.execute(
+                "SELECT id, text FROM documents WHERE collection = ? ORDER BY rowid", (collection_name,))]
+            queries = [{"id": i, "text": t} for i, t in conn.execute(
+                "SELECT id, text FROM queries WHERE collection = ? ORDER BY rowid", (collection_name,))]
+            qrels = [{"query_id": q, "doc_id": d, "relevance": r} for q, d, r in conn.execute(
+                "SELECT query_id, doc_id, relevance FROM qrels WHERE collection = ? ORDER BY rowid",
+                (collection_name,))]
+        return documents, queries, qrels
+
+    @staticmethod
+    def _write(conn, table: str, columns: tuple, rows: Iterable[tuple], upsert: bool, chunk_size: int) -> int:
+        # απλό INSERT: ένα διπλό κλειδί σηκώνει IntegrityError αντί να αγνοηθεί σιωπηλά
+        verb = "INSERT OR REPLACE" if upsert else "INSERT"
+        sql = f"{verb} INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+        rows = iter(rows)
+        written = 0
+        while chunk := list(islice(rows, chunk_size)):
+            # οι εγγραφές που γράφτηκαν πράγματι (ένα REPLACE μετράει μία φορά)
+            written += conn.executemany(sql, chunk).rowcount
+        return written
+
+    def ingest_collection(self, collection_name, documents, queries, qrels, drop_existing=False, upsert=False,
+                          chunk_size=CHUNK_SIZE):
+        with self._connect() as conn:
+            if drop_existing:
+                # σβήνουμε ό,τι υπάρχει ήδη για αυτή τη συλλογή
+                for table in ("documents", "queries", "qrels"):
+                    conn.execute(f"DELETE FROM {table} WHERE collection = ?", (collection_name,))
+
+            n_docs = self._write(conn, "documents", ("collection", "id", "text"),
+                                 ((collection_name, str(d["id"]), d["text"]) for d in documents), upsert, chunk_size)
+            n_queries = self._write(conn, "queries", ("collection", "id", "text"),
+                                    ((collection_name, str(q["id"]), q["text"]) for q in queries), upsert, chunk_size)
+            n_qrels = self._write(conn, "qrels", ("collection", "query_id", "doc_id", "relevance"),
+                                  ((collection_name, str(qr["query_id"]), str(qr["doc_id"]),
+                                    int(qr.get("relevance", 1))) for qr in qrels), upsert, chunk_size)
+        return {"n_docs": n_docs, "n_queries": n_queries, "n_qrels": n_qrels}
+
+    def list_collections(self):
+        with self._connect() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT collection FROM documents")]
+
+    def save_result(self, result):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO results (model, collection, timestamp, payload) VALUES (?, ?, ?, ?)",
+                         (result.get("model"), result.get("collection"), result.get("timestamp"),
+                          json.dumps(result)))
+
+    def find_results(self, model=None, collection=None, limit=20):
+        conditions, params = [], []
+        if model:
+            conditions.append("model = ?")
+            params.append(model)
+        if collection:
+            conditions.append("collection = ?")
+            params.append(collection)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT payload FROM results {where} ORDER BY timestamp DESC LIMIT ?",
+                                (*params, limit))
+            return [json.loads(payload) for payload, in rows]
+
+
+STORAGE_BACKENDS = {
+    "mongo": MongoBackend,
+    "sqlite": SQLiteBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def _storage(backend: str, db_name: Optional[str]) -> StorageBackend:
+    # ένα instance ανά (backend, db_name) και process: το makedirs και το schema της SQLite τρέχουν
+    # μία φορά (όπως το ensure_indexes της Mongo) και όχι σε κάθε request του API
+    if backend == "sqlite":
+        return SQLiteBackend(db_name or SQLITE_PATH)
+    return MongoBackend(db_name)
+
+
+def get_storage(backend: Optional[str] = None, db_name: Optional[str] = None) -> StorageBackend:
+    """
+    Επιστρέφει το storage backend (default: IRLIB_STORAGE). Το instance δημιουργείται μία φορά
+    ανά (backend, db_name) και μοιράζεται: τα backends δεν κρατούν συνδέσεις ανά κλήση.
+
+    Args:
+        backend: "mongo" ή "sqlite".
+        db_name: Όνομα βάσης της MongoDB ή αρχείο της SQLite (override).
+    """
+    backend = (backend or STORAGE_BACKEND).lower()
+    if backend not in STORAGE_BACKENDS:
+        raise KeyError(f"Storage backend '{backend}' not found. Available: {list(STORAGE_BACKENDS.keys())}")
+    return _storage(backend, db_name)
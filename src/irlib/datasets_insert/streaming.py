@@ -0,0 +1,125 @@
+# src/irlib/datasets_insert/streaming.py
+"""
+Streaming ingest: parsers που κάνουν yield documents / queries / qrels (ένα-ένα, χωρίς λίστες
+ολόκληρης της συλλογής), παράλληλο διάβασμα για corpora με ένα αρχείο ανά έγγραφο, και
+αναφορά προόδου / throughput. Η εγγραφή γίνεται από το storage backend σε chunks.
+
+Παράδειγμα:
+    ingest_stream(
+        "CRAN",
+        documents=iter_directory_documents(CRAN_DOCS_DIR, doc_id=lambda p: str(int(p.stem))),
+        queries=iter_line_queries(CRAN_QUERIES_FILE),
+        qrels=iter_line_qrels(CRAN_QRELS_FILE, doc_id=lambda s: str(int(s))),
+        drop_existing=True,
+    )
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from irlib.datasets_insert.storage import CHUNK_SIZE, get_storage
+
+
+def _read_document(path: Path) -> str:
+    # "ένα token ανά γραμμή" -> "μεγάλο string"
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return " ".join(f.read().split())
+
+
+def iter_directory_documents(
+    docs_dir,
+    doc_id: Callable[[Path], str] = lambda path: path.name,
+    workers: int = 8,
+    window: int = 256,
+) -> Iterator[Dict]:
+    """
+    Documents ενός φακέλου με ένα αρχείο ανά έγγραφο (π.χ. collections/CF/docs), με τη σειρά των
+    ονομάτων. Τα αρχεία διαβάζονται παράλληλα από `workers` threads, `window` αρχεία τη φορά,
+    ώστε στη μνήμη να υπάρχουν το πολύ `window` κείμενα.
+
+    Args:
+        docs_dir: Ο φάκελος των εγγράφων.
+        doc_id: Συνάρτηση path -> id του εγγράφου (default: το όνομα του αρχείου).
+        workers: Threads ανάγνωσης.
+        window: Αρχεία ανά γύρο παράλληλης ανάγνωσης.
+    """
+    paths = (path for path in sorted(Path(docs_dir).iterdir())
+             # αγνόησε κρυφά / περίεργα αρχεία
+             if path.is_file() and not path.name.startswith("."))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while batch := list(islice(paths, window)):
+            for path, text in zip(batch, pool.map(_read_document, batch)):
+                yield {"id": doc_id(path), "text": text}
+
+
+def iter_line_queries(path) -> Iterator[Dict]:
+    """Ένα query ανά (μη κενή) γραμμή, με ids 1, 2, ... (μορφή CRAN / NPL)."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        idx = 0
+        for line in f:
+            if line.strip():
+                idx += 1
+                yield {"id": str(idx), "text": line.strip()}
+
+
+def iter_line_qrels(path, doc_id: Callable[[str], str] = str.strip) -> Iterator[Dict]:
+    """
+    Μια λίστα σχετικών doc ids ανά (μη κενή) γραμμή, ευθυγραμμισμένη με τα queries (μορφή CRAN / NPL).
+    Binary relevance: κάθε έγγραφο της γραμμής παίρνει relevance 1.
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        idx = 0
+        for line in f:
+            if not line.strip():
+                continue
+            idx += 1
+            for doc_str in line.split():
+                yield {"query_id": str(idx), "doc_id": doc_id(doc_str), "relevance": 1}
+
+
+def with_progress(items: Iterable[Dict], label: str, report_every: int = 1000) -> Iterator[Dict]:
+    """Περνάει τα items αυτούσια και τυπώνει πλήθος και throughput κάθε `report_every` items και στο τέλος."""
+    start = time.time()
+    count = 0
+    for item in items:
+        count += 1
+        if report_every and count % report_every == 0:
+            elapsed = time.time() - start
+            print(f"  [ingest] {label}: {count} ({count / max(elapsed, 1e-9):.1f}/s)")
+        yield item
+    elapsed = time.time() - start
+    print(f"  [ingest] {label}: {count} σε {elapsed:.2f}s ({count / max(elapsed, 1e-9):.1f}/s)")
+
+
+def ingest_stream(
+    collection_name: str,
+    documents: Iterable[Dict],
+    queries: Iterable[Dict],
+    qrels: Iterable[Dict],
+    db_name: Optional[str] = None,
+    drop_existing: bool = False,
+    upsert: bool = False,
+    chunk_size: int = CHUNK_SIZE,
+    report_every: int = 1000,
+    backend: Optional[str] = None,
+):
+    """
+    Streaming εκδοχή της ingest_collection: οι πηγές (generators) καταναλώνονται μία-μία και
+    γράφονται σε chunks των chunk_size, με αναφορά προόδου. Η μνήμη δεν εξαρτάται από το
+    μέγεθος της συλλογής. Γράφει στο storage backend `backend` (default: IRLIB_STORAGE).
+    """
+    start = time.time()
+    result = get_storage(backend, db_name).ingest_collection(
+        collection_name,
+        with_progress(documents, "Documents", report_every),
+        with_progress(queries, "Queries", report_every),
+        with_progress(qrels, "Qrels", report_every),
+        drop_existing=drop_existing,
+        upsert=upsert,
+        chunk_size=chunk_size,
+    )
+    print(f"  [ingest] '{collection_name}' ολοκληρώθηκε σε {time.time() - start:.2f}s")
+    return result
@@ -1,28 +1,28 @@
-try:
-    from rank_bm25 import BM25Okapi
-except ModuleNotFoundError:
-    from os import system
-
-    system("pip install rank_bm25")
+from numpy import array
 
 from models.Model import Model
-from utilities.document_utls import calc_precision_recall, evaluate_bm25_score
-
+from utilities.bm25 import BM25Index
+from utilities.document_utls import calc_precision_recall
+from utilities.impact_index import DEFAULT_TOP_K, ImpactIndex
+from utilities.term_matrix import get_term_matrix
 
-def dubg(a, b):
-    cnt = 0
-    nq = 0
-    for item in a:
-        print(item.doc_id)
-        if item.terms != b[cnt]:
-            nq +=1
-            print(F"counter = {cnt} and doc_id = {item.doc_id}")
-            cnt+=1
-        cnt+=1
+RETRIEVAL_MODES = ("exhaustive", "maxscore")
 
 
 class BM25Model(Model):
-
+    """
+    BM25 ranking over the sparse document-term matrix of the collection (utilities.bm25).
+
+    Args:
+        collection: The collection to be searched.
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization.
+        variant (str): 'okapi', 'bm25l' or 'bm25+'.
+        delta (float | None): Lower bound of BM25L / BM25+ (defaults 0.5 / 1).
+        retrieval (str): 'exhaustive' scores every document with sparse products, 'maxscore' retrieves
+            the exact top-k through an impact-ordered index with dynamic pruning (only documents with
+            a positive score are ranked; k=None retrieves the top DEFAULT_TOP_K).
+    """
 
     def get_model(self):
         return self.__class__.__name__
@@ -31,14 +31,22 @@ class BM25Model(Model):
         pass
 
     def _vectorizer(self, **kwargs):
-        text = kwargs['Text']
-        #print(text)
-        bm25 = BM25Okapi(text)
-        return bm25
+        return BM25Index(kwargs['TermMatrix'], k1=self.k1, b=self.b, variant=self.variant, delta=self.delta)
 
-    def __init__(self, collection):
+    def __init__(self, collection, k1=1.5, b=0.75, variant="okapi", delta=None, retrieval="exhaustive"):
         super().__init__(collection)
-
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{retrieval}', expected one of {RETRIEVAL_MODES}")
+        self.k1 = k1
+        self.b = b
+        self.variant = variant
+        self.delta = delta
+        self.retrieval = retrieval
+        self.impact_index = None
+        # queries χωρίς stopwords της τελευταίας fit (maxscore), τα self._queries μένουν ως έχουν
+        self._maxscore_queries = []
+        # postings in the query lists / postings scored, summed over the queries (maxscore)
+        self.pruning_stats = {"postings": 0, "scored": 0}
 
     # προσθήκη stopwords parameter για συμβατότητα με runner
     def fit(self, queries=None, min_freq=None, stopwords=False):
@@ -52,38 +60,53 @@ class BM25Model(Model):
                 for q in queries
             ]
 
-        prev_doc = self.collection.docs[0]
-        text = [prev_doc.terms]
-        for doc in self.collection.docs[1:]:
-            # print(doc)
-            # handle missing files with empty text ""
-            if doc.doc_id != prev_doc.doc_id + 1:
-                text.append("")
-                #print(len(text))
-                #print(f"doc id:{doc.doc_id} and prev {prev_doc.doc_id}")
-
-            text.append(doc.terms)
-            prev_doc = doc
+        term_matrix = get_term_matrix(self.collection)
+        # bag-of-words πίνακας των queries (queries x terms)
+        self._queryVectors = term_matrix.query_matrix(queries)
+        # προϋπολογισμένα saturated βάρη (docs x terms)
+        self._docVectors = self._vectorizer(TermMatrix=term_matrix)
 
-        self._queryVectors = queries
-        #dubg(self.collection.docs, text)
-        # print(self._queryVectors)
-        self._docVectors = self._vectorizer(Text=text)
+        if self.retrieval == "maxscore":
+            self._maxscore_queries = queries
+            self.impact_index = self._impact_index(term_matrix)
 
         return self
 
+    def _impact_index(self, term_matrix):
+        # impacts από το inverted index: τα ίδια BM25 βάρη με τον sparse πίνακα
+        row_of = {doc_id: row for row, doc_id in enumerate(term_matrix.doc_ids.tolist())}
+
+        def impact(term, doc_ids, tfs):
+            rows = [row_of[doc_id] for doc_id in doc_ids]
+            return self._docVectors.term_impacts(term_matrix.vocabulary[term], rows, array(tfs, dtype=float))
+
+        return ImpactIndex(self.collection.inverted_index, impact)
+
+    def _maxscore_rankings(self, k):
+        k = DEFAULT_TOP_K if k is None else k
+        self.pruning_stats = {"postings": 0, "scored": 0}
+        rankings = []
+        for q in self._maxscore_queries:
+            results = self.impact_index.search(q, k)
+            for key in self.pruning_stats:
+                self.pruning_stats[key] += self.impact_index.last_stats[key]
+            rankings.append(([doc_id for doc_id, _ in results], [score for _, score in results]))
+        return rankings
+
     def evaluate(self, k=None):
-        # print(len(self._queryVectors))
-        # print(self._queryVectors)
-        for j, q in enumerate(self._queryVectors):
-            document_similarities = evaluate_bm25_score(q, self._docVectors)
-            #print(len(document_similarities.keys()))
-            self.ranking.append(list(document_similarities.keys()))
-            if k is None: k = len(list(document_similarities.keys()))
-            print(k)
-            # print(f"j:{j}, {len(self.collection.relevant[j])}")
-            pre, rec, mrr = calc_precision_recall(document_similarities.keys(), self.collection.relevant[j], k)
+        # όλα τα queries σε batches, top-k απευθείας (k=None -> πλήρης κατάταξη, maxscore: DEFAULT_TOP_K)
+        if self.retrieval == "maxscore":
+            rankings = self._maxscore_rankings(k)
+        else:
+            rankings = self._docVectors.top_k(self._queryVectors, k)
+        for j, (doc_ids, _) in enumerate(rankings):
+            ranked = list(doc_ids)
+            self.ranking.append(ranked)
+            cutoff = k if k is not None else len(ranked)
+            pre, rec, mrr = calc_precision_recall(ranked, self.collection.relevant[j], cutoff)
             self.precision.append(pre)
             self.recall.append(rec)
-            # if j > 0: break
+        if self.retrieval == "maxscore" and self.pruning_stats["postings"]:
+            print(f"[{self.get_model()}] MaxScore scored {self.pruning_stats['scored']} of "
+                  f"{self.pruning_stats['postings']} postings")
         return self
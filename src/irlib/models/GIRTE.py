@@ -3,7 +3,6 @@ from time import time
 from pickle import load, dump
 
 from numpy import array, dot, fill_diagonal, zeros
-from networkx import Graph, set_node_attributes
 from tqdm import tqdm
 from nltk.corpus import stopwords as nltk_sw
 import nltk
@@ -16,7 +15,7 @@ from models.GSB import GSBModel
 from models.Model import Model
 from Preprocess.Tok_Document import TokDocument
 from Preprocess.Tok_Collection import TokCollection
-from utilities.apriori import apriori
+from utilities.miners import get_miner
 
 # Path : Folder for storing collection, tensor and matrix data.
 default_path = 'C:/picklejar'
@@ -79,60 +78,33 @@ class GIRTEModel(GSBModel):
 
     # Union Graph generation function for models of the TokenizedGSB family.
     def union_graph(self):
-        union = Graph()
+        # nodes are the token ids of the token index (TokCollection.bind_docs), read directly
+        edges = {}
         matrice_dictionary = self._load_matrices()
         print('Building union graph...')
         for document in tqdm(self.collection.docs):
-            tokens = list(document.tf.keys())
             adj_matrix = matrice_dictionary[document.doc_id]
-            kcore = []
-            # Iterate over rows
-            for i in range(adj_matrix.shape[0]):
-                h = self.h if tokens[i] in kcore and self.k_core_bool else 1
-                # Iterate over columns
-                for j in range(adj_matrix.shape[1]):
-                    if i >= j:
-                        if union.has_edge(tokens[i], tokens[j]):
-                            union[tokens[i]][tokens[j]]['weight'] += (adj_matrix[i, j] * h)
-                        else:
-                            if adj_matrix[i][j] > 0:
-                                union.add_edge(tokens[i], tokens[j], weight=adj_matrix[i, j])
-        w_in = {n: union.get_edge_data(n, n)['weight'] for n in union.nodes()}
-        set_node_attributes(union, w_in, 'weight')
-        for n in union.nodes: union.remove_edge(n, n)
-        return union
+            self._add_doc_edges(edges, document.token_ids, adj_matrix, threshold=0)
+        return self._edges_to_graph(edges)
     
 
     # Union Graph generation function for models of the GIRTE family.
     def union_graph_tensor(self, theta=0):
-        union = Graph()
+        # nodes are the token ids of the token index (TokCollection.bind_docs), read directly
+        edges = {}
         matrice_dictionary = self._load_matrices()
         print('Building union graph...')
         for document in tqdm(self.collection.docs):
-            tokens = list(document.tf.keys())
             adj_matrix = matrice_dictionary[document.doc_id]
-            kcore = []
-            # Iterate over rows
-            for i in range(adj_matrix.shape[0]):
-                h = self.h if tokens[i] in kcore and self.k_core_bool else 1
-                # Iterate over columns
-                for j in range(adj_matrix.shape[1]):
-                    if i >= j:
-                        if union.has_edge(tokens[i], tokens[j]):
-                            union[tokens[i]][tokens[j]]['weight'] += (adj_matrix[i, j] * h)
-                        else:
-                            if adj_matrix[i][j] > theta:
-                                union.add_edge(tokens[i], tokens[j], weight=adj_matrix[i, j])
-        w_in = {n: union.get_edge_data(n, n)['weight'] for n in union.nodes()}
-        set_node_attributes(union, w_in, 'weight')
-        # Delete Self-Edges
-        for n in union.nodes: union.remove_edge(n, n)
-        return union
+            # Edges are only created above theta
+            self._add_doc_edges(edges, document.token_ids, adj_matrix, threshold=theta)
+        return self._edges_to_graph(edges)
 
 
     # Document ranking function for queries. Used for both TokenizedGSB and GIRTE Models.
-    def fit(self, term_queries=None, min_freq=1, stopwords=True):
+    def fit(self, term_queries=None, min_freq=1, stopwords=True, limits=None, miner=None):
         tokenizer = BertTokenizer.from_pretrained(f'bert-{self._bert}-uncased')
+        miner = get_miner(miner)
         if term_queries is None:
             term_queries = self._queries
         token_queries = []
@@ -155,6 +127,8 @@ class GIRTEModel(GSBModel):
             tokenized_query = tokenizer.convert_ids_to_tokens(encoding['input_ids'], skip_special_tokens=True)
             token_queries.append(tokenized_query)
         inverted_index = self.collection.inverted_index
+        if self.termset_cache is not None:
+            self.termset_cache.validate(self.collection)
         if __debug__:
             print(f'Processing {len(token_queries)} Queries')
         print('Ranking queries...')
@@ -164,7 +138,8 @@ class GIRTEModel(GSBModel):
                 text = ' '.join(query)
                 print(f'Q{i}: (Len = {len(query)}) {text}')
                 apriori_start = time()
-            freq_termsets = apriori(query, inverted_index, min_freq)
+            freq_termsets = miner(query, inverted_index, min_freq, self.termset_cache, limits)
+            self.truncated.append(freq_termsets.truncated)
             if __debug__:
                 qvectors_start = time()
             self._queryVectors.append(self.calculate_ts_idf(freq_termsets))
@@ -177,6 +152,8 @@ class GIRTEModel(GSBModel):
             if __debug__:
                 print(f'Q{i} Apriori: {(qvectors_start - apriori_start):.2f}\tQvectors: {(dvectors_start - qvectors_start):.2f}\tDvectors: {(time_end - dvectors_start):.2f}\tTotal: {(time_end-apriori_start):.2f}')
             # print(f'{(time() - start_timer):.4f}')
+        if self.termset_cache is not None:
+            print(self.termset_cache.report())
         return self
 
     def _load_matrices(self) -> dict[int, array]:
@@ -185,6 +162,9 @@ class GIRTEModel(GSBModel):
 
         # 2. Add the collection name into the saved file path!
         load_path = f'C:/picklejar/matrices/mat.{col_name}.{self._bert}.{self._stopwords}.{self._method}'
+        if self._method == 'tf':
+            # token frequency matrices (older files were built from the term frequencies)
+            load_path += '.tok'
 
         try:
             # Load matrices from disk, if it already exists for THIS collection.
@@ -216,7 +196,8 @@ class GIRTEModel(GSBModel):
     
     def _doc_to_matrix(self, document: TokDocument) -> array:
     #Generate adjacency matrix of a given document based on token frequency.
-        rows = array(list(document.tf.values()))
+        # (rows in the order of token_frequency, i.e. of the document's token_ids)
+        rows = array(list(document.token_frequency.values()))
         row = rows.reshape(1, rows.shape[0]).T
         col = rows.reshape(rows.shape[0], 1).T
         adj_matrix = dot(row, col)
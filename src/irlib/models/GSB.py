@@ -1,8 +1,8 @@
 import time
 from math import log2
 
-from networkx import Graph, set_node_attributes, get_node_attributes,  k_core, selfloop_edges
-from numpy import dot, fill_diagonal, array, zeros, float64, ndarray
+from networkx import Graph, get_node_attributes,  k_core, selfloop_edges
+from numpy import dot, fill_diagonal, array, zeros, ones, float64, ndarray
 from models.Model import Model
 from utilities.document_utls import calc_average_edge_w, prune_matrix, adj_to_graph, nodes_to_terms
 
@@ -48,15 +48,12 @@ class GSBModel(Model):
 
     def _model_func(self, freq_termsets: Any) -> ndarray:
         tns = zeros(len(freq_termsets), dtype=float)
-        inverted_index = self.collection.inverted_index
+        nwk = self._nwk
         for i, termset in enumerate(freq_termsets):
             temp = 1
-            for term in termset:
-                if term in inverted_index:
-                    # Use .get() to safely pull 'nwk'. Default to 1 (or 0) if missing.
-                    # I am using 1 so it doesn't zero out the multiplication (temp *= 1)
-                    nwk_score = inverted_index[term].get('nwk', 1.0)
-                    temp *= nwk_score
+            for term_id in termset:
+                # terms outside the graph keep the default nwk of 1, so they don't zero out the product
+                temp *= nwk[term_id]
             tns[i] = round(temp, 3)
         return tns
 
@@ -80,9 +77,10 @@ class GSBModel(Model):
     def get_model(self) ->str:
         return self.__class__.__name__
 
-    def doc_to_matrix(self, document):
-        # get list of term frequencies
-        rows = array(list(document.tf.values()))
+    def doc_to_matrix(self, document, doc_tf=None):
+        # get list of term frequencies (doc_tf: document.id_tf already computed by the caller)
+        doc_tf = document.id_tf if doc_tf is None else doc_tf
+        rows = array(list(doc_tf.values()))
         # reshape list to column and row vector
 
         row = rows.reshape(1, rows.shape[0]).T
@@ -95,33 +93,53 @@ class GSBModel(Model):
         return adj_matrix
 
     def union_graph(self) ->Graph:
-        union = Graph()
+        # nodes are the term ids of the collection vocabulary, which the documents are encoded against
+        # (see Collection.get_vocabulary): the graph is built without any term string
+        edges = {}
         for doc in self.collection.docs:
-            terms = list(doc.tf.keys())
-            adj_matrix = self.doc_to_matrix(doc)
-            kcore = []
+            # id_tf is counted on the document's term ids on every access, so get it once
+            doc_tf = doc.id_tf
+            terms = list(doc_tf)
+            adj_matrix = self.doc_to_matrix(doc, doc_tf)
+            h = None
             if self.k_core_bool:
                 if self.model == "GSBModel":
                     thres_edge_weight = self.p * calc_average_edge_w(adj_matrix)
                     adj_matrix = prune_matrix(adj_matrix,thres_edge_weight)
                 g = adj_to_graph(adj_matrix)
                 maincore = self.kcore_nodes(g)
-                kcore = nodes_to_terms(terms, maincore)
-
-            # iterate through lower triangular matrix
-            for i in range(adj_matrix.shape[0]):
+                kcore = set(nodes_to_terms(terms, maincore))
                 # gain value of importance
-                h = self.h if terms[i] in kcore and self.k_core_bool else 1
-                for j in range(adj_matrix.shape[1]):
-                    if i >= j:
-                        if union.has_edge(terms[i], terms[j]):
-                            union[terms[i]][terms[j]]['weight'] += (adj_matrix[i][j] * h)  # += Wout
-                        else:
-                            if adj_matrix[i][j] > 0:
-                                union.add_edge(terms[i], terms[j], weight=adj_matrix[i][j] * h)
-        w_in = {n: union.get_edge_data(n, n)['weight'] for n in union.nodes()}
-        set_node_attributes(union, w_in, 'weight')
-        for n in union.nodes: union.remove_edge(n, n)
+                h = [self.h if term in kcore else 1 for term in terms]
+            self._add_doc_edges(edges, terms, adj_matrix, h)
+        return self._edges_to_graph(edges)
+
+    @staticmethod
+    def _add_doc_edges(edges, terms, adj_matrix, h=None, threshold=0):
+        """
+        Adds the lower triangular matrix of a document to the union graph edges {(u, v): weight}
+        (u >= v, self-loops included). The weight of an existing edge grows by adj[i][j] * h[i],
+        a new edge is only created when adj[i][j] > threshold.
+        """
+        for i, row in enumerate(adj_matrix.tolist()):
+            u = terms[i]
+            h_i = h[i] if h is not None else 1
+            for j in range(i + 1):
+                v = terms[j]
+                edge = (u, v) if u >= v else (v, u)
+                weight = edges.get(edge)
+                if weight is not None:
+                    edges[edge] = weight + row[j] * h_i  # += Wout
+                elif row[j] > threshold:
+                    edges[edge] = row[j] * h_i
+
+    @staticmethod
+    def _edges_to_graph(edges) -> Graph:
+        # the graph is built once from the summed weights; the self-loops become the node weight (Win)
+        union = Graph()
+        nodes = dict.fromkeys(node for edge in edges for node in edge)
+        union.add_nodes_from((node, {'weight': edges.get((node, node), 0)}) for node in nodes)
+        union.add_weighted_edges_from((u, v, weight) for (u, v), weight in edges.items() if u != v)
         return union
 
     def _calculate_win(self) -> Dict:
@@ -144,7 +162,7 @@ class GSBModel(Model):
         # print(maincore.nodes)
         return maincore.nodes
 
-    def _calculate_nwk(self, a: float = 1, b: float = 10) -> Dict [str, float]: 
+    def _calculate_nwk(self, a: float = 1, b: float = 10) -> ndarray:
         """
         Calculate node weights (nwk) for terms in the union graph.
 
@@ -153,26 +171,26 @@ class GSBModel(Model):
             b (float): Weighting factor for neighbor normalization.
 
         Returns:
-            Dict[str, float]: Mapping of term to nwk score.
+            ndarray: nwk score per term id (1 for the terms that are not in the graph). The scores
+            are also stored as 'nwk' in the inverted index.
         """
-        nwk = {}
+        vocabulary = self.collection.get_vocabulary()
+        entries = self.collection.index_entries()
+        nwk = ones(len(vocabulary))
         Win = self._calculate_win()
         Wout = self._calculate_wout()
         ngb = self._number_of_nbrs()
-        for term in list(Win.keys()):
+        for term_id in list(Win.keys()):
             try:
 
-                f = float64(a * Wout[term] / ((Win[term] + 1) * (ngb[term] + 1)))
-                s = float64(b / (ngb[term] + 1))
+                f = float64(a * Wout[term_id] / ((Win[term_id] + 1) * (ngb[term_id] + 1)))
+                s = float64(b / (ngb[term_id] + 1))
                 score = round(log2(1 + f) * log2(1 + s), 3)
         
             except (ValueError, ZeroDivisionError) as e:
-                print(f"Error calculating nwk for term '{term}': {e}")
+                print(f"Error calculating nwk for term '{vocabulary.term(term_id)}': {e}")
                 score = 0
             
-            nwk[term] = score
-            self.collection.inverted_index[term]['nwk'] = score
+            nwk[term_id] = score
+            entries[term_id]['nwk'] = score
         return nwk
-    
-
-
@@ -1,8 +1,13 @@
 # src/irlib/models/GoW.py
+from os.path import exists
+
 from gowpy.feature_extraction.gow import TwidfVectorizer
+from sklearn.preprocessing import normalize
 
 from models.Model import Model
-from utilities.document_utls import cosine_similarity, calc_precision_recall
+from utilities.disk_cache import collection_fingerprint, cache_file, save_object, load_object
+from utilities.document_utls import calc_precision_recall
+from utilities.term_matrix import top_k_rows
 from typing import Optional, Any
 from numpy import array, ndarray
 
@@ -10,6 +15,11 @@ from numpy import array, ndarray
 class Gow(Model):
     """
     Graph-of-Words based information retrieval model using TwidfVectorizer from gowpy.
+
+    The vectorizer is fitted on the documents only (`index()`) and its sparse, L2-normalized TW-IDF
+    document matrix is kept on the collection (collection.doc_vectors) and persisted on disk, keyed by
+    collection fingerprint and vectorizer parameters, so later fits only run `transform_queries()`.
+    The cosine similarities of all queries are one sparse product, followed by a top-k selection.
     """
     def __init__(self,
                  collection,
@@ -17,7 +27,10 @@ class Gow(Model):
                  isdirected: bool = False,
                  min_dfreq: float = 0.0,
                  max_dfreq: float = 1.0,
-                 term_weighting_scheme: str = 'degree'):
+                 term_weighting_scheme: str = 'degree',
+                 cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir
+        self.params = ("gow", window, isdirected, min_dfreq, max_dfreq, term_weighting_scheme)
         self.vectorizer = TwidfVectorizer(
             directed=isdirected,
             window_size=window,
@@ -36,15 +49,42 @@ class Gow(Model):
     def _vectorizer(self, tsf_ij: ndarray, idf: ndarray, *args: Any) -> ndarray:
         raise NotImplementedError("Gow model does not implement _vectorizer directly, use _generate_vectors instead.")
 
-    def _generate_vectors(self, **kwargs) -> tuple[ndarray, ndarray]:
+    def index(self) -> "Gow":
+        """
+        Collection side of the model: fits the TW-IDF vectorizer on the documents and keeps the
+        L2-normalized document matrix. Reused from memory or disk when nothing has changed.
+        """
+        cached = self.collection.doc_vectors.get(self.params)
+        if cached is None:
+            doc_ids = [doc.doc_id for doc in self.collection.docs]
+            doc_texts = [" ".join(doc.terms) for doc in self.collection.docs]
+            path = cache_file("gow", collection_fingerprint(doc_ids, doc_texts), *self.params[1:], ext="pkl",
+                              root=self.cache_dir)
+            if exists(path):
+                print(f"[GoW] Loading the TW-IDF document vectors from {path}")
+                cached = load_object(path)
+            else:
+                print(f"[GoW] Fitting TW-IDF on {len(doc_texts)} docs...")
+                cached = (self.vectorizer, normalize(self.vectorizer.fit_transform(doc_texts).tocsr()))
+                save_object(path, cached)
+            self.collection.doc_vectors[self.params] = cached
+
+        self.vectorizer, self._docVectors = cached
+        return self
+
+    def transform_queries(self, text: list):
+        """TW-IDF vectors of the query texts with the fitted vectorizer, rows L2-normalized."""
+        # rows L2-normalized once: the cosine similarity is a plain dot product
+        return normalize(self.vectorizer.transform(text).tocsr())
+
+    def _generate_vectors(self, **kwargs) -> tuple[Any, Any]:
         text = kwargs.get('Text')
         if not text or not isinstance(text, list):
             raise ValueError("Text must be provided as a list of strings.")
 
-        vec = self.vectorizer.fit_transform(text).todense()
-        qv = vec[self.collection.num_docs:]
-        dv = vec[:self.collection.num_docs]
-        return qv, dv
+        # cheap after the first call: the collection side is reused from collection.doc_vectors
+        self.index()
+        return self.transform_queries(text), self._docVectors
 
     # ΑΛΛΑΓΗ 1: queries=None default + stopwords parameter για συμβατότητα με API/runner
     def fit(self, queries=None, min_freq=None, stopwords=False, *args, **kwargs) -> "Gow":
@@ -62,42 +102,26 @@ class Gow(Model):
         if not isinstance(queries, list) or not all(isinstance(q, list) for q in queries):
             raise ValueError("Expected 'queries' to be a list of lists of strings.")
 
-        print(f"[GoW] Building corpus from {len(self.collection.docs)} docs + {len(queries)} queries...")
-
-        prev_doc = self.collection.docs[0]
-        text = [" ".join(prev_doc.terms)]
-        for doc in self.collection.docs[1:]:
-            if doc.doc_id != prev_doc.doc_id + 1:
-                text.append(" ")
-                print(f"  [GoW] gap: doc_id={doc.doc_id}, prev={prev_doc.doc_id}")
-            text.append(" ".join(doc.terms))
-            prev_doc = doc
-
-        for q in queries:
-            text.append(" ".join(q))
+        text = [" ".join(q) for q in queries]
 
         self._queryVectors, self._docVectors = self._generate_vectors(Text=text)
         return self
 
-    def evaluate(self, k=None) -> tuple[ndarray, ndarray]:
-        for j, q in enumerate(self._queryVectors):
-            eval_list = []
-            for i in range(len(self._docVectors)):
-                score = cosine_similarity(q, self._docVectors[i, :].transpose())
-                eval_list.append((i, float(score)))
-
-            eval_list = sorted(eval_list, key=lambda x: x[1], reverse=True)
-
-            # ΑΛΛΑΓΗ 3: +1 για 1-based doc_ids — ώστε να ταιριάζει με το relevant[]
-            # (το relevant έχει [139, 1222, ...] ενώ το i είναι 0-based index)
-            ordered_docs = [tup[0] + 1 for tup in eval_list]
-
-            self.ranking.append(ordered_docs)
-            if k is None:
-                k = len(ordered_docs)
-
-            pre, rec, mrr = calc_precision_recall(ordered_docs, self.collection.relevant[j], k)
-            self.precision.append(pre)
-            self.recall.append(rec)
+    def evaluate(self, k=None, batch_size=256) -> tuple[ndarray, ndarray]:
+        # τα πραγματικά doc_ids των γραμμών του πίνακα εγγράφων (όχι θέση + 1)
+        doc_ids = array([doc.doc_id for doc in self.collection.docs])
+        top = len(doc_ids) if k is None else k
+
+        for start in range(0, self._queryVectors.shape[0], batch_size):
+            # cosine similarities του batch με όλα τα έγγραφα: ένα sparse γινόμενο
+            scores = (self._queryVectors[start:start + batch_size] @ self._docVectors.T).toarray()
+            for j, (ranked, _) in enumerate(top_k_rows(scores, doc_ids, top), start):
+                ordered_docs = ranked.tolist()
+                self.ranking.append(ordered_docs)
+
+                cutoff = k if k is not None else len(ordered_docs)
+                pre, rec, mrr = calc_precision_recall(ordered_docs, self.collection.relevant[j], cutoff)
+                self.precision.append(pre)
+                self.recall.append(rec)
 
         return array(self.precision), array(self.recall)
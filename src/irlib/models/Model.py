@@ -1,13 +1,17 @@
+import tracemalloc
 from abc import ABC, abstractmethod
-from math import log2
 from time import time
 
 from numpy import array, zeros
 
 from pandas import DataFrame
+from scipy.sparse import issparse
 
 from utilities.document_utls import evaluate_sim, calc_precision_recall, write_list
-from utilities.apriori import apriori
+from utilities.intersection import sorted_doc_ids
+from utilities.miners import get_miner
+from utilities.query_planner import QueryBatchPlanner, term_postings_of, termset_idf, termset_tsf
+from utilities.termset_cache import TermsetCache
 
 from typing import Any
 import numpy as np
@@ -49,6 +53,10 @@ class Model(ABC):
         self.recall = []
         # model_document_ranking
         self.ranking = []
+        # covers, idf and tsf rows of the termsets, shared by all queries (None disables it)
+        self.termset_cache = TermsetCache()
+        # per query: why the termset mining was cut short by its limits (None if it was not)
+        self.truncated = []
 
     @abstractmethod
     def get_model(self):
@@ -77,10 +85,21 @@ class Model(ABC):
 
 
 
-    def fit(self, queries=None, min_freq=1,stopwords = False):
+    def fit(self, queries=None, min_freq=1,stopwords = False, limits=None, miner=None):
+        """
+        limits (`AprioriLimits`, defaults to `None`) bounds the termset mining of every query, e.g.
+        AprioriLimits(max_size=4, max_candidates=100_000, time_budget=30); the queries that were
+        cut short are listed in `self.truncated`.
+        miner (`str` or `callable`, defaults to `apriori`) mines the termsets of a query: a name of
+        utilities.miners.MINERS ('apriori', 'eclat', 'closed') or a function with the signature
+        of apriori.
+        """
         if queries is None:
             queries = self._queries
+        miner = get_miner(miner)
         inverted_index = self.collection.inverted_index
+        if self.termset_cache is not None:
+            self.termset_cache.validate(self.collection)
         for i, query in enumerate(queries, start=1):
             if stopwords:
                 query = [word for word in query if word not in self.collection.stopwords]
@@ -88,9 +107,12 @@ class Model(ABC):
             print(f"\nQuery {i} of {len(queries)}")
             print(f"Query length: {len(query)}")
             apriori_start = time()
-            freq_termsets = apriori(query, inverted_index, min_freq)
+            freq_termsets = miner(query, inverted_index, min_freq, self.termset_cache, limits)
             apriori_end = time()
+            self.truncated.append(freq_termsets.truncated)
             print(f"Frequent Termsets: {len(freq_termsets)}")
+            if freq_termsets.truncated:
+                print(f"Apriori truncated ({freq_termsets.truncated}), min_freq = {freq_termsets.min_freq}")
             print(f"Apriori iter {i} took {apriori_end - apriori_start} secs.")
 
             # write_list(freq_termsets,"freq_term_7.csv")
@@ -104,11 +126,42 @@ class Model(ABC):
             self._docVectors.append(self.calculate_tsf(freq_termsets))
             self._weights.append(self._model_func(freq_termsets))
             # if i >= 2: break
+        if self.termset_cache is not None:
+            print(self.termset_cache.report())
+        return self
+
+    def fit_batch(self, queries=None, min_freq=1, stopwords=False, workers=None, limits=None, miner=None):
+        """
+        Same result as fit, planned over the whole batch (see QueryBatchPlanner): the queries are
+        mined across `workers` processes, the data of a termset shared by several queries is
+        computed once, and the document vectors are kept as sparse blocks (made dense one query
+        at a time by evaluate).
+        """
+        if queries is None:
+            queries = self._queries
+        if stopwords:
+            queries = [[word for word in query if word not in self.collection.stopwords] for query in queries]
+        start = time()
+        planner = QueryBatchPlanner(self.collection, min_freq, workers, self.termset_cache, limits,
+                                    miner).plan(queries)
+        print(planner.report())
+        for i, freq_termsets in enumerate(planner.query_termsets):
+            self.truncated.append(freq_termsets.truncated)
+            idf, tsf = planner.query_block(i)
+            self._queryVectors.append(idf)
+            self._docVectors.append(tsf)
+            self._weights.append(self._model_func(freq_termsets))
+        print(f"Batch of {len(queries)} queries took {time() - start:.2f} secs.")
         return self
 
     def calculate_ts_idf(self, termsets):
         # len(value) => in how many documents each termset appears
-        return array([round(log2(1 + (self.collection.num_docs / len(value))), 3) for value in termsets.values()])
+        N = self.collection.num_docs
+        cache = self.termset_cache
+        if cache is None:
+            return array([termset_idf(N, value) for value in termsets.values()])
+        return array([cache.get(termset, 'idf', lambda: termset_idf(N, value))
+                      for termset, value in termsets.items()])
 
     # term set frequency
     def calculate_tsf(self, termsets):
@@ -120,55 +173,116 @@ class Model(ABC):
         # .                  .  .
         # Sj fj1 fj2 fj3 . . . fij
         N = self.collection.num_docs
-        inv_index = self.collection.inverted_index
         tf_ij = zeros((len(termsets), N))
+        # term id -> posting list as (sorted doc ids, tfs) arrays
+        term_postings = term_postings_of(self.collection.index_entries())
+
         # for each termset
         for i, (termset, docs) in enumerate(termsets.items()):
-            # e.x. termset = fronzenset{'t1', 't2', 't3'}
-            terms = list(termset)  # ['t1', 't2', 't3']
-            temp = {}
-            # for each term in the termset
-            for term in terms:
-                post_list = inv_index[term]['posting_list']
-                # for term's id, tf pair
-                for id, tf in post_list:
-                    # if belongs to the intersection of the termset
-                    if id in docs:
-                        # create a dict to hold frequencies for each term of termset
-                        # by taking the min f, we get the termset frequency
-                        if id in temp:
-                            temp[id] += [tf]
-                        else:
-                            temp[id] = [tf]
-            # assign raw termset frequencies
-            for id, tfs in temp.items():
-                tf_ij[i, id - 1] = round((1 + log2(min(tfs))), 3)
+            # e.x. termset = fronzenset{3, 17, 42} (term ids), docs = its sorted cover
+            cover = sorted_doc_ids(docs)
+            if not len(cover):
+                continue
+            # assign raw termset frequencies (the row is sparse: only the cover is cached)
+            if self.termset_cache is None:
+                tf_ij[i, cover - 1] = termset_tsf(termset, cover, term_postings)
+            else:
+                tf_ij[i, cover - 1] = self.termset_cache.get(termset, 'tsf',
+                                                             lambda: termset_tsf(termset, cover, term_postings))
 
         return array(tf_ij)
 
+    def _score_query(self, qv, dv, weights, rel, k):
+        # ranks the documents for one query and appends its ranking and metrics, returns the k used
+        # fit_batch keeps the tsf blocks sparse
+        if issparse(dv):
+            dv = dv.toarray()
+
+        dtsm = self._vectorizer(dv, qv, weights)
+        # print(dtsm)
+        # cosine similarity between query and every document
+        document_similarities = evaluate_sim(qv, dtsm)
+        # print(document_similarities)
+        self.ranking.append(list(document_similarities.keys()))
+        if k is None:
+            k = len(document_similarities.keys())
+            # print(F"k for MODEL is {k}")
+        pre, rec, mrr = calc_precision_recall(document_similarities.keys(), rel, k)
+        self.precision.append(round(pre, 8))
+        self.recall.append(round(rec, 8))
+        return k
+
     def evaluate(self, k=None):
         number_of_queries = len(self._queryVectors)
         # for each query and (dtm, relevant) pair
         for i, (qv, dv, rel) in enumerate(zip(self._queryVectors, self._docVectors, self._relevant)):
-            
-
-            dtsm = self._vectorizer(dv, qv, self._weights[i])
-            # print(dtsm)
-            # print(len(self._docVectors[i][0]))
-            # cosine similarity between query and every document
-            document_similarities = evaluate_sim(qv, dtsm)
-            # print(document_similarities)
-            self.ranking.append(list(document_similarities.keys()))
-            if k is None:
-                k = len(document_similarities.keys())
-                # print(F"k for MODEL is {k}")
-            pre, rec, mrr = calc_precision_recall(document_similarities.keys(), rel, k)
-            print(f"=> Query {i + 1}/{number_of_queries}, precision = {pre:.3f}, recall = {rec:.3f}")
-            self.precision.append(round(pre, 8))
-            self.recall.append(round(rec, 8))
+            k = self._score_query(qv, dv, self._weights[i], rel, k)
+            print(f"=> Query {i + 1}/{number_of_queries}, precision = {self.precision[-1]:.3f}, "
+                  f"recall = {self.recall[-1]:.3f}")
             # if i > 1: break
         return array(self.precision), array(self.recall)
 
+    def stream(self, queries=None, min_freq=1, stopwords=False, k=None, trace_memory=True, limits=None, miner=None,
+               cache=False):
+        """
+        fit and evaluate in one pass, for batches whose matrices do not fit in memory together:
+        every query is scored as soon as its tsf matrix is built and the matrix is dropped right
+        after, so only the rankings and the metrics are kept (not the query / document vectors
+        and weights of fit).
+
+        By default no termset cache is used, so nothing but the rankings and metrics is kept from
+        one query to the next and the peak memory is that of a single query. `cache=True` uses the
+        model's termset_cache (or pass a TermsetCache): faster when the queries share termsets, at
+        the cost of the covers and tsf rows it retains.
+
+        With `trace_memory`, the peak memory of the queries (tracemalloc, which slows the run
+        down) is stored in `self.peak_memory` (bytes of the heaviest query above the memory held
+        before it, i.e. its working set) and printed at the end.
+
+        Returns:
+            (precision, recall) arrays, as evaluate.
+        """
+        if queries is None:
+            queries = self._queries
+        miner = get_miner(miner)
+        inverted_index = self.collection.inverted_index
+        # calculate_ts_idf / calculate_tsf read self.termset_cache: swapped for the run
+        model_cache = self.termset_cache
+        self.termset_cache = model_cache if cache is True else (cache or None)
+        if self.termset_cache is not None:
+            self.termset_cache.validate(self.collection)
+        started = trace_memory and not tracemalloc.is_tracing()
+        if started:
+            tracemalloc.start()
+        self.peak_memory = 0
+        try:
+            for i, query in enumerate(queries):
+                if stopwords:
+                    query = [word for word in query if word not in self.collection.stopwords]
+                if trace_memory:
+                    tracemalloc.reset_peak()
+                    held = tracemalloc.get_traced_memory()[0]
+                freq_termsets = miner(query, inverted_index, min_freq, self.termset_cache, limits)
+                self.truncated.append(freq_termsets.truncated)
+                k = self._score_query(self.calculate_ts_idf(freq_termsets), self.calculate_tsf(freq_termsets),
+                                      self._model_func(freq_termsets), self._relevant[i], k)
+                del freq_termsets
+                if trace_memory:
+                    self.peak_memory = max(self.peak_memory, tracemalloc.get_traced_memory()[1] - held)
+                print(f"=> Query {i + 1}/{len(queries)}, precision = {self.precision[-1]:.3f}, "
+                      f"recall = {self.recall[-1]:.3f}")
+            if self.termset_cache is not None:
+                print(self.termset_cache.report())
+        finally:
+            if started:
+                tracemalloc.stop()
+            self.termset_cache = model_cache
+        if trace_memory:
+            print(f"Peak memory of a query: {self.peak_memory / 2 ** 20:.1f} MB")
+        if any(self.truncated):
+            print(f"Apriori truncated on {sum(map(bool, self.truncated))} of {len(self.truncated)} queries")
+        return array(self.precision), array(self.recall)
+
     def results_to_df(self):
         df = DataFrame(list(zip(self.precision, self.recall)), columns=["A_pre", "A_rec"])
         return df
@@ -32,15 +32,17 @@ class WindowedGSBModel(GSBModel):
     def get_model(self):
         return self.__class__.__name__
 
-    def doc_to_matrix(self, document):
+    def doc_to_matrix(self, document, doc_tf=None):
         window_size = - 1
+        # windows and counts on the term ids (the graph nodes), taken once per document
+        terms_list = document.term_ids
+        doc_tf = document.id_tf if doc_tf is None else doc_tf
         if isinstance(self.window, int):
             window_size = self.window
         elif isinstance(self.window, float):
-            window_size = int(self.window * len(document.terms))
+            window_size = int(self.window * len(terms_list))
         # Create windowed document (chunking the terms list manually)
         windowed_document = []
-        terms_list = document.terms
 
         for i in range(0, len(terms_list), window_size):
             chunk = terms_list[i: i + window_size]
@@ -48,11 +50,11 @@ class WindowedGSBModel(GSBModel):
             if self.window_cut_off and len(chunk) < window_size:
                 continue
             windowed_document.append(chunk)
-        adj_matrix = zeros(shape=(len(document.tf), len(document.tf)), dtype=int)
+        adj_matrix = zeros(shape=(len(doc_tf), len(doc_tf)), dtype=int)
         for segment in windowed_document:
             w_tf = calculate_tf(segment)
-            for i, term_i in enumerate(document.tf):
-                for j, term_j in enumerate(document.tf):
+            for i, term_i in enumerate(doc_tf):
+                for j, term_j in enumerate(doc_tf):
                     if term_i in w_tf.keys() and term_j in w_tf.keys():
                         if i == j:
                             adj_matrix[i][j] += w_tf[term_i] * (w_tf[term_i] + 1) / 2
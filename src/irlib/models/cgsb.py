@@ -1,13 +1,15 @@
 import numpy as np
 from numpy import zeros
 from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.neighbors import NearestNeighbors
 import networkx as nx
 
+from utilities.document_utls import evaluate_sim
 from utilities.functions import cluster_optimization, cluster_graph, prune_graph
 from utilities.metrics import precision_recall
 from models.GSB import GSBModel as GSB
-from utilities import apriori
+from utilities.eclat import extend_termsets
+from utilities.miners import get_miner
+from utilities.vector_index import build_index
 
 
 class ConGSB(GSB):
@@ -27,6 +29,12 @@ class ConGSB(GSB):
     cond : dict, optional (default={})
         Pruning conditions for the graph. Can specify conditions in the form {'edge': value} or {'sim': value}.
 
+    index : str, optional (default='exact')
+        Vector index backend ('exact', 'ivf', 'hnsw') used to find the expansion terms.
+
+    index_params : dict, optional (default=None)
+        Parameters of the vector index backend.
+
     Attributes:
     -----------
     model : str
@@ -55,6 +63,9 @@ class ConGSB(GSB):
     fit_evaluate(queries: list, relevant: list) -> tuple :
         Perform IR tasks on given queries and evaluate using the precision-recall metric.
 
+    expansion_sweep(queries: list, relevant: list, depths: list) -> dict :
+        fit_evaluate for several expansion depths, mining every depth incrementally.
+
     _cnwk() -> None :
         Calculate the new scalar centroids of NWk for each term in the collection's inverted index.
 
@@ -65,13 +76,17 @@ class ConGSB(GSB):
     def __init__(self, collection, clusters, cond={}, **kwargs):
         super().__init__(collection)
 
-        Valid_args = {"cluster_optimization"}
+        Valid_args = {"cluster_optimization", "index", "index_params"}
         for key in kwargs:
             if key not in Valid_args:
                 raise ValueError(f"Invalid argument {key} provided.")
 
         self.cluster_optimization = kwargs.get("cluster_optimization", False)
         print(f"Cluster optimization is set to {self.cluster_optimization}")
+        self.index_backend = kwargs.get("index", "exact")
+        self.index_params = kwargs.get("index_params") or {}
+        # term embedding index, built on the first query expansion
+        self._term_index = None
         if self.cluster_optimization in {"eigen_gap", "elbow", "silhouette"}:
             self.clusters = cluster_optimization(graph=self.graph, collection=collection,
                                                  method=self.cluster_optimization)
@@ -125,23 +140,26 @@ class ConGSB(GSB):
         # Calculate query point in embedding space by taking the mean
         qv = np.mean(query_embeddings, axis=0)
 
-        # Fit a k-nearest neighbors model on the collection embeddings
-        knn_model = NearestNeighbors(n_neighbors=k, metric="cosine")
-        knn_model.fit(self.embeddings.iloc[:, :-1].values)
+        # Index the collection embeddings once, every query reuses it
+        # (ConGSBWindow skips ConGSB.__init__, hence the getattr defaults)
+        if getattr(self, "_term_index", None) is None:
+            self._term_index = build_index(self.embeddings.iloc[:, :-1].values,
+                                           backend=getattr(self, "index_backend", "exact"),
+                                           **getattr(self, "index_params", {}))
 
         # Find the k-nearest neighbors to the query centroid
-        _, top_k_indices = knn_model.kneighbors(np.array([qv]))
+        _, top_k_indices = self._term_index.search(np.array([qv]), k)
 
-        # Convert the top_k_indices array to a 1D array
-        top_k_indices = top_k_indices[0]
+        # Convert the top_k_indices array to a 1D array (dropping the padding of approximate indexes)
+        top_k_indices = [ind for ind in top_k_indices[0] if ind >= 0]
 
-        col_terms = list(inv_index.keys())
+        vocabulary = self.collection.get_vocabulary()
         # Add the expansion terms to the list preventing duplicates
         expansion_terms.extend(
             [
-                col_terms[k_ind]
+                vocabulary.term(k_ind)
                 for k_ind in top_k_indices
-                if col_terms[k_ind] not in query
+                if vocabulary.term(k_ind) not in query
             ]
         )
 
@@ -209,12 +227,12 @@ class ConGSB(GSB):
             query_cluster = self.embeddings.iloc[np.argmax(similarities)]["labels"]
 
             # Find terms from the collection that belong to the same cluster as the query terms
+            # (the rows of the embeddings are the term ids, the query terms are compared by id)
+            query_ids = set(indices)
             collection_terms_in_nearest_cluster = [
-                inv_index[term]["id"]
-                for term, cluster in zip(
-                    inv_index.keys(), self.embeddings["labels"].values
-                )
-                if cluster == query_cluster and term not in query
+                term_id
+                for term_id, cluster in enumerate(self.embeddings["labels"].values)
+                if cluster == query_cluster and term_id not in query_ids
             ]
 
             # Calculate the cosine similarity between the query centroid and same cluster terms in the cluster
@@ -227,18 +245,40 @@ class ConGSB(GSB):
             sorted_indices = np.argsort(-query_centroid_similarity[0])
 
             # Add the expansion terms from the nearest cluster(s) to the list, selecting the top 'k' terms
-            col_terms = list(inv_index.keys())
+            vocabulary = self.collection.get_vocabulary()
             for i in sorted_indices[:k]:
-                term = col_terms[collection_terms_in_nearest_cluster[i]]
+                term = vocabulary.term(collection_terms_in_nearest_cluster[i])
                 expansion_terms.append(term)
 
             # Pick 'k' terms from the expansion terms (if 'k' is greater than the number of expansion terms, take all)
             return expansion_terms[:k]
 
-    def fit_evaluate(self, queries, relevants):
+    def _rank(self, freq_termsets, rel):
+        # precision | recall of the ranking of the documents for the frequent termsets of a query
+
+        # vectorized query generated by apriori
+        idf_vec = self.calculate_ts_idf(freq_termsets)  # (1 X len(termsets)) vector
+
+        # vectorized documents generated by apriori query
+        tsf_ij = self.calculate_tsf(freq_termsets)  # (len(termsets) X N) matrix
+
+        # model adjusting weight
+        weights = self._model_func(freq_termsets)
+
+        # document - termset matrix - model balance weight
+        dtsm = self._vectorizer(tsf_ij, idf_vec, weights)
+
+        # cosine similarity between query and every document, in desc order
+        retrieved_docs = evaluate_sim(idf_vec, dtsm)
+
+        # precision | recall of ranking
+        return precision_recall(retrieved_docs.keys(), rel)
+
+    def fit_evaluate(self, queries, relevants, min_freq=1, miner=None):
 
         # inverted index of collection documents
         inv_index = self.collection.inverted_index
+        miner = get_miner(miner)
 
         # for each query
         for i, (query, rel) in enumerate(zip(queries, relevants), start=1):
@@ -247,90 +287,117 @@ class ConGSB(GSB):
             # k = int(len(query)/2)+1 if len(query) > 12 else len(query)
             k = len(query)  # //2 + 1
 
-            query += self.expand_q(query, k)
+            # expanded copy, the caller's query is left as is
+            query = query + self.expand_q(query, k)
             # query += self.expand_q_centroids(query, k)
 
             # apply apriori to find frequent termsets
-            freq_termsets = apriori(query, inv_index, min_freq=1)
+            freq_termsets = miner(query, inv_index, min_freq, self.termset_cache)
 
             print(
                 f"Query {i}/{len(queries)}: len = {len(query)}, frequent = {len(freq_termsets)}"
             )
 
-            # vectorized query generated by apriori
-            idf_vec = self.query2vec(freq_termsets)  # (1 X len(termsets)) vector
-
-            # vectorized documents generated by apriori query
-            tsf_ij = self.termsets2vec(freq_termsets)  # (len(termsets) X N) matrix
-
-            # model adjusting weight
-            weights = self._model_func(freq_termsets)
-
-            # document - termset matrix - model balance weight
-            dtsm = self._vectorizer(tsf_ij, idf_vec, weights)
-
-            # cosine similarity between query and every document
-            qd_sims = self.qd_similarities(idf_vec, dtsm)
+            pre, rec = self._rank(freq_termsets, rel)
 
-            # rank them in desc order
-            retrieved_docs = self.rank_documents(qd_sims)
-
-            # precision | recall of ranking
-            pre, rec = precision_recall(retrieved_docs.keys(), rel)
-
-            print(f"=> Query {i}/{100}, precision = {pre:.3f}, recall = {rec:.3f}")
+            print(f"=> Query {i}/{len(queries)}, precision = {pre:.3f}, recall = {rec:.3f}")
 
             self.precision.append(round(pre, 3))
             self.recall.append(round(rec, 3))
 
         return np.array(self.precision), np.array(self.recall)
 
+    def expansion_sweep(self, queries=None, relevants=None, depths=None, min_freq=1, miner=None):
+        """
+        fit_evaluate for a range of expansion depths k (default 1..len(query) per query). The
+        termsets of the original query are mined once and the lattice of every depth is extended
+        with the expansion terms the next depth adds (extend_termsets), instead of mining every
+        expanded query from scratch. The covers, idf and tsf rows of the termsets shared by the
+        depths are reused through the termset cache.
+
+        Returns:
+            {k: (precision array, recall array)}, one value per query that reaches depth k.
+        """
+        if queries is None:
+            queries = self._queries
+        if relevants is None:
+            relevants = self._relevant
+        inv_index = self.collection.inverted_index
+        miner = get_miner(miner)
+        if self.termset_cache is not None:
+            self.termset_cache.validate(self.collection)
+
+        scores = {}
+        for i, (query, rel) in enumerate(zip(queries, relevants), start=1):
+            base = miner(query, inv_index, min_freq, self.termset_cache)
+            freq_termsets, terms = base, list(query)
+            for k in (depths or range(1, len(query) + 1)):
+                expansion = self.expand_q(query, k)
+                expanded = query + expansion
+                # the neighbours of depth k are those of the previous depth plus new ones (exact index),
+                # otherwise the lattice of the original query is extended
+                if not set(terms) <= set(expanded):
+                    freq_termsets, terms = base, list(query)
+                added = [term for term in expansion if term not in terms]
+                freq_termsets = extend_termsets(freq_termsets, added, inv_index, min_freq, self.termset_cache)
+                terms += added
+
+                pre, rec = self._rank(freq_termsets, rel)
+                precision, recall = scores.setdefault(k, ([], []))
+                precision.append(round(pre, 3))
+                recall.append(round(rec, 3))
+                print(f"Query {i}/{len(queries)}, k = {k}: len = {len(expanded)}, frequent = {len(freq_termsets)}, "
+                      f"precision = {pre:.3f}, recall = {rec:.3f}")
+
+        if self.termset_cache is not None:
+            print(self.termset_cache.report())
+        return {k: (np.array(precision), np.array(recall)) for k, (precision, recall) in scores.items()}
+
     def _cnwk(self):
         # Dictionary to store computed _cnwk values for each cluster
         cluster_cnwk = {}
-
-        for term in self.collection.inverted_index:
+        # Nodes of the graph (term ids) of each cluster
+        cluster_nodes = {}
+        for node, attrs in self.graph.nodes(data=True):
+            cluster_nodes.setdefault(attrs.get("cluster"), []).append(node)
+
+        entries = self.collection.index_entries()
+        # cnwk per term id, terms pruned from the graph get 0
+        self._cnwk_weights = zeros(len(entries), dtype=float)
+        for term_id, entry in enumerate(entries):
             # Skip terms that were pruned from the graph
-            if term not in self.graph.nodes:
-                self.collection.inverted_index[term]["cnwk"] = 0.0
+            if term_id not in self.graph.nodes:
+                entry["cnwk"] = 0.0
                 continue
 
             # Get the cluster of the current term
-            cluster = self.graph.nodes[term]["cluster"]
+            cluster = self.graph.nodes[term_id]["cluster"]
 
             # Check if _cnwk value for the cluster has been computed before
             if cluster not in cluster_cnwk:
-                _cnwk = 0
-                cluster_size = 0
-
-                # Iterate over nodes and compute _cnwk for the cluster
-                for node, attrs in self.graph.nodes(data=True):
-                    if attrs.get("cluster") == cluster:
-                        cluster_size += 1
-                        _cnwk += self.collection.inverted_index[node]["nwk"]
+                nodes = cluster_nodes.get(cluster, [])
 
                 # Compute average _cnwk value for the cluster
-                if cluster_size > 0:
-                    cluster_cnwk[cluster] = round(_cnwk / cluster_size, 3)
+                if nodes:
+                    cluster_cnwk[cluster] = round(sum(self._nwk[node] for node in nodes) / len(nodes), 3)
                 else:
                     cluster_cnwk[cluster] = 0
 
             # Assign the computed _cnwk value to the current term
-            self.collection.inverted_index[term]["cnwk"] = cluster_cnwk[cluster]
+            self._cnwk_weights[term_id] = cluster_cnwk[cluster]
+            entry["cnwk"] = cluster_cnwk[cluster]
 
         return
 
     def _model_func(self, termsets):
 
-        inv_index = self.collection.inverted_index
         tns = zeros(len(termsets), dtype=float)
 
         for i, termset in enumerate(termsets):
             tw = 1
-            for term in termset:
-                if term in inv_index:
-                    # get the cnw of term k and multiply it to total
-                    tw *= inv_index[term]["cnwk"]
+            for term_id in termset:
+                # get the cnw of term k and multiply it to total
+                tw *= self._cnwk_weights[term_id]
             tns[i] = tw
 
         return tns
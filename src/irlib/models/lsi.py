@@ -1,64 +1,112 @@
+from os.path import exists
+
+from sklearn.base import clone
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.decomposition import TruncatedSVD
-from sklearn.metrics.pairwise import cosine_similarity
+from numpy import array, mean
 from models.Model import Model
 from utilities.document_utls import calc_precision_recall
-
-# Κάνουμε import το εργαλείο της βάσης μας
-from irlib.utilities.mongo import get_db
+from utilities.disk_cache import collection_fingerprint, cache_file, save_object, load_object
+from utilities.svd import TextBlocks, fit_tfidf, make_svd
+from utilities.vector_index import build_index, index_stats
 
 
 class LSIModel(Model):
-    def __init__(self, collection):
+    """
+    Latent Semantic Indexing: TF-IDF + TruncatedSVD, documents ranked by cosine similarity in the latent space.
+
+    The collection side (`index()`: fitted TfidfVectorizer, SVD and document embeddings) is kept on
+    the collection and persisted on disk, keyed by collection fingerprint and SVD parameters, so a
+    new fit on the same collection only runs `transform_queries()` and the search.
+
+    Args:
+        collection: The collection to be searched.
+        index (str): Vector index backend used for the cosine search, 'exact', 'ivf' or 'hnsw'.
+        index_params (dict | None): Backend parameters (block_size, n_lists, n_probe, ef_search ...).
+        measure_recall (bool): For approximate indexes, also run an exact search and report recall@k in index_stats.
+        cache_dir (str | None): Root folder of the disk cache (defaults to utilities.disk_cache.default_path).
+        n_components (int): Number of latent dimensions.
+        svd (str): 'truncated' (TruncatedSVD on the whole TF-IDF matrix, built in memory) or
+            'randomized' (utilities.svd.BlockRandomizedSVD out of core: the TF-IDF rows are produced
+            block by block from the texts and the whole matrix is never built).
+        svd_params (dict | None): Backend parameters (n_iter, block_size, n_oversamples ...).
+    """
+
+    def __init__(self, collection, index='exact', index_params=None, measure_recall=False, cache_dir=None,
+                 n_components=100, svd='truncated', svd_params=None):
         super().__init__(collection)
         self.model_name = "LSI"
         self._weights = []
-        # Χρησιμοποιούμε 100 κρυφές διαστάσεις (Latent Topics)
-        self.n_components = 100
+        self.index_backend = index
+        self.index_params = index_params or {}
+        self.measure_recall = measure_recall
+        self.cache_dir = cache_dir
+        self.vector_index = None
+        self.index_stats = None
+        self._doc_ids = None
+        self._doc_embeddings = None
+        self._top_scores = None
+        self._top_indices = None
+        # κρυφές διαστάσεις (Latent Topics), 100 by default
+        self.n_components = n_components
+        self.svd_backend = svd
+        self.svd_params = svd_params or {}
         self.vectorizer = TfidfVectorizer(stop_words='english')
-        self.svd = TruncatedSVD(n_components=self.n_components, random_state=42)
-
-    def fit(self, min_freq=1, stopwords=True):
-        print(f"[{self.model_name}] Φόρτωση {len(self.collection.docs)} εγγράφων στο LSI...")
-
-        # 1. Παίρνουμε τα IDs όπως είναι στη μνήμη (για να ταιριάζουν με τα Qrels)
-        doc_ids = [doc.doc_id for doc in self.collection.docs]
+        self.svd = make_svd(svd, n_components, **self.svd_params)
 
-        # 2. Φέρνουμε τα αυθεντικά κείμενα από τη MongoDB
-        col_name = getattr(self.collection, 'name', 'CRAN')
-        print(f"[{self.model_name}] Ανάκτηση κειμένων από MongoDB (Συλλογή: {col_name})...")
-
-        db = get_db()
-        raw_docs_cursor = db["Documents"].find({"collection": col_name})
-
-        def clean_id(raw_id):
-            """Ασφαλής καθαρισμός IDs από μηδενικά ('0001' -> '1')"""
-            try:
-                return str(int(raw_id))
-            except ValueError:
-                return str(raw_id).strip()
-
-        # Φτιάχνουμε το mapping
-        text_mapping = {clean_id(d["id"]): d["text"] for d in raw_docs_cursor}
-
-        # Τραβάμε τα κείμενα (μετατρέποντας το doc_id σε string ΜΟΝΟ για το dictionary lookup)
-        doc_texts = [text_mapping.get(clean_id(str(doc_id)), "") for doc_id in doc_ids]
+    def _doc_texts(self):
+        # Τα αυθεντικά κείμενα έρχονται από το ίδιο το Collection (καμία επιπλέον πρόσβαση στη βάση)
+        doc_texts = self.collection.raw_texts()
 
         empty_docs = doc_texts.count("")
         if empty_docs > 0:
-            print(f"[ΠΡΟΣΟΧΗ] Το LSI δεν βρήκε κείμενο για {empty_docs} έγγραφα στη βάση!")
-
-        # 3. Βήμα LSI 1: Δημιουργία Πίνακα TF-IDF
-        print(f"[{self.model_name}] Δημιουργία TF-IDF Matrix...")
-        tfidf_matrix = self.vectorizer.fit_transform(doc_texts)
-
-        # 4. Βήμα LSI 2: Μείωση Διαστάσεων (SVD) για εύρεση κρυφών (Latent) Σημασιολογικών εννοιών
-        print(f"[{self.model_name}] Εκτέλεση SVD ({self.n_components} διαστάσεις)...")
-        doc_embeddings = self.svd.fit_transform(tfidf_matrix)
+            print(f"[ΠΡΟΣΟΧΗ] Το LSI δεν βρήκε κείμενο για {empty_docs} έγγραφα!")
+        return doc_texts
+
+    def index(self):
+        """
+        Collection side of LSI: fits TF-IDF + SVD on the documents and builds the vector index.
+        The fitted objects and the document embeddings are reused from memory or disk when the
+        collection and the SVD parameters have not changed.
+        """
+        # Παίρνουμε τα IDs όπως είναι στη μνήμη (για να ταιριάζουν με τα Qrels)
+        doc_ids = [doc.doc_id for doc in self.collection.docs]
+        key = ("lsi", self.svd_backend, self.n_components, *(f"{name}={value}" for name, value in sorted(self.svd_params.items())))
+
+        cached = self.collection.doc_vectors.get(key)
+        if cached is None:
+            doc_texts = self._doc_texts()
+            path = cache_file("lsi", collection_fingerprint(doc_ids, doc_texts), *key[1:], ext="pkl",
+                              root=self.cache_dir)
+            if exists(path):
+                print(f"[{self.model_name}] TF-IDF/SVD από το cache: {path}")
+                cached = load_object(path)
+            else:
+                # Βήμα LSI 1: Δημιουργία Πίνακα TF-IDF. Στο randomized backend ο πίνακας δεν φτιάχνεται
+                # ποτέ ολόκληρος: το vectorizer γίνεται fit από τα document frequencies και οι γραμμές
+                # παράγονται ανά block από τα κείμενα, σε κάθε πέρασμα του SVD
+                if self.svd_backend == "randomized":
+                    print(f"[{self.model_name}] TF-IDF ανά block (out of core)...")
+                    tfidf_matrix = TextBlocks(fit_tfidf(self.vectorizer, doc_texts), doc_texts)
+                else:
+                    print(f"[{self.model_name}] Δημιουργία TF-IDF Matrix...")
+                    tfidf_matrix = self.vectorizer.fit_transform(doc_texts)
+
+                # Βήμα LSI 2: Μείωση Διαστάσεων (SVD) για εύρεση κρυφών (Latent) Σημασιολογικών εννοιών
+                print(f"[{self.model_name}] Εκτέλεση SVD ({self.svd_backend}, {self.n_components} διαστάσεις)...")
+                doc_embeddings = self.svd.fit_transform(tfidf_matrix)
+                cached = (self.vectorizer, self.svd, doc_embeddings)
+                save_object(path, cached)
+            self.collection.doc_vectors[key] = cached
+
+        self.vectorizer, self.svd, self._doc_embeddings = cached
+        self._doc_ids = array(doc_ids)
+        self.vector_index = build_index(self._doc_embeddings, backend=self.index_backend, **self.index_params)
+        return self
 
-        # 5. Διαβάζουμε και καθαρίζουμε τα Queries
+    def transform_queries(self, queries=None):
+        """Projects the queries in the latent space of the indexed collection (TF-IDF -> SVD)."""
         query_texts = []
-        for q in self._queries:
+        for q in (self._queries if queries is None else queries):
             if isinstance(q, dict):
                 q_text = q["text"]
             elif isinstance(q, list):
@@ -68,34 +116,101 @@ class LSIModel(Model):
             query_texts.append(q_text)
 
         print(f"[{self.model_name}] Υπολογισμός {len(query_texts)} queries...")
-        # 6. Μετατρέπουμε τα queries στον ΊΔΙΟ σημασιολογικό χώρο (TF-IDF -> SVD)
-        query_tfidf = self.vectorizer.transform(query_texts)
-        query_embeddings = self.svd.transform(query_tfidf)
-
-        # 7. Υπολογίζουμε την Ομοιότητα Συνημιτόνου
-        print(f"[{self.model_name}] Υπολογισμός Cosine Similarities...")
-        cosine_scores = cosine_similarity(query_embeddings, doc_embeddings)
-
-        # 8. Αποθηκεύουμε τα σκορ
-        for i in range(len(query_texts)):
-            query_scores = {}
-            for j in range(len(doc_ids)):
-                score = cosine_scores[i][j]
-                if score > 0:
-                    query_scores[doc_ids[j]] = score
-            self._weights.append(query_scores)
+        return self.svd.transform(self.vectorizer.transform(query_texts))
+
+    def fit(self, min_freq=1, stopwords=True, top_k=None, return_scores=False, queries=None):
+        """
+        Args:
+            top_k (int | None): Documents kept per query (default: all documents).
+            return_scores (bool): Also build the per-query {doc_id: score} dicts in self._weights.
+            queries (list | None): Query variants to score (default: the collection queries).
+        """
+        print(f"[{self.model_name}] Φόρτωση {len(self.collection.docs)} εγγράφων στο LSI...")
+
+        # 1. Collection side: μόνο την πρώτη φορά (ή από το cache)
+        if self.vector_index is None:
+            self.index()
+
+        # 2. Μετατρέπουμε τα queries στον ΊΔΙΟ σημασιολογικό χώρο (TF-IDF -> SVD)
+        query_embeddings = self.transform_queries(queries)
+
+        # 3. Ομοιότητα Συνημιτόνου μέσω του vector index + top-k
+        print(f"[{self.model_name}] Υπολογισμός Cosine Similarities ({self.index_backend} index)...")
+        top_k = len(self._doc_ids) if top_k is None else top_k
+        self._top_scores, self._top_indices = self.vector_index.search(query_embeddings, top_k)
+        self.index_stats = index_stats(self.vector_index, self._doc_embeddings, query_embeddings, top_k,
+                                       self._top_indices, measure_recall=self.measure_recall)
+
+        # 4. Τα dicts {doc_id: score} φτιάχνονται μόνο αν ζητηθούν ρητά
+        if return_scores:
+            self._weights = self.score_dicts()
 
         return self
 
+    def sweep_components(self, ranks, k=None, queries=None):
+        """
+        Evaluates several numbers of latent dimensions with one decomposition: the SVD is computed
+        once for the largest rank, and every smaller rank r uses its first r components (the
+        components are ordered by singular value, so these are the rank-r LSI vectors).
+
+        The model keeps its own n_components and decomposition: a later fit() uses them, not the
+        sweep's rank (self.precision / self.recall are those of the last rank evaluated).
+
+        Args:
+            ranks (list[int]): n_components values to evaluate.
+            k (int | None): Evaluation cutoff.
+            queries (list | None): Query variants to score (default: the collection queries).
+
+        Returns:
+            dict: {rank: mean precision}.
+        """
+        fitted = ("n_components", "svd", "vectorizer", "_doc_ids", "_doc_embeddings", "vector_index")
+        saved = {name: getattr(self, name) for name in fitted}
+        try:
+            if max(ranks) != self.n_components or self.vector_index is None:
+                self.n_components = max(ranks)
+                self.svd = make_svd(self.svd_backend, self.n_components, **self.svd_params)
+                # an unfitted copy, so the sweep does not refit the model's vectorizer in place
+                self.vectorizer = clone(self.vectorizer)
+                self.index()
+            query_embeddings = self.transform_queries(queries)
+            top_k = len(self._doc_ids)
+
+            results = {}
+            for rank in sorted(ranks):
+                print(f"[{self.model_name}] Αξιολόγηση με {rank} διαστάσεις...")
+                rank_index = build_index(self._doc_embeddings[:, :rank], backend=self.index_backend,
+                                         **self.index_params)
+                self._top_scores, self._top_indices = rank_index.search(query_embeddings[:, :rank], top_k)
+                self.evaluate(k)
+                results[rank] = float(mean(self.precision))
+        finally:
+            # the sweep's decomposition stays in the collection cache (doc_vectors), not on the model
+            for name, value in saved.items():
+                setattr(self, name, value)
+        return results
+
+    def _ranked_doc_ids(self, i):
+        # Φθίνουσα σειρά, μόνο θετικά σκορ (όπως πριν στα dicts)
+        mask = self._top_scores[i] > 0
+        return self._doc_ids[self._top_indices[i][mask]].tolist()
+
+    def score_dicts(self):
+        """Builds the per-query {doc_id: score} dicts of the retrieved top-k documents."""
+        weights = []
+        for scores, indices in zip(self._top_scores, self._top_indices):
+            mask = scores > 0
+            weights.append(dict(zip(self._doc_ids[indices[mask]].tolist(), scores[mask].tolist())))
+        return weights
+
     def evaluate(self, k=None):
         self.precision = []
         self.recall = []
 
         rel = getattr(self, '_relevant', self.collection.relevant)
 
-        for doc_sim, relevant_docs in zip(self._weights, rel):
-            # Φθίνουσα ταξινόμηση
-            sorted_docs = [doc_id for doc_id, score in sorted(doc_sim.items(), key=lambda item: item[1], reverse=True)]
+        for i, relevant_docs in enumerate(rel[:self._top_scores.shape[0]]):
+            sorted_docs = self._ranked_doc_ids(i)
 
             cutoff = k if k else len(sorted_docs)
             pre, rec, mrr = calc_precision_recall(sorted_docs, relevant_docs, cutoff)
@@ -1,55 +1,74 @@
-import torch
-from sentence_transformers import SentenceTransformer, util
+from os.path import exists
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
 from models.Model import Model
 from utilities.document_utls import calc_precision_recall
-
-# Κάνουμε import το εργαλείο της βάσης μας
-from irlib.utilities.mongo import get_db
+from utilities.disk_cache import collection_fingerprint, cache_file, save_embeddings, load_embeddings
+from utilities.vector_index import build_index, index_stats
 
 
 class SBERTModel(Model):
-    def __init__(self, collection):
+    """
+    Dense retrieval with a SentenceTransformer encoder.
+
+    Document embeddings are cached on disk (float16, memory-mapped) keyed by encoder name and
+    collection fingerprint, so only the queries are encoded on later runs. Scoring stays in
+    matrix form: the documents are searched through a vector index (utilities.vector_index)
+    and only the top-k (score, index) pairs per query are kept.
+
+    Args:
+        collection: The collection to be searched.
+        encoder_name (str): SentenceTransformer model id.
+        cache_dir (str | None): Root folder of the embedding cache (defaults to utilities.disk_cache.default_path).
+        index (str): Vector index backend, 'exact', 'ivf' or 'hnsw'.
+        index_params (dict | None): Backend parameters (block_size, n_lists, n_probe, ef_search ...).
+        measure_recall (bool): For approximate indexes, also run an exact search and report recall@k in index_stats.
+    """
+
+    def __init__(self, collection, encoder_name='all-MiniLM-L6-v2', cache_dir=None, index='exact', index_params=None,
+                 measure_recall=False):
         super().__init__(collection)
         self.model_name = "SBERT"
-        self.encoder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.encoder_name = encoder_name
+        self.encoder = SentenceTransformer(encoder_name)
+        self.cache_dir = cache_dir
+        self.index_backend = index
+        self.index_params = index_params or {}
+        self.measure_recall = measure_recall
+        self.vector_index = None
+        self.index_stats = None
         self._doc_embeddings = None
+        self._doc_ids = None
+        self._top_scores = None
+        self._top_indices = None
         self._weights = []
 
-    def fit(self, min_freq=1, stopwords=True):
-        """Υπολογίζει τα Dense Embeddings για έγγραφα και ερωτήματα."""
+    def fit(self, min_freq=1, stopwords=True, top_k=None, return_scores=False):
+        """
+        Υπολογίζει τα Dense Embeddings για έγγραφα και ερωτήματα.
+
+        Args:
+            top_k (int | None): Documents kept per query (default: all documents).
+            return_scores (bool): Also build the per-query {doc_id: score} dicts in self._weights.
+        """
         print(f"[{self.model_name}] Φόρτωση {len(self.collection.docs)} εγγράφων στο SBERT...")
 
         # 1. ΠΑΙΡΝΟΥΜΕ ΤΑ IDs ΟΠΩΣ ΕΙΝΑΙ ΣΤΗ ΜΝΗΜΗ (χωρίς str()) για να ταιριάζουν με τα Qrels
         doc_ids = [doc.doc_id for doc in self.collection.docs]
 
-        # 2. Φέρνουμε τα αυθεντικά κείμενα (raw text) απευθείας από τη MongoDB
-        col_name = getattr(self.collection, 'name', 'CRAN')
-        print(f"[{self.model_name}] Ανάκτηση κειμένων από MongoDB (Συλλογή: {col_name})...")
-
-        db = get_db()
-        raw_docs_cursor = db["Documents"].find({"collection": col_name})
-
-        def clean_id(raw_id):
-            """Αφαιρεί τα μηδενικά ('0001' -> '1') αλλά δεν κρασάρει αν έχει γράμματα."""
-            try:
-                return str(int(raw_id))
-            except ValueError:
-                return str(raw_id).strip()
-
-        # Φτιάχνουμε το mapping καθαρίζοντας τα κλειδιά της βάσης
-        text_mapping = {clean_id(d["id"]): d["text"] for d in raw_docs_cursor}
-
-        # Τραβάμε τα κείμενα μετατρέποντας το doc_id σε string ΜΟΝΟ για την αναζήτηση στη βάση
-        doc_texts = [text_mapping.get(clean_id(str(doc_id)), "") for doc_id in doc_ids]
+        # 2. Τα αυθεντικά κείμενα (raw text) έρχονται από το ίδιο το Collection, χωρίς νέο ερώτημα στη MongoDB
+        doc_texts = self.collection.raw_texts()
 
         # Safety Check
         empty_docs = doc_texts.count("")
         if empty_docs > 0:
-            print(f"[ΠΡΟΣΟΧΗ] Το SBERT δεν βρήκε κείμενο για {empty_docs} έγγραφα στη βάση!")
+            print(f"[ΠΡΟΣΟΧΗ] Το SBERT δεν βρήκε κείμενο για {empty_docs} έγγραφα!")
 
-        # 3. Υπολογίζουμε τα Embeddings για τα έγγραφα
-        print(f"[{self.model_name}] Υπολογισμός εγγράφων (Encoding)...")
-        self._doc_embeddings = self.encoder.encode(doc_texts, convert_to_tensor=True, show_progress_bar=True)
+        # 3. Embeddings εγγράφων: από το cache αν υπάρχουν, αλλιώς encoding και αποθήκευση
+        self._doc_ids = np.array(doc_ids)
+        self._doc_embeddings = self._document_embeddings(doc_ids, doc_texts)
+        self.vector_index = build_index(self._doc_embeddings, backend=self.index_backend, **self.index_params)
 
         # 4. Παίρνουμε τα κείμενα των queries
         query_texts = []
@@ -64,32 +83,54 @@ class SBERTModel(Model):
 
         # 5. Υπολογίζουμε τα Embeddings για τα queries
         print(f"[{self.model_name}] Υπολογισμός {len(query_texts)} queries...")
-        query_embeddings = self.encoder.encode(query_texts, convert_to_tensor=True)
-
-        # 6. Υπολογίζουμε το Cosine Similarity (Ομοιότητα Συνημιτόνου)
-        print(f"[{self.model_name}] Υπολογισμός Cosine Similarities...")
-        cosine_scores = util.cos_sim(query_embeddings, self._doc_embeddings)
-
-        # 7. Αποθηκεύουμε τα σκορ ΚΡΑΤΩΝΤΑΣ το αυθεντικό ID (doc_ids[j])
-        for i in range(len(query_texts)):
-            query_scores = {}
-            for j in range(len(doc_ids)):
-                score = cosine_scores[i][j].item()
-                if score > 0:
-                    # Εδώ πλέον περνάει ως int (ή ό,τι ήταν αρχικά)
-                    query_scores[doc_ids[j]] = score
-            self._weights.append(query_scores)
+        query_embeddings = self.encoder.encode(query_texts, convert_to_numpy=True, normalize_embeddings=True)
+
+        # 6. Cosine Similarity μέσω του vector index + top-k
+        print(f"[{self.model_name}] Υπολογισμός Cosine Similarities ({self.vector_index.name} index)...")
+        top_k = len(doc_ids) if top_k is None else top_k
+        self._top_scores, self._top_indices = self.vector_index.search(query_embeddings, top_k)
+        self.index_stats = index_stats(self.vector_index, self._doc_embeddings, query_embeddings, top_k,
+                                       self._top_indices, measure_recall=self.measure_recall)
+
+        # 7. Τα dicts {doc_id: score} φτιάχνονται μόνο αν ζητηθούν ρητά
+        if return_scores:
+            self._weights = self.score_dicts()
 
         return self
 
+    def _document_embeddings(self, doc_ids, doc_texts):
+        fingerprint = collection_fingerprint(doc_ids, doc_texts)
+        path = cache_file("embeddings", self.encoder_name, fingerprint, root=self.cache_dir)
+        if exists(path):
+            print(f"[{self.model_name}] Embeddings εγγράφων από το cache: {path}")
+        else:
+            print(f"[{self.model_name}] Υπολογισμός εγγράφων (Encoding)...")
+            embeddings = self.encoder.encode(doc_texts, convert_to_numpy=True, normalize_embeddings=True,
+                                             show_progress_bar=True)
+            save_embeddings(path, embeddings)
+        return load_embeddings(path)
+
+    def _ranked_doc_ids(self, i):
+        # only positive similarities are ranked, as in the score dicts (also drops the -1 padding of approximate indexes)
+        mask = self._top_scores[i] > 0
+        return self._doc_ids[self._top_indices[i][mask]].tolist()
+
+    def score_dicts(self):
+        """Builds the per-query {doc_id: score} dicts of the retrieved top-k documents."""
+        weights = []
+        for scores, indices in zip(self._top_scores, self._top_indices):
+            mask = scores > 0
+            weights.append(dict(zip(self._doc_ids[indices[mask]].tolist(), scores[mask].tolist())))
+        return weights
+
     def evaluate(self, k=None):
         self.precision = []
         self.recall = []
 
         rel = getattr(self, '_relevant', self.collection.relevant)
 
-        for doc_sim, relevant_docs in zip(self._weights, rel):
-            sorted_docs = [doc_id for doc_id, score in sorted(doc_sim.items(), key=lambda item: item[1], reverse=True)]
+        for i, relevant_docs in enumerate(rel[:self._top_scores.shape[0]]):
+            sorted_docs = self._ranked_doc_ids(i)
 
             cutoff = k if k else len(sorted_docs)
             pre, rec, mrr = calc_precision_recall(sorted_docs, relevant_docs, cutoff)
@@ -104,4 +145,4 @@ class SBERTModel(Model):
         pass
 
     def _vectorizer(self, *args, **kwargs):
-        pass
\ No newline at end of file
+        pass
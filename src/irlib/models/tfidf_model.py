@@ -1,53 +1,63 @@
 import math
+
+from numpy import array
 from models.Model import Model
 from utilities.document_utls import calc_precision_recall
+from utilities.impact_index import DEFAULT_TOP_K, ImpactIndex
+from utilities.term_matrix import get_term_matrix, rank_row
 
 
 class TFIDFModel(Model):
-    def __init__(self, collection):
+    """
+    Args:
+        collection: The collection to be searched.
+        retrieval (str): 'exhaustive' scores every document with one sparse product, 'maxscore' retrieves
+            the exact top-k of each query through an impact-ordered index with dynamic pruning
+            (k=None retrieves the top DEFAULT_TOP_K).
+    """
+
+    def __init__(self, collection, retrieval="exhaustive"):
         super().__init__(collection)
+        if retrieval not in ("exhaustive", "maxscore"):
+            raise ValueError(f"Unknown retrieval mode '{retrieval}', expected 'exhaustive' or 'maxscore'")
         self.model = self.__class__.__name__
+        self.retrieval = retrieval
         self._weights = []
+        self._scores = None
+        self.impact_index = None
+        # postings in the query lists / postings scored, summed over the queries (maxscore)
+        self.pruning_stats = {"postings": 0, "scored": 0}
 
     def fit(self, min_freq=1, stopwords=True):
         """Calculates TF-IDF scores for all documents against all queries."""
         print(f"[{self.model}] Building TF-IDF index for {len(self.collection.docs)} documents...")
 
-        # 1. Calculate Document Frequency (DF) for the entire collection
-        # DF is how many distinct documents contain a specific word
-        df = {}
-        for doc in self.collection.docs:
-            # ΑΛΛΑΓΗ ΕΔΩ: Χρησιμοποιούμε τα κλειδιά του doc.tf αντί για doc.tokens
-            for term in doc.tf.keys():
-                df[term] = df.get(term, 0) + 1
-
-        total_docs = len(self.collection.docs)
-
-        # 2. Score each query
-        for query_tokens in self._queries:
-            query_scores = {}
-
-            for doc in self.collection.docs:
-                score = 0.0
-
-                # TF-IDF calculation for each term in the query
-                for term in query_tokens:
-                    if term in doc.tf:
-                        # Term Frequency (TF): How often the word appears in THIS document
-                        tf = doc.tf[term]
-
-                        # Inverse Document Frequency (IDF): How rare the word is across ALL documents
-                        # We add 1 to avoid division by zero
-                        idf = math.log(total_docs / (df.get(term, 1) + 1))
-
-                        # Accumulate the score
-                        score += tf * idf
-
-                # Only store non-zero scores to save memory
-                if score > 0:
-                    query_scores[doc.doc_id] = score
-
-            self._weights.append(query_scores)
+        if self.retrieval == "maxscore":
+            # Impact of a posting = tf * idf, the same weight as in the sparse document matrix
+            total_docs = len(self.collection.docs)
+            self.impact_index = ImpactIndex(
+                self.collection.inverted_index,
+                lambda term, doc_ids, tfs: [tf * math.log(total_docs / (len(doc_ids) + 1)) for tf in tfs])
+            return self
+
+        # 1. Sparse document-term matrix (tf), built once per collection from collection.docs
+        term_matrix = get_term_matrix(self.collection)
+        total_docs = term_matrix.num_docs
+
+        # 2. Inverse Document Frequency (IDF) per term: how rare the word is across ALL documents
+        # DF is how many distinct documents contain a specific word, we add 1 to avoid division by zero
+        # (math.log per term, so every tf * idf product is the same float as before)
+        idf = array([math.log(total_docs / (df + 1)) for df in term_matrix.df])
+
+        # 3. Document weights tf * idf, stored in the same sparse structure
+        doc_weights = term_matrix.matrix.copy()
+        doc_weights.data = doc_weights.data * idf[doc_weights.indices]
+
+        # 4. Score all queries at once with one sparse product: (queries x query positions) . (positions x docs)
+        # Each query term position adds its tf * idf in query order (a repeated term is added again),
+        # exactly like the per-term accumulation, so the scores are bit-for-bit the same.
+        positions, columns = term_matrix.query_positions(self._queries)
+        self._scores = (positions @ doc_weights[:, columns].T).tocsr()
 
         return self
 
@@ -58,16 +68,34 @@ class TFIDFModel(Model):
 
         rel = getattr(self, '_relevant', self.collection.relevant)
 
-        for doc_sim, relevant_docs in zip(self._weights, rel):
-            # Sort documents by their TF-IDF score
-            sorted_docs = [doc_id for doc_id, score in sorted(doc_sim.items(), key=lambda item: item[1], reverse=True)]
+        if self.retrieval == "maxscore":
+            rankings = self._maxscore_rankings(k)
+        else:
+            doc_ids = get_term_matrix(self.collection).doc_ids
+            # Sort documents by their TF-IDF score (only non-zero scores are ranked)
+            rankings = (rank_row(self._scores[i], doc_ids) for i in range(self._scores.shape[0]))
 
+        for relevant_docs, sorted_docs in zip(rel, rankings):
             cutoff = k if k else len(sorted_docs)
             pre, rec, mrr = calc_precision_recall(sorted_docs, relevant_docs, cutoff)
 
             self.precision.append(pre)
             self.recall.append(rec)
 
+        if self.retrieval == "maxscore" and self.pruning_stats["postings"]:
+            print(f"[{self.model}] MaxScore scored {self.pruning_stats['scored']} of "
+                  f"{self.pruning_stats['postings']} postings")
+
+    def _maxscore_rankings(self, k):
+        """Top-k document ids of every query, retrieved from the impact index."""
+        k = DEFAULT_TOP_K if not k else k
+        self.pruning_stats = {"postings": 0, "scored": 0}
+        for q in self._queries:
+            results = self.impact_index.search(q, k)
+            for key in self.pruning_stats:
+                self.pruning_stats[key] += self.impact_index.last_stats[key]
+            yield [doc_id for doc_id, _ in results]
+
     # --------------------------------------------------------
     # Fulfill the Abstract Base Class Requirements
     # --------------------------------------------------------
@@ -78,4 +106,4 @@ class TFIDFModel(Model):
         pass
 
     def _vectorizer(self, *args, **kwargs):
-        pass
\ No newline at end of file
+        pass
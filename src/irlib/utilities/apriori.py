@@ -1,21 +1,77 @@
-from itertools import combinations
+from itertools import combinations, islice
+from math import comb, isqrt
+from time import time
+
+from numpy import asarray, int64, sort
+
+from utilities.intersection import intersect_sorted
+from utilities.postings import CompressedPostings
 
 
 def intersection(a, b):
-    return list(set(a) & set(b))
+    # the covers (doc ids of a termset) are sorted, so they are intersected without hashing
+    # (see utilities.intersection) and the result is sorted as well
+    return intersect_sorted(a, b)
 
 
 def union(a, b):
     return a + list(set(b) - set(a))
 
 
-def create_candidate_1(query, inv_index):
+class AprioriLimits:
+    """
+    Bounds on the work of apriori for a single query, against the combinatorial explosion of
+    termsets on long queries with a low min_freq. Every limit is off when None.
+
+    Args:
+        max_size (`int`): Largest termset (number of terms) that is mined.
+        max_candidates (`int`): Candidate pairs examined per level. The pairs over the budget are
+            skipped, unless `raise_support` is set.
+        time_budget (`float`): Seconds per query; mining stops with the termsets found so far.
+        raise_support (`bool`): Instead of skipping candidate pairs, min_freq is raised (for
+            the current level and the next ones) until the frequent termsets of the level give
+            at most `max_candidates` pairs.
+    """
+    __slots__ = ('max_size', 'max_candidates', 'time_budget', 'raise_support')
+
+    def __init__(self, max_size=None, max_candidates=None, time_budget=None, raise_support=False):
+        self.max_size = max_size
+        self.max_candidates = max_candidates
+        self.time_budget = time_budget
+        self.raise_support = raise_support
+
+
+class FrequentTermsets(dict):
+    """
+    The {termset: cover} result of apriori, with how it was mined:
+        truncated: None if the mining was complete, else the first reason it was cut short
+            ('max_size', 'candidates', 'support' or 'time')
+        min_freq: the minimum support in effect at the end (raised with AprioriLimits.raise_support)
+    """
+
+    def __init__(self, termsets=(), truncated=None, min_freq=1):
+        super().__init__(termsets)
+        self.truncated = truncated
+        self.min_freq = min_freq
+
+
+def _posting_doc_ids(post_list):
+    if isinstance(post_list, CompressedPostings):
+        return post_list.docs
+    return sort(asarray([id for id, _ in post_list], dtype=int64))
+
+
+def create_candidate_1(query, inv_index, cache=None):
+    # termsets hold the integer term ids of the inverted index, not the term strings
     one_termsets = []
     for term in query:
         if term in inv_index:
             post_list = inv_index[term]['posting_list']
-            doc_ids = [id for id, _ in post_list]
-            t = frozenset([term])
+            t = frozenset([inv_index[term]['id']])
+            if cache is None:
+                doc_ids = _posting_doc_ids(post_list)
+            else:
+                doc_ids = cache.get(t, 'cover', lambda: _posting_doc_ids(post_list))
             if t not in one_termsets:
                 one_termsets.append([t, doc_ids])
         else:
@@ -34,20 +90,40 @@ def create_freq_term(termsets, min_freq):
     return freq_ts
 
 
-def create_candidate_k(freq_termsets, k):
-    """create the list of k-item candidate"""
+def _cover(termset, t1_ids, t2_ids, cache):
+    if cache is None:
+        return intersection(t1_ids, t2_ids)
+    return cache.get(termset, 'cover', lambda: intersection(t1_ids, t2_ids))
+
+
+def _until(pairs, deadline):
+    # stops the pairs once the deadline is passed (checked every 1024 pairs)
+    for i, pair in enumerate(pairs):
+        if not i & 1023 and time() > deadline:
+            return
+        yield pair
+
+
+def create_candidate_k(freq_termsets, k, cache=None, max_candidates=None, deadline=None):
+    """create the list of k-item candidate (from at most `max_candidates` pairs, until `deadline`)"""
     ck = {}
+    pairs = combinations(freq_termsets.keys(), 2)
+    if max_candidates is not None:
+        pairs = islice(pairs, max_candidates)
+    if deadline is not None:
+        pairs = _until(pairs, deadline)
 
     # for generating candidate of size two (2-itemset)
     if k == 0:
-        for t1, t2 in combinations(freq_termsets.keys(), 2):
+        for t1, t2 in pairs:
             t1_ids = freq_termsets[t1]
             t2_ids = freq_termsets[t2]
 
-            ck[t1 | t2] = intersection(t1_ids, t2_ids)
+            termset = t1 | t2
+            ck[termset] = _cover(termset, t1_ids, t2_ids, cache)
 
     else:
-        for t1, t2 in combinations(freq_termsets.keys(), 2):
+        for t1, t2 in pairs:
 
             # termsets ids
             t1_ids = freq_termsets[t1]
@@ -61,15 +137,40 @@ def create_candidate_k(freq_termsets, k):
             if len(intr) == k:
                 termset = t1 | t2
                 if termset not in ck:
-                    ck[termset] = intersection(t1_ids, t2_ids)
+                    ck[termset] = _cover(termset, t1_ids, t2_ids, cache)
 
     return ck
 
 
-def apriori(query, inv_index, min_freq):
+def raised_support(freq_termsets, max_candidates, min_freq):
+    """
+    Smallest min_freq (not below `min_freq`) that leaves at most `max_candidates` pairs of
+    frequent termsets, i.e. keeps the termsets with the largest covers.
+    """
+    keep = (1 + isqrt(1 + 8 * max_candidates)) // 2  # largest m with m (m - 1) / 2 <= max_candidates
+    supports = sorted((len(doc_ids) for doc_ids in freq_termsets.values()), reverse=True)
+    if len(supports) <= keep:
+        return min_freq
+    threshold = supports[keep - 1]
+    # ties on the threshold would keep more than `keep` termsets
+    return max(min_freq, threshold + 1 if supports[keep] == threshold else threshold)
+
+
+def apriori(query, inv_index, min_freq, cache=None, limits=None):
+    """
+    Frequent termsets of a query: {frozenset of term ids: sorted doc ids}. The query is given as
+    terms; the ids are the 'id' of each term in the inverted index (see Collection.get_vocabulary).
+    With a TermsetCache (utilities.termset_cache), the covers of termsets already met by earlier
+    queries are taken from it instead of being intersected again. With AprioriLimits the mining
+    may stop early, which the `truncated` field of the returned FrequentTermsets records.
+    """
+    limits = limits or AprioriLimits()
+    deadline = None if limits.time_budget is None else time() + limits.time_budget
+    truncated = None
+
     # the candidate sets for the 1-item is different,
     # create them independently of others
-    c1 = create_candidate_1(query, inv_index)
+    c1 = create_candidate_1(query, inv_index, cache)
 
     # filter the frequenct ones
     freq_termsets = [create_freq_term(c1, min_freq=min_freq)]
@@ -78,20 +179,39 @@ def apriori(query, inv_index, min_freq):
     while len(freq_termsets[k]) > 0:
         freq_term = freq_termsets[k]
 
+        # termsets of k + 1 terms are the largest allowed
+        if limits.max_size is not None and k + 1 >= limits.max_size:
+            if len(freq_term) > 1:
+                truncated = truncated or 'max_size'
+            break
+        max_candidates = limits.max_candidates
+        if max_candidates is not None and comb(len(freq_term), 2) > max_candidates:
+            if limits.raise_support:
+                min_freq = raised_support(freq_term, max_candidates, min_freq)
+                freq_term = freq_termsets[k] = create_freq_term(freq_term, min_freq=min_freq)
+                truncated = truncated or 'support'
+            else:
+                truncated = truncated or 'candidates'
+
         # create (k+1)
-        ck = create_candidate_k(freq_term, k)
+        ck = create_candidate_k(freq_term, k, cache, max_candidates, deadline)
+        timed_out = deadline is not None and time() > deadline
+        if timed_out:
+            truncated = truncated or 'time'
 
         # filter with respect to minimum frequency
         freq_term = create_freq_term(ck, min_freq=min_freq)
 
         # append to total
         freq_termsets.append(freq_term)
+        if timed_out:
+            break
 
         # increment round
         k += 1
 
     # unify freq termsets into one dictionary
-    ts = {}
+    ts = FrequentTermsets(truncated=truncated, min_freq=min_freq)
     for item in freq_termsets:
-        ts = ts | item
-    return ts
\ No newline at end of file
+        ts.update(item)
+    return ts
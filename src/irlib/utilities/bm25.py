@@ -0,0 +1,94 @@
+from numpy import diff, log, repeat
+
+from utilities.term_matrix import TermMatrix, top_k_rows
+
+BM25_VARIANTS = ("okapi", "bm25l", "bm25+")
+
+
+class BM25Index:
+    r"""
+    BM25 scorer over a sparse document-term matrix. The saturated term weights of every
+    (document, term) pair are computed once, so a batch of queries is scored with one sparse
+    product and the top-k documents are selected without sorting whole score lists.
+
+    Per query term t contained in a document (a repeated query term counts once per occurrence):
+        okapi: idf(t) tf (k1 + 1) / (tf + k1 (1 - b + b dl / avgdl)),
+               idf(t) = log((N - df + 0.5) / (df + 0.5)), negative idfs replaced by epsilon * mean idf
+               (same scores as rank_bm25.BM25Okapi, the package used before)
+        bm25l: idf(t) (k1 + 1) (ctd + delta) / (k1 + ctd + delta), ctd = tf / (1 - b + b dl / avgdl),
+               idf(t) = log((N + 1) / (df + 0.5))
+        bm25+: idf(t) (tf (k1 + 1) / (k1 (1 - b + b dl / avgdl) + tf) + delta), idf(t) = log((N + 1) / df)
+    BM25L and BM25+ follow Lv & Zhai (2011): the delta lower bound only applies to documents that
+    contain the term, so every weight stays in the sparse matrix.
+
+    Args:
+        term_matrix (`TermMatrix`): Document-term frequencies of the collection.
+        k1 (`float`, defaults to `1.5`): Term frequency saturation.
+        b (`float`, defaults to `0.75`): Document length normalization.
+        variant (`str`, {`'okapi'`, `'bm25l'`, `'bm25+'`}, defaults to `'okapi'`).
+        delta (`float`, defaults to `0.5` for BM25L and `1` for BM25+): Lower bound of the term frequency normalization.
+        epsilon (`float`, defaults to `0.25`): Floor of the Okapi idf, as a fraction of the mean idf.
+    """
+
+    def __init__(self, term_matrix: TermMatrix, k1=1.5, b=0.75, variant="okapi", delta=None, epsilon=0.25):
+        if variant not in BM25_VARIANTS:
+            raise ValueError(f"Unknown BM25 variant '{variant}', expected one of {BM25_VARIANTS}")
+        self.k1, self.b, self.variant, self.epsilon = k1, b, variant, epsilon
+        self.delta = delta if delta is not None else (0.5 if variant == "bm25l" else 1.0)
+        self.doc_ids = term_matrix.doc_ids
+
+        tf_matrix = term_matrix.matrix
+        n_docs = tf_matrix.shape[0]
+        df = term_matrix.df
+        # document length normalization (1 - b + b dl / avgdl), aligned with doc_ids
+        self.length_norm = 1 - b + b * term_matrix.doc_lengths / term_matrix.doc_lengths.mean()
+
+        if variant == "okapi":
+            idf = log(n_docs - df + 0.5) - log(df + 0.5)
+            idf[idf < 0] = epsilon * idf.mean()
+        elif variant == "bm25l":
+            idf = log(n_docs + 1) - log(df + 0.5)
+        else:
+            idf = log(n_docs + 1) - log(df)
+        self.idf = idf
+
+        # saturated term weights of every (document, term) pair
+        # (length normalization of the document of every stored entry: one value per row, repeated)
+        entry_norm = repeat(self.length_norm, diff(tf_matrix.indptr))
+        self.weights = tf_matrix.copy()
+        self.weights.data = idf[tf_matrix.indices] * self._saturate(tf_matrix.data, entry_norm)
+
+    def _saturate(self, tf, norm):
+        k1, delta = self.k1, self.delta
+        if self.variant == "okapi":
+            return tf * (k1 + 1) / (tf + k1 * norm)
+        if self.variant == "bm25l":
+            ctd = tf / norm
+            return (k1 + 1) * (ctd + delta) / (k1 + ctd + delta)
+        return tf * (k1 + 1) / (k1 * norm + tf) + delta
+
+    def term_impacts(self, column, rows, tf):
+        """BM25 weights of one term (vocabulary column) in the documents of the given matrix rows."""
+        return self.idf[column] * self._saturate(tf, self.length_norm[rows])
+
+    def score(self, query_matrix):
+        """Dense (n_queries x n_docs) BM25 scores of a bag-of-words query matrix."""
+        return (query_matrix @ self.weights.T).toarray()
+
+    def top_k(self, query_matrix, k=None, batch_size=256):
+        """
+        Ranks the documents of every query, best first (ties keep the collection order).
+
+        Args:
+            query_matrix: Bag-of-words (n_queries x vocabulary) matrix, see TermMatrix.query_matrix.
+            k (int | None): Number of documents per query (default: all documents).
+            batch_size (int): Queries scored per sparse product, bounds the dense score block.
+
+        Returns:
+            list of (doc_ids, scores) arrays, one pair per query.
+        """
+        k = len(self.doc_ids) if k is None else k
+        results = []
+        for start in range(0, query_matrix.shape[0], batch_size):
+            results.extend(top_k_rows(self.score(query_matrix[start:start + batch_size]), self.doc_ids, k))
+        return results
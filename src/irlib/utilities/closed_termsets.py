@@ -0,0 +1,80 @@
+from time import time
+
+from numpy import arange, concatenate, flatnonzero, searchsorted, unique, zeros
+
+from utilities.apriori import AprioriLimits, FrequentTermsets, create_candidate_1, create_freq_term
+from utilities.intersection import sorted_doc_ids
+
+
+def closed_termsets(query, inv_index, min_freq, cache=None, limits=None):
+    """
+    Closed frequent termsets of a query: the frequent termsets with no superset of the same cover.
+    Every frequent termset has the cover of its closure, so these are the distinct covers (tsf
+    rows) of apriori's result, with the largest termset of each. Same arguments and result type
+    as apriori, and usable as a miner in its place (Model.fit(miner=closed_termsets)).
+
+    LCM style depth-first search: a closed termset P is extended only by the terms after its
+    core term e, and the closure Q of P + {e} is kept only if it adds no term before e (prefix
+    preserving closure extension), so every closed termset is reached exactly once and no
+    duplicate check is needed. The search runs over a document x term incidence matrix of the
+    documents of the query terms, where a cover is an array of rows and a closure a column `all`.
+
+    Of the AprioriLimits, max_size prunes the closures over the size, max_candidates bounds the
+    number of extensions examined and time_budget the search time (raise_support is ignored).
+    """
+    limits = limits or AprioriLimits()
+    deadline = None if limits.time_budget is None else time() + limits.time_budget
+    result = FrequentTermsets(min_freq=min_freq)
+
+    one_termsets = create_freq_term(create_candidate_1(query, inv_index, cache), min_freq)
+    # terms by increasing support: few and small covers near the root
+    items = sorted(one_termsets, key=lambda termset: len(one_termsets[termset]))
+    if not items:
+        return result
+    term_ids = [next(iter(termset)) for termset in items]
+    covers = [sorted_doc_ids(one_termsets[termset]) for termset in items]
+
+    docs = unique(concatenate(covers))
+    incidence = zeros((len(docs), len(items)), dtype=bool)
+    for j, cover in enumerate(covers):
+        incidence[searchsorted(docs, cover), j] = True
+
+    examined = 0
+
+    def add(closure, rows):
+        termset = frozenset(term_ids[j] for j in flatnonzero(closure))
+        cover = docs[rows]
+        result[termset] = cover if cache is None else cache.get(termset, 'cover', lambda: cover)
+
+    def expand(closure, rows, core):
+        nonlocal examined
+        for e in range(core + 1, len(items)):
+            if closure[e]:
+                continue
+            if limits.max_candidates is not None and examined >= limits.max_candidates:
+                result.truncated = result.truncated or 'candidates'
+                return
+            if deadline is not None and time() > deadline:
+                result.truncated = result.truncated or 'time'
+                return
+            examined += 1
+            new_rows = rows[incidence[rows, e]]
+            if len(new_rows) < min_freq:
+                continue
+            new_closure = incidence[new_rows].all(axis=0)
+            # prefix preserving: the closure may not add a term before e
+            if (new_closure[:e] != closure[:e]).any():
+                continue
+            if limits.max_size is not None and new_closure.sum() > limits.max_size:
+                result.truncated = result.truncated or 'max_size'
+                continue
+            add(new_closure, new_rows)
+            expand(new_closure, new_rows, e)
+
+    rows = arange(len(docs))
+    # closure of the empty termset: the terms of every document (usually none)
+    closure = incidence.all(axis=0)
+    if closure.any() and len(rows) >= min_freq and (limits.max_size is None or closure.sum() <= limits.max_size):
+        add(closure, rows)
+    expand(closure, rows, -1)
+    return result
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import pickle
+from os import makedirs, replace
+from os.path import join, expanduser
+
+import numpy as np
+
+# Folder for storing data derived from a collection (embeddings, fitted vectorizers ...).
+# Can be moved with the IRLIB_CACHE environment variable.
+default_path = os.environ.get("IRLIB_CACHE", join(expanduser("~"), ".irlib_cache"))
+
+
+def collection_fingerprint(doc_ids, doc_texts) -> str:
+    """
+    Hashes the (doc_id, text) pairs of a collection, so that cached data is
+    invalidated as soon as a single document changes.
+
+    Args:
+        doc_ids: Document ids in the order used by the model.
+        doc_texts: The texts that are encoded/fitted, aligned with doc_ids.
+
+    Returns:
+        str: A short hex digest identifying the collection contents.
+    """
+    digest = hashlib.sha1()
+    for doc_id, text in zip(doc_ids, doc_texts):
+        digest.update(str(doc_id).encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(text.encode("utf-8"))
+        digest.update(b"\x01")
+    return digest.hexdigest()[:16]
+
+
+def cache_file(kind: str, *key_parts, ext: str = "npy", root: str | None = None) -> str:
+    """
+    Returns the path of a cache entry, e.g. <root>/embeddings/all-MiniLM-L6-v2.3fa2c1d0e4b5a6f7.npy
+
+    Args:
+        kind: Sub-folder grouping entries of the same type.
+        *key_parts: Parts of the key (encoder name, fingerprint, parameters ...).
+        ext: File extension.
+        root: Cache root, defaults to `default_path`.
+    """
+    folder = join(root or default_path, kind)
+    makedirs(folder, exist_ok=True)
+    name = ".".join(str(part).replace("/", "_").replace("\\", "_") for part in key_parts)
+    return join(folder, f"{name}.{ext}")
+
+
+def save_embeddings(path: str, embeddings) -> None:
+    """Stores an embedding matrix as float16. Written to a temp file first so a crash never leaves half a cache."""
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, np.asarray(embeddings, dtype=np.float16))
+    replace(tmp_path, path)
+
+
+def load_embeddings(path: str) -> np.memmap:
+    """Memory-maps a cached embedding matrix (read only), nothing is read until it is sliced."""
+    return np.load(path, mmap_mode="r")
+
+
+def save_object(path: str, obj) -> None:
+    """Pickles a fitted object (vectorizer, SVD, sparse matrix ...), through a temp file like save_embeddings."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    replace(tmp_path, path)
+
+
+def load_object(path: str):
+    """Loads an object stored with save_object."""
+    with open(path, "rb") as f:
+        return pickle.load(f)
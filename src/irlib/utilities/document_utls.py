@@ -8,13 +8,6 @@ from networkx import from_numpy_array
 from numpy import dot, fill_diagonal, diag, mean
 from numpy.linalg import norm
 import string
-
-try:
-    from rank_bm25 import BM25Okapi
-except ModuleNotFoundError:
-    from os import system
-
-    system("pip install rank_bm25")
 from utilities.Result_handling import write
 
 
@@ -70,15 +63,6 @@ def create_dir(path):
         print("Directories Created")
 
 
-def evaluate_bm25_score(q, bm25_vectors):
-    doc_sim = {}
-    score = bm25_vectors.get_scores(q)
-    #print(len(score))
-    for id, s in enumerate(score.T, start=1):
-        doc_sim[id] = s
-    return {id: sim for id, sim in sorted(doc_sim.items(), key=lambda item: item[1], reverse=True)}
-
-
 def evaluate_sim(query, dtm):
     doc_sim = {}
 
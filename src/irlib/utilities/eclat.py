@@ -0,0 +1,124 @@
+from collections import Counter
+from time import time
+
+from numpy import arange, concatenate, searchsorted, unique, zeros
+
+from utilities.apriori import AprioriLimits, FrequentTermsets, create_candidate_1, create_freq_term
+from utilities.intersection import sorted_doc_ids
+
+
+def _search(result, items, covers, roots, min_freq, cache, limits, known=None, base_start=None):
+    """
+    Depth-first search of the frequent termsets that start with one of the `roots` (indices of
+    `items`), extended by the items after their last one, into `result` (FrequentTermsets).
+
+    With `known` (the termsets of a lattice already mined), the items from `base_start` on are the
+    terms of that lattice: the part of a termset made of them must be one of its termsets (support
+    is anti-monotone), which prunes the search before any intersection.
+    """
+    deadline = None if limits.time_budget is None else time() + limits.time_budget
+    term_ids = [next(iter(termset)) for termset in items]
+
+    docs = unique(concatenate([sorted_doc_ids(cover) for cover in covers]))
+    incidence = zeros((len(docs), len(items)), dtype=bool)
+    for j, cover in enumerate(covers):
+        incidence[searchsorted(docs, sorted_doc_ids(cover)), j] = True
+
+    examined = Counter()  # termset size -> extensions examined
+
+    def expand(prefix, base, rows, last):
+        size = len(prefix) + 1
+        if limits.max_size is not None and size > limits.max_size:
+            result.truncated = result.truncated or 'max_size'
+            return
+        for e in range(last + 1, len(items)):
+            new_base = base
+            if known is not None and e >= base_start:
+                new_base = base | items[e]
+                if new_base not in known:
+                    continue
+            if limits.max_candidates is not None and examined[size] >= limits.max_candidates:
+                result.truncated = result.truncated or 'candidates'
+                return
+            if deadline is not None and time() > deadline:
+                result.truncated = result.truncated or 'time'
+                return
+            examined[size] += 1
+            new_rows = rows[incidence[rows, e]]
+            if len(new_rows) < min_freq:
+                continue
+            termset = prefix | {term_ids[e]}
+            cover = docs[new_rows]
+            result[termset] = cover if cache is None else cache.get(termset, 'cover', lambda: cover)
+            if e + 1 < len(items):
+                expand(termset, new_base, new_rows, e)
+
+    all_rows = arange(len(docs))
+    for j in roots:
+        expand(items[j], frozenset(), all_rows[incidence[:, j]], j)
+        if result.truncated == 'time':
+            break
+    # level by level, as apriori (stable: the 2-termsets come in the same order)
+    return FrequentTermsets(sorted(result.items(), key=lambda item: len(item[0])), result.truncated,
+                            result.min_freq)
+
+
+def eclat(query, inv_index, min_freq, cache=None, limits=None):
+    """
+    All the frequent termsets of a query, as apriori, mined depth first over vertical covers
+    (Eclat): a termset is extended only by the terms after its last one, and its cover is the
+    cover of its prefix intersected with the cover of the new term. Every termset is generated
+    once, from its prefix, instead of from all the pairs of the previous level.
+
+    The covers are rows of a document x term incidence matrix of the documents of the query
+    terms, so an intersection is a boolean mask over the rows of the prefix. The result has the
+    termsets and covers of apriori, ordered by size like its levels (within a level the order
+    may differ, which only changes the float rounding of the model scores).
+
+    Of the AprioriLimits, max_size bounds the depth, max_candidates the extensions examined per
+    termset size and time_budget the search time (raise_support is ignored).
+    """
+    limits = limits or AprioriLimits()
+    result = FrequentTermsets(min_freq=min_freq)
+
+    one_termsets = create_freq_term(create_candidate_1(query, inv_index, cache), min_freq)
+    # the 1-termsets keep the covers of create_candidate_1 (e.g. the doc ids of compressed lists)
+    result.update(one_termsets)
+    items = list(one_termsets)
+    if len(items) < 2:
+        return result
+    return _search(result, items, list(one_termsets.values()), range(len(items) - 1), min_freq, cache, limits)
+
+
+def extend_termsets(termsets, added, inv_index, min_freq, cache=None, limits=None):
+    """
+    Incremental mining: the frequent termsets of a query extended with the terms `added`, from the
+    frequent termsets `termsets` of the query (mined with the same min_freq, e.g. by apriori or
+    eclat). Only the termsets with at least one new term are mined, and their terms of the
+    original query must form one of `termsets`, so the original lattice is reused as it is and
+    prunes the search. Query expansion sweeps can extend the lattice of every depth with the
+    terms of the next one.
+
+    Args:
+        termsets (`FrequentTermsets` or `dict`): {termset: cover} of the original query.
+        added (`list`): Terms added to the query (terms already in it are skipped).
+        inv_index, min_freq, cache, limits: as for eclat.
+
+    Returns:
+        FrequentTermsets of the extended query (`truncated` if the original one was).
+    """
+    limits = limits or AprioriLimits()
+    result = FrequentTermsets(termsets, getattr(termsets, 'truncated', None), min_freq)
+
+    base_items = [termset for termset in termsets if len(termset) == 1]
+    new_termsets = {termset: cover
+                    for termset, cover in create_freq_term(create_candidate_1(added, inv_index, cache), min_freq).items()
+                    if termset not in termsets}
+    if not new_termsets:
+        return result
+    result.update(new_termsets)
+    # the new terms first: every termset found from them as roots has at least one new term
+    items = list(new_termsets) + base_items
+    covers = list(new_termsets.values()) + [termsets[termset] for termset in base_items]
+    return _search(result, items, covers, range(len(new_termsets)), min_freq, cache, limits,
+                   known=termsets, base_start=len(new_termsets))
@@ -106,7 +106,7 @@ def cluster_graph(graph, collection, n_clstrs):
     Cluster the nodes of a given graph using spectral clustering.
     
     Parameters:
-    - graph (networkx.Graph): The input graph.
+    - graph (networkx.Graph): The input graph (nodes are the term ids of the inverted index).
     - collection: A collection object from infre.preprocess with inverted index information.
     - n_clstrs (int): Number of clusters for the spectral clustering.
     
@@ -135,8 +135,8 @@ def cluster_graph(graph, collection, n_clstrs):
                 
                 graph.add_edge(node1, node2, weight=.2)
 
-                index1 = collection.inverted_index[node1]['id']
-                index2 = collection.inverted_index[node2]['id']
+                # the nodes are the term ids of the inverted index
+                index1, index2 = node1, node2
                 adj_matrix[index1, index2] = .2
                 adj_matrix[index2, index1] = .2
     
@@ -156,7 +156,7 @@ def prune_graph(graph, collection, labels, embeddings, condition):
     Prune (or remove) edges from the graph based on certain conditions.
     
     Parameters:
-    - graph (networkx.Graph): The input graph.
+    - graph (networkx.Graph): The input graph (nodes are the term ids of the inverted index).
     - collection: A collection object from infre.preprocess with inverted index information.
     - labels (numpy.array): Labels indicating the cluster of each node.
     - embeddings (DataFrame): Embeddings of nodes.
@@ -177,7 +177,8 @@ def prune_graph(graph, collection, labels, embeddings, condition):
     cut_edges = 0
 
     for u, v in graph.edges():
-        c, w = collection.inverted_index[u]['id'], collection.inverted_index[v]['id']
+        # the nodes are the term ids of the inverted index
+        c, w = u, v
 
         try:
             cond, threshold = list(condition.items())[0]
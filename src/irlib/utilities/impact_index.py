@@ -0,0 +1,106 @@
+from bisect import bisect_left
+from heapq import heappush, heappop
+from itertools import accumulate
+
+from utilities.postings import posting_arrays
+
+# top-k of a MaxScore search when the caller asks for no cutoff: a full ranking (k = N) never lets
+# the k-th best score rise above zero, so nothing would be pruned
+DEFAULT_TOP_K = 1000
+
+class ImpactIndex:
+    """
+    Impact-scored inverted index with exact top-k retrieval by MaxScore dynamic pruning.
+
+    Built from `Collection.inverted_index`: the posting list of every term is sorted by doc id and
+    each posting stores its precomputed score contribution (impact) instead of the raw tf. The
+    maximum impact of a term is its score upper bound. During a query, terms whose summed upper
+    bounds cannot lift a document above the current k-th best score become non-essential: they
+    are never iterated, only probed (binary search) for documents found through the other terms,
+    and only while the document can still enter the top-k.
+
+    Args:
+        inverted_index (`dict`): {term: {'posting_list': [[doc_id, tf], ...], ...}} (plain or
+            CompressedPostings lists).
+        impact (`callable`): impact(term, doc_ids, tfs) -> list of the term's score contributions.
+    """
+
+    def __init__(self, inverted_index, impact):
+        self.postings = {}  # term -> (sorted doc ids, impacts)
+        self.upper_bounds = {}  # term -> max impact (never below 0)
+        self.num_postings = 0
+        for term, entry in inverted_index.items():
+            doc_ids, tfs = posting_arrays(entry['posting_list'])
+            impacts = [float(w) for w in impact(term, doc_ids, tfs)]
+            self.postings[term] = (doc_ids, impacts)
+            self.upper_bounds[term] = max(0.0, max(impacts))
+            self.num_postings += len(doc_ids)
+        # counters of the last search: postings in the query's lists / postings actually scored
+        self.last_stats = {}
+
+    def search(self, query, k):
+        """
+        Exact top-k documents with a positive score for a list of query terms (a repeated term
+        counts once per occurrence, terms missing from the collection are ignored).
+
+        Returns:
+            list of (doc_id, score), best first (ties: smaller doc id first).
+        """
+        counts = {}
+        for term in query:
+            if term in self.postings:
+                counts[term] = counts.get(term, 0) + 1
+
+        # lists in ascending order of (weighted) upper bound
+        terms = sorted(counts, key=lambda t: self.upper_bounds[t] * counts[t])
+        docs = [self.postings[t][0] for t in terms]
+        impacts = [self.postings[t][1] for t in terms]
+        weights = [counts[t] for t in terms]
+        # prefix[i]: best score a document can collect from lists 0..i
+        prefix = list(accumulate(self.upper_bounds[t] * counts[t] for t in terms))
+        lengths = [len(d) for d in docs]
+        cursors = [0] * len(terms)
+
+        heap = []  # (score, -doc_id), the k best so far
+        threshold = 0.0  # only positive scores are ranked
+        first_essential = 0  # lists [0, first_essential) are non-essential
+        while first_essential < len(terms) and prefix[first_essential] <= threshold:
+            first_essential += 1
+
+        scored = 0
+        while first_essential < len(terms):
+            # next candidate: the smallest doc id under the cursors of the essential lists
+            doc = min((docs[i][cursors[i]] for i in range(first_essential, len(terms)) if cursors[i] < lengths[i]),
+                      default=None)
+            if doc is None:
+                break
+
+            score = 0.0
+            for i in range(first_essential, len(terms)):
+                c = cursors[i]
+                if c < lengths[i] and docs[i][c] == doc:
+                    score += impacts[i][c] * weights[i]
+                    cursors[i] = c + 1
+                    scored += 1
+
+            # probe the non-essential lists, highest bound first, while the doc can still make it
+            for i in range(first_essential - 1, -1, -1):
+                if score + prefix[i] <= threshold:
+                    break
+                c = bisect_left(docs[i], doc, cursors[i])
+                cursors[i] = c
+                if c < lengths[i] and docs[i][c] == doc:
+                    score += impacts[i][c] * weights[i]
+                    scored += 1
+
+            if score > threshold:
+                heappush(heap, (score, -doc))
+                if len(heap) > k:
+                    heappop(heap)
+                if len(heap) == k:
+                    threshold = heap[0][0]
+                    while first_essential < len(terms) and prefix[first_essential] <= threshold:
+                        first_essential += 1
+
+        self.last_stats = {"postings": sum(lengths), "scored": scored}
+        return [(-neg_doc, score) for score, neg_doc in sorted(heap, key=lambda item: (-item[0], -item[1]))]
@@ -0,0 +1,55 @@
+from numpy import asarray, intersect1d, int64, minimum, searchsorted
+
+from utilities.postings import CompressedPostings, PostingDocIds, intersect_postings
+
+# from this length ratio on, the shorter list is searched in the longer one instead of merged with it
+SKEW_RATIO = 16
+
+
+def sorted_doc_ids(docs):
+    """
+    Doc ids of a termset cover as a sorted int64 array. Covers are kept sorted (plain arrays,
+    or the doc ids of a compressed posting list), so nothing is sorted here.
+    """
+    if isinstance(docs, PostingDocIds):
+        docs = docs.postings
+    if isinstance(docs, CompressedPostings):
+        return docs.doc_ids()
+    return asarray(docs, dtype=int64)
+
+
+def search_intersect(small, large):
+    """
+    Intersection of a short and a long sorted array by binary searching every element of the
+    short one in the long one: O(s log l) instead of the O(s + l) of a merge, which is what
+    galloping search buys on skewed lists, in a single vectorized searchsorted.
+    """
+    if not len(small) or not len(large):
+        return small[:0]
+    positions = minimum(searchsorted(large, small), len(large) - 1)
+    return small[large[positions] == small]
+
+
+def merge_intersect(a, b):
+    """Intersection of two sorted lists of unique doc ids of similar length."""
+    return intersect1d(a, b, assume_unique=True)
+
+
+def intersect_sorted(a, b, skew_ratio=SKEW_RATIO):
+    """
+    Sorted intersection of two doc id covers, with the strategy chosen by their sizes:
+        - a compressed posting list: block by block through its skip pointers (intersect_postings)
+        - lengths differing by `skew_ratio` or more: binary search of the short list (search_intersect)
+        - otherwise: a merge of the two sorted arrays (merge_intersect)
+
+    Returns:
+        sorted int64 array of the common doc ids.
+    """
+    if isinstance(a, (PostingDocIds, CompressedPostings)) or isinstance(b, (PostingDocIds, CompressedPostings)):
+        return intersect_postings(a, b)
+    a, b = sorted_doc_ids(a), sorted_doc_ids(b)
+    if len(a) > len(b):
+        a, b = b, a
+    if len(b) >= skew_ratio * len(a):
+        return search_intersect(a, b)
+    return merge_intersect(a, b)
@@ -0,0 +1,28 @@
+from utilities.apriori import apriori
+from utilities.closed_termsets import closed_termsets
+from utilities.eclat import eclat
+
+# termset miners selectable by name: all take (query, inv_index, min_freq, cache=None, limits=None)
+# and return FrequentTermsets ({frozenset of term ids: sorted doc ids})
+MINERS = {
+    'apriori': apriori,  # level-wise, candidates from the pairs of the previous level
+    'eclat': eclat,  # depth-first over vertical covers, same termsets as apriori
+    'closed': closed_termsets,  # closed termsets only (one per distinct cover)
+}
+
+# miners that return every frequent termset, i.e. interchangeable in the models
+EXACT_MINERS = ('apriori', 'eclat')
+
+
+def get_miner(miner=None):
+    """
+    The miner function of `miner`: a name of MINERS, a function with the signature of apriori
+    (returned as is) or None (apriori).
+    """
+    if miner is None:
+        return apriori
+    if callable(miner):
+        return miner
+    if miner not in MINERS:
+        raise ValueError(f"Unknown miner '{miner}', expected one of {list(MINERS)}")
+    return MINERS[miner]
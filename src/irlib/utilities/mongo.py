@@ -1,16 +1,75 @@
-from pymongo import MongoClient
+import os
+from threading import Lock
+
+from pymongo import ASCENDING, DESCENDING, MongoClient
 
 # Port 27018 όπως στο docker
-MONGO_URI = "mongodb://localhost:27018"
+MONGO_URI = os.environ.get("IRLIB_MONGO_URI", "mongodb://localhost:27018")
 
 
 DB_NAME = "IR_Lib"
 
+# Ρυθμίσεις του connection pool (αλλάζουν με environment variables)
+MAX_POOL_SIZE = int(os.environ.get("IRLIB_MONGO_MAX_POOL_SIZE", 50))
+MIN_POOL_SIZE = int(os.environ.get("IRLIB_MONGO_MIN_POOL_SIZE", 0))
+SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("IRLIB_MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+CONNECT_TIMEOUT_MS = int(os.environ.get("IRLIB_MONGO_CONNECT_TIMEOUT_MS", 5000))
+SOCKET_TIMEOUT_MS = int(os.environ.get("IRLIB_MONGO_SOCKET_TIMEOUT_MS", 0)) or None
+
+# Έγγραφα ανά round trip των cursors που διαβάζουν ολόκληρες συλλογές
+BATCH_SIZE = int(os.environ.get("IRLIB_MONGO_BATCH_SIZE", 5000))
+
+_client = None
+_client_lock = Lock()
+
 
 def get_client() -> MongoClient:
-    return MongoClient(MONGO_URI)
+    """
+    Ένας κοινός MongoClient για όλη τη διεργασία (thread-safe, με δικό του connection pool).
+    Δημιουργείται στην πρώτη κλήση, οι επόμενες κλήσεις επιστρέφουν τον ίδιο.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(
+                    MONGO_URI,
+                    maxPoolSize=MAX_POOL_SIZE,
+                    minPoolSize=MIN_POOL_SIZE,
+                    serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+                    connectTimeoutMS=CONNECT_TIMEOUT_MS,
+                    socketTimeoutMS=SOCKET_TIMEOUT_MS,
+                )
+    return _client
+
+
+def close_client() -> None:
+    """Κλείνει τον κοινό client (π.χ. στο τέλος ενός script), η επόμενη get_client() ανοίγει νέο."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
 
 
 def get_db(name: str = DB_NAME):
     client = get_client()
     return client[name]
+
+
+def ensure_indexes(db=None) -> None:
+    """
+    Δημιουργεί (αν δεν υπάρχουν) τα compound indexes των ερωτημάτων της βιβλιοθήκης:
+        Documents / Queries : (collection, id)           — find ανά συλλογή, distinct("collection"), upserts
+        Qrels               : (collection, query_id, doc_id)
+        Results             : (model, collection, timestamp), (collection, timestamp), (timestamp)
+                              — τα φίλτρα του GET /results με sort("timestamp", -1)
+    Η create_index είναι idempotent, οπότε η κλήση είναι φθηνή όταν τα indexes υπάρχουν ήδη.
+    """
+    db = get_db() if db is None else db
+    db["Documents"].create_index([("collection", ASCENDING), ("id", ASCENDING)])
+    db["Queries"].create_index([("collection", ASCENDING), ("id", ASCENDING)])
+    db["Qrels"].create_index([("collection", ASCENDING), ("query_id", ASCENDING), ("doc_id", ASCENDING)])
+    db["Results"].create_index([("model", ASCENDING), ("collection", ASCENDING), ("timestamp", DESCENDING)])
+    db["Results"].create_index([("collection", ASCENDING), ("timestamp", DESCENDING)])
+    db["Results"].create_index([("timestamp", DESCENDING)])
@@ -0,0 +1,275 @@
+import json
+
+from numpy import (add, arange, asarray, concatenate, cumsum, empty, flatnonzero, frombuffer, int64, intersect1d, load,
+                   repeat, savez, searchsorted, sort, uint8, uint32, uint64, zeros)
+
+# postings per block: the unit of decoding and of skipping
+BLOCK_SIZE = 128
+
+
+def _varint_sizes(values):
+    # bytes taken by every value
+    sizes = zeros(len(values), dtype=int64) + 1
+    for shift in range(7, 64, 7):
+        sizes += values >= (1 << shift)
+    return sizes
+
+
+def varint_encode(values):
+    """
+    Variable-byte encoding of non-negative integers: 7 bits per byte, least significant group
+    first, the high bit set on every byte but the last one of a value. Returns a uint8 array.
+    """
+    values = asarray(values, dtype=uint64)
+    if not len(values):
+        return empty(0, dtype=uint8)
+    sizes = _varint_sizes(values)
+    starts = cumsum(sizes) - sizes
+    # position of every output byte inside its value
+    position = arange(int(sizes.sum())) - repeat(starts, sizes)
+    out = ((repeat(values, sizes) >> (uint64(7) * position.astype(uint64))) & uint64(0x7F)).astype(uint8)
+    out |= 0x80
+    out[starts + sizes - 1] &= 0x7F
+    return out
+
+
+def varint_decode(data):
+    """Inverse of varint_encode (vectorized): uint8 array (or bytes) -> int64 array."""
+    data = frombuffer(data, dtype=uint8) if isinstance(data, bytes) else asarray(data, dtype=uint8)
+    if not len(data):
+        return empty(0, dtype=int64)
+    ends = flatnonzero(data < 0x80)
+    starts = concatenate(([0], ends[:-1] + 1))
+    position = arange(len(data)) - repeat(starts, ends - starts + 1)
+    groups = (data & 0x7F).astype(uint64) << (uint64(7) * position.astype(uint64))
+    return add.reduceat(groups, starts).astype(int64)
+
+
+class CompressedPostings:
+    """
+    Posting list [[doc_id, tf], ...] stored compressed: doc ids as delta gaps and tfs, both
+    variable-byte encoded, in one byte string (all the doc gaps, then all the tfs). Lists longer
+    than `block_size` postings also get skip pointers: per block the last doc id and the offsets
+    of its gaps and tfs, so that a block can be located with a binary search and decoded on its own.
+
+    A drop-in replacement for the list in `inverted_index[term]['posting_list']`: it has a length,
+    iterates (doc_id, tf) pairs in doc id order and can be extended with `+=`. The layout is the
+    same in memory and on disk (see save_index / load_index).
+    """
+    __slots__ = ('data', 'tf_start', 'skips', 'length', 'block_size')
+
+    def __init__(self, postings=(), block_size=BLOCK_SIZE):
+        postings = sorted(postings, key=lambda posting: posting[0])
+        doc_ids = asarray([doc_id for doc_id, _ in postings], dtype=int64)
+        tfs = asarray([tf for _, tf in postings], dtype=int64)
+        self._encode(doc_ids, tfs, block_size)
+
+    def _encode(self, doc_ids, tfs, block_size):
+        self.length = len(doc_ids)
+        self.block_size = block_size
+        # the gaps run across the blocks: the first gap of a block is taken from the last doc id
+        # of the previous one (its skip entry)
+        gaps = doc_ids - concatenate(([0], doc_ids[:-1])).astype(int64) if self.length else doc_ids
+        doc_bytes, tf_bytes = varint_encode(gaps), varint_encode(tfs)
+        self.data = doc_bytes.tobytes() + tf_bytes.tobytes()
+        self.tf_start = len(doc_bytes)
+        self.skips = None
+        if self.length > block_size:
+            block_starts = arange(0, self.length, block_size)
+            skips = empty((len(block_starts), 3), dtype=int64)
+            skips[:, 0] = doc_ids[concatenate((block_starts[1:], [self.length])) - 1]
+            skips[:, 1] = concatenate(([0], cumsum(_varint_sizes(gaps.astype(uint64)))))[block_starts]
+            skips[:, 2] = concatenate(([0], cumsum(_varint_sizes(tfs.astype(uint64)))))[block_starts]
+            self.skips = skips
+
+    @classmethod
+    def from_arrays(cls, doc_ids, tfs, block_size=BLOCK_SIZE):
+        """From sorted doc id / tf arrays."""
+        postings = cls.__new__(cls)
+        postings._encode(asarray(doc_ids, dtype=int64), asarray(tfs, dtype=int64), block_size)
+        return postings
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        doc_ids, tfs = self.decode()
+        return zip(doc_ids.tolist(), tfs.tolist())
+
+    def __iadd__(self, postings):
+        # e.g. update_index: the list is decoded, extended and encoded again
+        doc_ids, tfs = self.decode()
+        extra = sorted(postings, key=lambda posting: posting[0])
+        doc_ids = concatenate((doc_ids, asarray([doc_id for doc_id, _ in extra], dtype=int64)))
+        tfs = concatenate((tfs, asarray([tf for _, tf in extra], dtype=int64)))
+        order = doc_ids.argsort(kind='stable')
+        self._encode(doc_ids[order], tfs[order], self.block_size)
+        return self
+
+    @property
+    def num_blocks(self):
+        return 1 if self.skips is None else len(self.skips)
+
+    @property
+    def block_last(self):
+        """Last doc id of every block (the skip pointers)."""
+        if self.skips is None:
+            return self.doc_ids()[-1:]
+        return self.skips[:, 0]
+
+    @property
+    def nbytes(self):
+        return len(self.data) + (0 if self.skips is None else self.skips.nbytes)
+
+    @property
+    def docs(self):
+        """The doc ids of the list (see PostingDocIds), e.g. as the documents of a 1-termset."""
+        return PostingDocIds(self)
+
+    def decode(self):
+        """All postings: (doc ids, tfs) int64 arrays."""
+        data = frombuffer(self.data, dtype=uint8)
+        # the gaps run across the blocks, so the whole list is one cumulative sum
+        return cumsum(varint_decode(data[:self.tf_start])), varint_decode(data[self.tf_start:])
+
+    def decode_block(self, block):
+        """Postings of one block: (doc ids, tfs)."""
+        if self.skips is None:
+            return self.decode()
+        data = frombuffer(self.data, dtype=uint8)
+        last = block + 1 == len(self.skips)
+        base = self.skips[block - 1, 0] if block else 0
+        doc_end = self.tf_start if last else self.skips[block + 1, 1]
+        tf_end = len(data) if last else self.tf_start + self.skips[block + 1, 2]
+        gaps = varint_decode(data[self.skips[block, 1]:doc_end])
+        tfs = varint_decode(data[self.tf_start + self.skips[block, 2]:tf_end])
+        return base + cumsum(gaps), tfs
+
+    def doc_ids(self):
+        return self.decode()[0]
+
+    def to_list(self):
+        """The uncompressed [[doc_id, tf], ...] list."""
+        return [list(posting) for posting in self]
+
+
+class PostingDocIds:
+    """
+    Doc ids view of a CompressedPostings: sized and iterable like the doc id lists of Apriori,
+    and recognised by intersect_postings, which then works block by block on the compressed list.
+    """
+    __slots__ = ('postings',)
+
+    def __init__(self, postings):
+        self.postings = postings
+
+    def __len__(self):
+        return len(self.postings)
+
+    def __iter__(self):
+        return iter(self.postings.doc_ids().tolist())
+
+
+def _blocks(doc_ids):
+    """(last doc id of every block, block -> sorted doc ids) of a compressed or plain doc id list."""
+    if isinstance(doc_ids, PostingDocIds):
+        doc_ids = doc_ids.postings
+    if isinstance(doc_ids, CompressedPostings):
+        return doc_ids.block_last, lambda block: doc_ids.decode_block(block)[0]
+    doc_ids = sort(asarray(doc_ids, dtype=int64))
+    starts = arange(0, len(doc_ids), BLOCK_SIZE)
+    last = doc_ids[concatenate((starts[1:], [len(doc_ids)])) - 1] if len(doc_ids) else doc_ids
+    return last, lambda block: doc_ids[starts[block]:starts[block] + BLOCK_SIZE]
+
+
+def intersect_postings(a, b):
+    """
+    Sorted array of the doc ids common to two lists (CompressedPostings, PostingDocIds or plain
+    doc id sequences). The blocks of the shorter list are decoded one at a time and, through the
+    skip pointers, only the blocks of the longer list that overlap their doc id range are decoded.
+    """
+    a_last, a_block = _blocks(a)
+    b_last, b_block = _blocks(b)
+    if len(a_last) > len(b_last):
+        a_last, a_block, b_last, b_block = b_last, b_block, a_last, a_block
+    common = []
+    decoded = {}  # blocks of b decoded for the previous block of a
+    for block in range(len(a_last)):
+        docs = a_block(block)
+        first = int(searchsorted(b_last, docs[0]))
+        if first == len(b_last):
+            break
+        last = min(int(searchsorted(b_last, docs[-1])), len(b_last) - 1)
+        decoded = {j: decoded[j] if j in decoded else b_block(j) for j in range(first, last + 1)}
+        candidates = concatenate(list(decoded.values()))
+        common.append(intersect1d(docs, candidates, assume_unique=True))
+    return concatenate(common) if common else empty(0, dtype=int64)
+
+
+def posting_ndarrays(posting_list):
+    """(doc ids, tfs) int64 arrays of a compressed or plain posting list, sorted by doc id."""
+    if isinstance(posting_list, CompressedPostings):
+        return posting_list.decode()
+    posting_list = sorted(posting_list)
+    return (asarray([doc_id for doc_id, _ in posting_list], dtype=int64),
+            asarray([tf for _, tf in posting_list], dtype=int64))
+
+
+def posting_arrays(posting_list):
+    """(sorted doc ids, tfs) of a compressed or plain posting list, as python lists."""
+    doc_ids, tfs = posting_ndarrays(posting_list)
+    return doc_ids.tolist(), tfs.tolist()
+
+
+def compress_index(inv_index, block_size=BLOCK_SIZE):
+    """Replaces the posting lists of an inverted index with CompressedPostings (in place)."""
+    for entry in inv_index.values():
+        if not isinstance(entry['posting_list'], CompressedPostings):
+            entry['posting_list'] = CompressedPostings(entry['posting_list'], block_size)
+    return inv_index
+
+
+def save_index(inv_index, filename, block_size=BLOCK_SIZE):
+    """
+    Writes an inverted index with compressed posting lists to a .npz file: the byte strings and
+    skip pointers of all the terms concatenated, their boundaries, and the other fields of the
+    entries as JSON.
+    """
+    entries, parts = [], []
+    for entry in inv_index.values():
+        postings = entry['posting_list']
+        if not isinstance(postings, CompressedPostings):
+            postings = CompressedPostings(postings, block_size)
+        parts.append(postings)
+        entries.append({key: value for key, value in entry.items() if key != 'posting_list'})
+
+    skips = [p.skips for p in parts if p.skips is not None]
+    savez(filename,
+          terms=frombuffer(json.dumps(list(inv_index.keys())).encode('utf-8'), dtype=uint8),
+          entries=frombuffer(json.dumps(entries, default=float).encode('utf-8'), dtype=uint8),
+          # lengths, block sizes, tf starts and boundaries of the data / skips of every term
+          header=asarray([[p.length, p.block_size, p.tf_start, len(p.data), 0 if p.skips is None else len(p.skips)]
+                          for p in parts], dtype=uint32).reshape(-1, 5),
+          data=frombuffer(b''.join(p.data for p in parts), dtype=uint8),
+          skips=concatenate(skips) if skips else empty((0, 3), dtype=int64))
+
+
+def load_index(filename):
+    """Reads a file of save_index: inverted index whose posting lists are CompressedPostings."""
+    with load(filename) as f:
+        arrays = {name: f[name] for name in f.files}
+    terms = json.loads(arrays['terms'].tobytes().decode('utf-8'))
+    entries = json.loads(arrays['entries'].tobytes().decode('utf-8'))
+    header = arrays['header'].astype(int64)
+    data_bounds = concatenate(([0], cumsum(header[:, 3])))
+    skip_bounds = concatenate(([0], cumsum(header[:, 4])))
+    inv_index = {}
+    for i, (term, entry) in enumerate(zip(terms, entries)):
+        postings = CompressedPostings.__new__(CompressedPostings)
+        postings.length, postings.block_size, postings.tf_start = (int(v) for v in header[i, :3])
+        # views into the loaded arrays
+        postings.data = arrays['data'][data_bounds[i]:data_bounds[i + 1]]
+        postings.skips = arrays['skips'][skip_bounds[i]:skip_bounds[i + 1]] if header[i, 4] else None
+        entry['posting_list'] = postings
+        inv_index[term] = entry
+    return inv_index
@@ -0,0 +1,178 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from math import log2
+from os import cpu_count
+
+from numpy import array, concatenate, cumsum, empty, float64, int64, minimum, searchsorted
+from scipy.sparse import csr_matrix
+
+from utilities.miners import get_miner
+from utilities.intersection import sorted_doc_ids
+from utilities.postings import posting_ndarrays
+import numpy as np
+
+
+def termset_idf(num_docs, cover):
+    """Inverse termset frequency: log2(1 + N / number of documents of the termset), 3 decimals."""
+    return round(log2(1 + (num_docs / len(cover))), 3)
+
+
+def termset_tsf(termset, cover, term_postings):
+    """
+    Termset frequencies over a cover: 1 + log2 of the minimum tf of the terms in every document,
+    3 decimals (the non-zero values of a row of Model.calculate_tsf).
+
+    Args:
+        termset (`frozenset`): Term ids.
+        cover (`ndarray`): Sorted doc ids of the termset.
+        term_postings (`callable`): term id -> (sorted doc ids, tfs) of its posting list.
+    """
+    min_tf = None
+    for term_id in termset:
+        doc_ids, tfs = term_postings(term_id)
+        # the cover is a subset of the term's sorted posting list: gather its tfs by position
+        term_tf = tfs[searchsorted(doc_ids, cover)]
+        # by taking the min f, we get the termset frequency
+        min_tf = term_tf if min_tf is None else minimum(min_tf, term_tf)
+    return np.round(1 + np.log2(min_tf), 3)
+
+
+def term_postings_of(index_entries):
+    """
+    term id -> (sorted doc ids, tfs) arrays, decoded once per term, from the inverted index
+    entries by term id (Collection.index_entries).
+    """
+    postings = {}
+
+    def term_postings(term_id):
+        if term_id not in postings:
+            postings[term_id] = posting_ndarrays(index_entries[term_id]['posting_list'])
+        return postings[term_id]
+
+    return term_postings
+
+
+# inverted index of a worker process, set once by the pool initializer instead of per task
+_worker_index = None
+
+
+def _init_worker(inv_index):
+    global _worker_index
+    _worker_index = inv_index
+
+
+def _mine_query(query, min_freq, limits, miner):
+    return miner(query, _worker_index, min_freq, limits=limits)
+
+
+def mine_queries(queries, inv_index, min_freq=1, workers=None, cache=None, limits=None, miner=None):
+    """
+    Frequent termsets of every query, the queries spread over a process pool. Every
+    worker receives the inverted index once. With 1 worker (or 1 query) the queries are mined
+    in-process, through `cache` (TermsetCache) if given. `limits` (AprioriLimits) bounds the
+    mining of every query and `miner` (a name of utilities.miners.MINERS or a function with the
+    signature of apriori, picklable for the pool, defaults to apriori) mines it.
+
+    Returns:
+        list of FrequentTermsets ({termset: cover}), in the order of `queries`.
+    """
+    workers = workers or cpu_count() or 1
+    miner = get_miner(miner)
+    if workers > 1 and len(queries) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(inv_index,)) as pool:
+                # one query per task: their costs differ by orders of magnitude
+                return list(pool.map(_mine_query, queries, [min_freq] * len(queries), [limits] * len(queries),
+                                     [miner] * len(queries)))
+        except BrokenProcessPool:
+            # e.g. spawn-based platforms when the calling script has no `if __name__ == "__main__":` guard
+            print("Process pool unavailable, mining the queries in a single process.")
+    return [miner(query, inv_index, min_freq, cache, limits) for query in queries]
+
+
+class QueryBatchPlanner:
+    """
+    Plans the set-based representation of a whole batch of queries at once.
+
+    The frequent termsets of all the queries are mined first (in parallel, see mine_queries) and
+    deduplicated: the idf and the tsf row of every distinct termset are computed once, into one
+    idf vector and one sparse tsf matrix (distinct termsets x documents). A query is then the
+    array of the rows of its termsets, in the order apriori returned them, and its blocks are
+    slices of the shared data (see query_block).
+
+    Args:
+        collection: The collection of the model.
+        min_freq (`int`, defaults to 1): Minimum support of a termset.
+        workers (`int`, defaults to the number of CPUs): Processes mining the queries.
+        cache (`TermsetCache`, defaults to `None`): Covers, idf and tsf rows kept across batches.
+        limits (`AprioriLimits`, defaults to `None`): Bounds on the mining of every query.
+        miner (`str` or `callable`, defaults to `apriori`): Termset miner (see utilities.miners).
+    """
+
+    def __init__(self, collection, min_freq=1, workers=None, cache=None, limits=None, miner=None):
+        self.collection = collection
+        self.min_freq = min_freq
+        self.workers = workers
+        self.cache = cache
+        self.limits = limits
+        self.miner = get_miner(miner)
+        self.query_termsets = []  # per query: {termset: cover}
+        self.termsets = []  # distinct termsets, in order of first appearance
+        self.rows = []  # per query: rows of its termsets in `termsets`
+        self.idf = empty(0)
+        self.tsf = csr_matrix((0, collection.num_docs))
+
+    def plan(self, queries):
+        """Mines and deduplicates the termsets of `queries` and computes their shared data."""
+        inv_index = self.collection.inverted_index
+        if self.cache is not None:
+            self.cache.validate(self.collection)
+        self.query_termsets = mine_queries(queries, inv_index, self.min_freq, self.workers, self.cache,
+                                          self.limits, self.miner)
+
+        row_of, covers = {}, []
+        self.rows = []
+        for termsets in self.query_termsets:
+            rows = []
+            for termset, docs in termsets.items():
+                row = row_of.get(termset)
+                if row is None:
+                    row = row_of[termset] = len(covers)
+                    covers.append(docs)
+                rows.append(row)
+            self.rows.append(array(rows, dtype=int64))
+        self.termsets = list(row_of)
+
+        N = self.collection.num_docs
+        term_postings = term_postings_of(self.collection.index_entries())
+        idf, values, indices = [], [], []
+        for termset, docs in zip(self.termsets, covers):
+            cover = sorted_doc_ids(docs)
+            if self.cache is None:
+                idf.append(termset_idf(N, cover))
+                values.append(termset_tsf(termset, cover, term_postings))
+            else:
+                self.cache.get(termset, 'cover', lambda: docs)
+                idf.append(self.cache.get(termset, 'idf', lambda: termset_idf(N, cover)))
+                values.append(self.cache.get(termset, 'tsf', lambda: termset_tsf(termset, cover, term_postings)))
+            indices.append(cover - 1)
+        self.idf = array(idf, dtype=float64)
+        indptr = concatenate(([0], cumsum([len(cover) for cover in indices], dtype=int64)))
+        self.tsf = csr_matrix((concatenate(values) if values else empty(0),
+                               concatenate(indices) if indices else empty(0, dtype=int64), indptr),
+                              shape=(len(self.termsets), N))
+        return self
+
+    def __len__(self):
+        return len(self.rows)
+
+    def query_block(self, i):
+        """(idf vector, sparse tsf matrix) of query i: the rows of its termsets."""
+        rows = self.rows[i]
+        return self.idf[rows], self.tsf[rows]
+
+    def report(self):
+        total = sum(len(rows) for rows in self.rows)
+        truncated = sum(1 for termsets in self.query_termsets if termsets.truncated)
+        return (f"Query batch: {len(self)} queries, {total} termsets, {len(self.termsets)} distinct "
+                f"({self.tsf.nnz} tsf values), {truncated} truncated")
@@ -0,0 +1,141 @@
+from collections import Counter
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+
+
+def fit_tfidf(vectorizer, texts):
+    """
+    Fits a TfidfVectorizer from the document frequencies of its terms, counted one text at a time,
+    so the (documents x terms) count matrix of vectorizer.fit is never built. The vocabulary (in
+    sorted order) and the idf are the ones vectorizer.fit(texts) would give. Vectorizers that prune
+    the vocabulary (min_df, max_df, max_features) are fitted with vectorizer.fit.
+    """
+    if vectorizer.min_df != 1 or vectorizer.max_df != 1.0 or vectorizer.max_features is not None:
+        return vectorizer.fit(texts)
+    analyzer = vectorizer.build_analyzer()
+    df = Counter()
+    for text in texts:
+        df.update(set(analyzer(text)))
+    vocabulary = sorted(df)
+    # fixed vocabulary: fitting on one text only validates it, the idf is set from the counts
+    vectorizer.set_params(vocabulary={term: i for i, term in enumerate(vocabulary)})
+    vectorizer.fit(texts[:1])
+    if vectorizer.use_idf:
+        # as TfidfTransformer: smooth_idf adds one document containing every term
+        smooth = int(vectorizer.smooth_idf)
+        dfs = np.array([df[term] for term in vocabulary], dtype=np.float64)
+        vectorizer.idf_ = np.log((len(texts) + smooth) / (dfs + smooth)) + 1
+    return vectorizer
+
+
+class TextBlocks:
+    """
+    Block source of the rows of vectorizer.transform(texts) (a fitted vectorizer), transformed
+    block_size texts at a time: BlockRandomizedSVD reads it like a matrix without the whole
+    matrix ever existing. Every pass over the blocks transforms the texts again.
+    """
+
+    def __init__(self, vectorizer, texts):
+        self.vectorizer = vectorizer
+        self.texts = texts
+        self.shape = (len(texts), len(vectorizer.vocabulary_))
+
+    def blocks(self, block_size):
+        for start in range(0, len(self.texts), block_size):
+            yield self.vectorizer.transform(self.texts[start:start + block_size])
+
+
+class BlockRandomizedSVD:
+    """
+    Randomized truncated SVD (Halko et al., 2011) that only reads the input in blocks of rows.
+
+    The range of the row space is found from products X_b^T (X_b Q) accumulated over the row blocks,
+    refined with `n_iter` power iterations, and the singular vectors come from the small (l x l)
+    Gram matrix of X Q, l = n_components + n_oversamples. Apart from the current block, only
+    (n_features x l) and (l x l) matrices are kept. The input is a matrix (sliced in blocks, so it
+    is in memory already) or a block source such as TextBlocks, which produces the blocks on demand:
+    then the decomposition runs out of core, in memory bounded by the block size.
+
+    Same interface as sklearn's TruncatedSVD (fit, transform, fit_transform, components_,
+    singular_values_), components ordered by decreasing singular value.
+
+    Args:
+        n_components (int): Rank of the decomposition.
+        n_oversamples (int): Extra random vectors of the range finder.
+        n_iter (int): Power iterations (more iterations -> more accurate trailing components).
+        block_size (int): Rows of the input read per product.
+        random_state (int): Seed of the random projection.
+    """
+
+    def __init__(self, n_components=100, n_oversamples=10, n_iter=4, block_size=4096, random_state=42):
+        self.n_components = n_components
+        self.n_oversamples = n_oversamples
+        self.n_iter = n_iter
+        self.block_size = block_size
+        self.random_state = random_state
+        self.components_ = None
+        self.singular_values_ = None
+
+    def _blocks(self, X):
+        if hasattr(X, "blocks"):
+            yield from X.blocks(self.block_size)
+            return
+        for start in range(0, X.shape[0], self.block_size):
+            yield X[start:start + self.block_size]
+
+    def _gram_product(self, X, Q):
+        # X^T X Q, one block of rows at a time
+        Z = np.zeros_like(Q)
+        for block in self._blocks(X):
+            Z += block.T @ (block @ Q)
+        return Z
+
+    def fit(self, X, y=None):
+        n_features = X.shape[1]
+        rank = min(self.n_components + self.n_oversamples, n_features)
+        rng = np.random.default_rng(self.random_state)
+
+        # range finder of the row space with power iterations, re-orthonormalized every step
+        Q, _ = np.linalg.qr(self._gram_product(X, rng.standard_normal((n_features, rank))))
+        for _ in range(self.n_iter):
+            Q, _ = np.linalg.qr(self._gram_product(X, Q))
+
+        # (X Q)^T (X Q) = W S^2 W^T  ->  singular values S, right singular vectors Q W
+        gram = np.zeros((rank, rank))
+        for block in self._blocks(X):
+            projected = np.asarray(block @ Q)
+            gram += projected.T @ projected
+        eigenvalues, W = np.linalg.eigh(gram)
+        order = np.argsort(eigenvalues)[::-1][:self.n_components]
+        self.singular_values_ = np.sqrt(np.clip(eigenvalues[order], 0, None))
+        self.components_ = (Q @ W[:, order]).T
+        return self
+
+    def transform(self, X):
+        return np.vstack([np.asarray(block @ self.components_.T) for block in self._blocks(X)])
+
+    def fit_transform(self, X, y=None):
+        return self.fit(X).transform(X)
+
+
+SVD_BACKENDS = {
+    "truncated": TruncatedSVD,
+    "randomized": BlockRandomizedSVD,
+}
+
+
+def make_svd(backend: str = "truncated", n_components: int = 100, **params):
+    """
+    Creates an (unfitted) SVD of the given backend.
+
+    Args:
+        backend (str): 'truncated' (sklearn TruncatedSVD, whole matrix in memory) or 'randomized'
+            (BlockRandomizedSVD, row blocks of a matrix or of a block source).
+        n_components (int): Rank of the decomposition.
+        **params: Backend specific parameters (n_iter, block_size, n_oversamples, random_state ...).
+    """
+    if backend not in SVD_BACKENDS:
+        raise KeyError(f"SVD backend '{backend}' not found. Available: {list(SVD_BACKENDS.keys())}")
+    params.setdefault("random_state", 42)
+    return SVD_BACKENDS[backend](n_components=n_components, **params)
@@ -0,0 +1,115 @@
+from numpy import arange, argpartition, array, diff, float64, full, int64, take_along_axis
+from scipy.sparse import csr_matrix
+
+
+class TermMatrix:
+    """
+    Sparse document-term matrix of a collection, built once from `Collection.docs`:
+
+            t1   t2   t3  . . .  tv
+        d1  tf   0    tf         .
+        d2  0    tf   0          .
+        .                        .
+        dn  tf   0    0   . . .  tf
+
+    Rows follow the order of `collection.docs` (doc_ids[i] is the id of row i), columns the
+    first appearance of each term. Used by the lexical models (TF-IDF, BM25) to score all
+    queries with sparse matrix products instead of python loops over the documents.
+    """
+
+    def __init__(self, docs):
+        self.vocabulary = {}  # term -> column
+        indptr, indices, data = [0], [], []
+        for doc in docs:
+            for term, tf in doc.tf.items():
+                indices.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+                data.append(tf)
+            indptr.append(len(indices))
+
+        self.doc_ids = array([doc.doc_id for doc in docs], dtype=int64)
+        self.matrix = csr_matrix((array(data, dtype=float64), array(indices, dtype=int64), array(indptr, dtype=int64)),
+                                 shape=(len(self.doc_ids), len(self.vocabulary)))
+        # number of documents each term appears in
+        self.df = diff(self.matrix.tocsc().indptr)
+        # document lengths (sum of term frequencies)
+        self.doc_lengths = array(self.matrix.sum(axis=1)).ravel()
+
+    @property
+    def num_docs(self) -> int:
+        return self.matrix.shape[0]
+
+    def query_matrix(self, queries) -> csr_matrix:
+        """
+        Bag-of-words matrix (n_queries x vocabulary) of term lists. A term repeated in a query is
+        counted as many times as it appears; terms missing from the collection are dropped.
+        """
+        indptr, indices, data = [0], [], []
+        for query in queries:
+            counts = {}
+            for term in query:
+                col = self.vocabulary.get(term)
+                if col is not None:
+                    counts[col] = counts.get(col, 0) + 1
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return csr_matrix((array(data, dtype=float64), array(indices, dtype=int64), array(indptr, dtype=int64)),
+                          shape=(len(queries), len(self.vocabulary)))
+
+    def query_positions(self, queries):
+        """
+        Position matrix of term lists: one column per (query, position) of a term that exists in the
+        collection, in query order, plus the vocabulary column of every position.
+
+        `positions @ weights[:, columns].T` adds the weights position by position in query order,
+        so the products/sums are exactly the ones of a python loop over the query terms.
+        """
+        indptr, columns = [0], []
+        for query in queries:
+            columns.extend(self.vocabulary[term] for term in query if term in self.vocabulary)
+            indptr.append(len(columns))
+        positions = csr_matrix(([1.0] * len(columns), list(range(len(columns))), indptr),
+                               shape=(len(queries), len(columns)))
+        return positions, array(columns, dtype=int64)
+
+
+def get_term_matrix(collection) -> TermMatrix:
+    """Returns the collection's TermMatrix, building it on first use."""
+    if collection.term_matrix is None:
+        collection.term_matrix = TermMatrix(collection.docs)
+    return collection.term_matrix
+
+
+def rank_row(scores: csr_matrix, doc_ids, positive_only: bool = True) -> list:
+    """
+    Ranks the documents of one row of a sparse score matrix by descending score. Ties keep the
+    collection order (like a stable sort of a {doc_id: score} dict).
+    """
+    columns, values = scores.indices, scores.data
+    if positive_only:
+        keep = values > 0
+        columns, values = columns[keep], values[keep]
+    order = columns.argsort(kind="stable")
+    columns, values = columns[order], values[order]
+    return doc_ids[columns[(-values).argsort(kind="stable")]].tolist()
+
+
+def top_k_rows(scores, doc_ids, k: int) -> list:
+    """
+    Best k documents of every row of a dense (n_queries x n_docs) score block, best first.
+    Ties keep the collection order.
+
+    Returns:
+        list of (doc_ids, scores) arrays, one pair per row.
+    """
+    n_docs = scores.shape[1]
+    k = min(k, n_docs)
+    if k < n_docs:
+        candidates = argpartition(-scores, k - 1, axis=1)[:, :k]
+        candidates.sort(axis=1)
+    else:
+        candidates = full(scores.shape, arange(n_docs))
+    candidate_scores = take_along_axis(scores, candidates, axis=1)
+    order = (-candidate_scores).argsort(axis=1, kind="stable")
+    ranked = take_along_axis(candidates, order, axis=1)
+    return [(doc_ids[positions], scores[row, positions]) for row, positions in enumerate(ranked)]
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+
+# termsets kept by default (covers included, also those of infrequent candidates)
+CACHE_SIZE = 1 << 16
+
+
+class TermsetEntry:
+    """What is known of a termset: its cover (sorted doc ids), its idf and its tsf row (the values
+    of the termset frequency over the cover, the row is zero everywhere else)."""
+    __slots__ = ('cover', 'idf', 'tsf')
+
+    def __init__(self, cover=None):
+        self.cover = cover
+        self.idf = None
+        self.tsf = None
+
+
+class TermsetCache:
+    """
+    Bounded LRU cache of termset data shared by the queries of a model.
+
+    A termset is keyed by its frozenset of term ids (the canonical form apriori produces), and its
+    cover, idf and tsf row depend only on the collection, so the same single terms and pairs that
+    recur across the queries of a collection are computed once. Hits and misses are counted per
+    kind of value ('cover', 'idf', 'tsf').
+
+    The cache holds no reference to the collection: `validate` clears it when the collection it
+    was filled from has changed (documents or terms added). Models of the same collection can
+    share one cache (e.g. `model.termset_cache = other.termset_cache`).
+    """
+
+    KINDS = ('cover', 'idf', 'tsf')
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._signature = None
+        self.hits = dict.fromkeys(self.KINDS, 0)
+        self.misses = dict.fromkeys(self.KINDS, 0)
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, termset):
+        return termset in self._entries
+
+    def validate(self, collection):
+        """Drops the cached entries if the collection differs from the one they were computed on."""
+        signature = (collection.num_docs, len(collection.inverted_index))
+        if signature != self._signature:
+            self._entries.clear()
+            self._signature = signature
+
+    def clear(self):
+        self._entries.clear()
+
+    def entry(self, termset):
+        """Entry of a termset (created if missing), marked as the most recently used."""
+        entry = self._entries.get(termset)
+        if entry is None:
+            entry = self._entries[termset] = TermsetEntry()
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        else:
+            self._entries.move_to_end(termset)
+        return entry
+
+    def get(self, termset, kind, compute):
+        """
+        Cached `kind` value of a termset, `compute()` on a miss.
+
+        Args:
+            termset (`frozenset`): Term ids of the termset.
+            kind (`str`): 'cover', 'idf' or 'tsf'.
+            compute (`callable`): Computes the value when it is not cached.
+        """
+        entry = self.entry(termset)
+        value = getattr(entry, kind)
+        if value is None:
+            self.misses[kind] += 1
+            value = compute()
+            setattr(entry, kind, value)
+        else:
+            self.hits[kind] += 1
+        return value
+
+    def hit_rate(self, kind=None):
+        kinds = self.KINDS if kind is None else (kind,)
+        hits = sum(self.hits[k] for k in kinds)
+        total = hits + sum(self.misses[k] for k in kinds)
+        return hits / total if total else 0.0
+
+    def stats(self):
+        """{kind: (hits, misses, hit rate)} plus the size and the number of evicted termsets."""
+        stats = {kind: (self.hits[kind], self.misses[kind], self.hit_rate(kind)) for kind in self.KINDS}
+        stats['size'] = len(self)
+        stats['evictions'] = self.evictions
+        return stats
+
+    def report(self):
+        parts = [f"{kind} {self.hits[kind]}/{self.hits[kind] + self.misses[kind]} ({self.hit_rate(kind):.1%})"
+                 for kind in self.KINDS]
+        return f"Termset cache hits: {', '.join(parts)} | {len(self)} termsets, {self.evictions} evicted"
@@ -0,0 +1,273 @@
+from abc import ABC, abstractmethod
+from time import time
+
+import numpy as np
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    # zero vectors stay zero, so their cosine with anything is 0 (as in sklearn's cosine_similarity)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _merge_top_k(scores, indices, k):
+    """Keeps the k best (score, index) pairs of every row, sorted by descending score."""
+    if scores.shape[1] > k:
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        scores = np.take_along_axis(scores, part, axis=1)
+        indices = np.take_along_axis(indices, part, axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(indices, order, axis=1)
+
+
+class VectorIndex(ABC):
+    """
+    Base class of the dense vector indexes used by the embedding models (SBERT, LSI, ConGSB expansion).
+
+    An index is built once over the collection side vectors and answers top-k queries with
+    `search`, which returns two (n_queries x k) arrays: scores and row indices of the indexed
+    vectors. Rows with fewer than k candidates are padded with score -inf and index -1.
+
+    Args:
+        metric (str): 'cosine' (vectors are L2-normalized on build/search) or 'dot'.
+    """
+
+    name = "base"
+
+    def __init__(self, metric: str = "cosine"):
+        if metric not in ("cosine", "dot"):
+            raise ValueError(f"Unknown metric '{metric}', expected 'cosine' or 'dot'.")
+        self.metric = metric
+        self.size = 0
+        self.dim = 0
+        self.build_time = 0.0
+        self.last_search_time = 0.0
+
+    def _prepare(self, vectors) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim == 1:
+            vectors = vectors.reshape(1, -1)
+        return _normalize_rows(vectors) if self.metric == "cosine" else vectors
+
+    def build(self, vectors) -> "VectorIndex":
+        start = time()
+        self.size, self.dim = vectors.shape
+        self._build(vectors)
+        self.build_time = time() - start
+        return self
+
+    def search(self, queries, k: int):
+        start = time()
+        queries = self._prepare(queries)
+        k = max(1, min(k, self.size))
+        scores, indices = self._search(queries, k)
+        self.last_search_time = time() - start
+        return scores, indices
+
+    @abstractmethod
+    def _build(self, vectors) -> None:
+        pass
+
+    @abstractmethod
+    def _search(self, queries: np.ndarray, k: int):
+        pass
+
+
+class ExactIndex(VectorIndex):
+    """
+    Brute-force search with blocked matrix products. Vectors are never copied as a whole,
+    each block is converted/normalized when it is scored, so memory-mapped (e.g. float16)
+    matrices can be searched in bounded memory.
+
+    Args:
+        block_size (int): Number of indexed vectors scored per matrix product.
+    """
+
+    name = "exact"
+
+    def __init__(self, metric: str = "cosine", block_size: int = 4096):
+        super().__init__(metric)
+        self.block_size = block_size
+        self._vectors = None
+
+    def _build(self, vectors) -> None:
+        self._vectors = vectors
+
+    def _search(self, queries, k):
+        n_queries = queries.shape[0]
+        best_scores = np.empty((n_queries, 0), dtype=np.float32)
+        best_indices = np.empty((n_queries, 0), dtype=np.int64)
+        for start in range(0, self.size, self.block_size):
+            block = self._prepare(self._vectors[start:start + self.block_size])
+            scores = queries @ block.T
+            indices = np.broadcast_to(np.arange(start, start + block.shape[0]), scores.shape)
+            best_scores, best_indices = _merge_top_k(np.hstack((best_scores, scores)),
+                                                     np.hstack((best_indices, indices)), k)
+        return best_scores, best_indices
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted file index: the vectors are clustered with k-means and a query is only scored
+    against the members of its `n_probe` closest clusters.
+
+    Args:
+        n_lists (int | None): Number of clusters (default: ~sqrt(size)).
+        n_probe (int): Clusters visited per query, trades recall for latency.
+        n_iter (int): k-means iterations.
+        train_size (int): Maximum number of vectors sampled to train the centroids.
+        seed (int): Random seed of the centroid initialisation.
+    """
+
+    name = "ivf"
+
+    def __init__(self, metric: str = "cosine", n_lists: int | None = None, n_probe: int = 8,
+                 n_iter: int = 20, train_size: int = 50000, seed: int = 42):
+        super().__init__(metric)
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.n_iter = n_iter
+        self.train_size = train_size
+        self.seed = seed
+        self._vectors = None
+        self._centroids = None
+        self._lists = []
+
+    def _build(self, vectors) -> None:
+        self._vectors = self._prepare(vectors)
+        rng = np.random.default_rng(self.seed)
+        n_lists = self.n_lists or max(1, int(np.sqrt(self.size)))
+        n_lists = min(n_lists, self.size)
+
+        sample = self._vectors
+        if self.size > self.train_size:
+            sample = self._vectors[rng.choice(self.size, self.train_size, replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], n_lists, replace=False)].copy()
+        for _ in range(self.n_iter):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assignment == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            if self.metric == "cosine":
+                centroids = _normalize_rows(centroids)
+        self._centroids = centroids
+
+        assignment = np.argmax(self._vectors @ centroids.T, axis=1)
+        self._lists = [np.flatnonzero(assignment == c) for c in range(n_lists)]
+
+    def _search(self, queries, k):
+        n_probe = min(self.n_probe, len(self._lists))
+        probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :n_probe]
+        scores = np.full((queries.shape[0], k), -np.inf, dtype=np.float32)
+        indices = np.full((queries.shape[0], k), -1, dtype=np.int64)
+        for i, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([self._lists[c] for c in lists])
+            if not len(candidates):
+                continue
+            candidate_scores = self._vectors[candidates] @ query
+            top_scores, top_indices = _merge_top_k(candidate_scores.reshape(1, -1), candidates.reshape(1, -1), k)
+            scores[i, :top_scores.shape[1]] = top_scores[0]
+            indices[i, :top_indices.shape[1]] = top_indices[0]
+        return scores, indices
+
+
+class HNSWIndex(VectorIndex):
+    """
+    Hierarchical navigable small world graph, backed by the optional `hnswlib` package.
+
+    Args:
+        m (int): Graph degree.
+        ef_construction (int): Candidate list size while building.
+        ef_search (int): Candidate list size while searching, trades recall for latency.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, metric: str = "cosine", m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        super().__init__(metric)
+        try:
+            import hnswlib
+        except ModuleNotFoundError:
+            raise ModuleNotFoundError("The 'hnsw' index needs hnswlib (pip install hnswlib), "
+                                      "use the 'exact' or 'ivf' index instead.")
+        self._hnswlib = hnswlib
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._index = None
+
+    def _build(self, vectors) -> None:
+        vectors = self._prepare(vectors)
+        # normalized vectors -> inner product is the cosine similarity
+        self._index = self._hnswlib.Index(space="ip", dim=self.dim)
+        self._index.init_index(max_elements=self.size, ef_construction=self.ef_construction, M=self.m)
+        self._index.add_items(vectors, np.arange(self.size))
+
+    def _search(self, queries, k):
+        self._index.set_ef(max(self.ef_search, k))
+        labels, distances = self._index.knn_query(queries, k=k)
+        return (1.0 - distances).astype(np.float32), labels.astype(np.int64)
+
+
+INDEX_BACKENDS = {
+    "exact": ExactIndex,
+    "ivf": IVFIndex,
+    "hnsw": HNSWIndex,
+}
+
+
+def build_index(vectors, backend: str = "exact", metric: str = "cosine", **params) -> VectorIndex:
+    """
+    Builds a vector index of the given backend over the (n x dim) vectors.
+
+    Args:
+        vectors: Matrix of the vectors to index (numpy array or memory-mapped array).
+        backend (str): One of INDEX_BACKENDS ('exact', 'ivf', 'hnsw').
+        metric (str): 'cosine' or 'dot'.
+        **params: Backend specific parameters (block_size, n_lists, n_probe, ef_search ...).
+    """
+    if backend not in INDEX_BACKENDS:
+        raise KeyError(f"Vector index '{backend}' not found. Available: {list(INDEX_BACKENDS.keys())}")
+    return INDEX_BACKENDS[backend](metric=metric, **params).build(vectors)
+
+
+def recall_at_k(indices: np.ndarray, exact_indices: np.ndarray) -> float:
+    """Mean fraction of the exact top-k neighbours that an approximate search also returned."""
+    hits = [len(set(row[row >= 0]) & set(exact_row)) / len(exact_row)
+            for row, exact_row in zip(indices, exact_indices) if len(exact_row)]
+    return float(np.mean(hits)) if hits else 1.0
+
+
+def index_stats(index: VectorIndex, vectors, queries, k: int, indices=None, measure_recall: bool = True) -> dict:
+    """
+    Recall-vs-latency numbers of an index for a batch of queries. The recall is measured
+    against an exact search over the same vectors.
+
+    Args:
+        index: A built index.
+        vectors: The indexed vectors (for the exact reference search).
+        queries: The query vectors.
+        k (int): Number of neighbours.
+        indices: Result of index.search(queries, k), if already computed.
+        measure_recall (bool): Run the exact reference search (skipped for the exact index).
+    """
+    if indices is None:
+        _, indices = index.search(queries, k)
+    search_time = index.last_search_time
+    stats = {
+        "backend": index.name,
+        "k": int(indices.shape[1]),
+        "build_sec": round(index.build_time, 4),
+        "search_sec": round(search_time, 4),
+        "latency_ms": round(1000 * search_time / max(1, len(indices)), 4),
+    }
+    if index.name == "exact":
+        stats["recall@k"] = 1.0
+    elif measure_recall:
+        reference = ExactIndex(metric=index.metric).build(vectors)
+        _, exact_indices = reference.search(queries, indices.shape[1])
+        stats["recall@k"] = round(recall_at_k(indices, exact_indices), 4)
+        stats["exact_search_sec"] = round(reference.last_search_time, 4)
+    return stats